@@ -1,76 +1,3560 @@
-import tkinter as tk
-from tkinter import ttk, filedialog, messagebox
 import os
 import re
-from PIL import Image, ImageDraw, ImageFont
+import sys
+import tempfile
+import time
+import abc
+import argparse
+import collections
+import contextlib
+import csv
+import fnmatch
+import functools
+import io
+import json
+import math
+import queue
+import select
+import shutil
+import signal
+import struct
+from PIL import Image
 import threading
-from pathlib import Path
 
+# Startup is kept short so the CLI and the GUI window come up quickly: tkinter, Pillow's
+# drawing/font modules, the profilers, process pools and other feature-specific modules
+# are imported where they are first used (bench startup measures this)
+tk = ttk = filedialog = messagebox = None
+
+def load_tkinter():
+    """Import tkinter on first use - only the GUI needs it"""
+    global tk, ttk, filedialog, messagebox
+    import tkinter as tk
+    from tkinter import ttk, filedialog, messagebox
+
+# Optional - used to report peak memory (resource is POSIX-only, psutil covers Windows)
+try:
+    import resource
+except ImportError:
+    resource = None
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# Image extensions picked up by folder processing
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+
+# ===== Model registry =====
+# Every per-model fact in one table, in selection-dialog order (newest series first):
+# (name, print width in cm, size category, series, output file stem, canvas label).
+# A models.toml/models.json in MODEL_REGISTRY_FOLDER (or passed with --models) adds
+# models or overrides these - see ModelRegistry.
+DEFAULT_MODELS = [
+    ('iPhone 16 Pro Max', 10.65, 'plus_max', 'iPhone 16 Series', 'iPhone16ProMax', 'IP 16 Pro Max'),
+    ('iPhone 16 Plus', 10.65, 'plus_max', 'iPhone 16 Series', 'iPhone16Plus', 'IP 16 Plus'),
+    ('iPhone 16 Pro', 9.8, 'regular', 'iPhone 16 Series', 'iPhone16Pro', 'IP 16 Pro'),
+    ('iPhone 16', 9.8, 'regular', 'iPhone 16 Series', 'iPhone16', 'IP 16'),
+    
+    ('iPhone 15 Pro Max', 10.65, 'plus_max', 'iPhone 15 Series', 'iPhone15ProMax', 'IP 15 Pro Max'),
+    ('iPhone 15 Plus', 10.65, 'plus_max', 'iPhone 15 Series', 'iPhone15Plus', 'IP 15 Plus'),
+    ('iPhone 15 Pro', 9.8, 'regular', 'iPhone 15 Series', 'iPhone15Pro', 'IP 15 Pro'),
+    ('iPhone 15', 9.8, 'regular', 'iPhone 15 Series', 'iPhone15', 'IP 15'),
+    
+    ('iPhone 14 Pro Max', 10.65, 'plus_max', 'iPhone 14 Series', 'iPhone14ProMax', 'IP 14 Pro Max'),
+    ('iPhone 14 Plus', 10.65, 'plus_max', 'iPhone 14 Series', 'iPhone14Plus', 'IP 14 Plus'),
+    ('iPhone 14 Pro', 9.8, 'regular', 'iPhone 14 Series', 'iPhone14Pro', 'IP 14 Pro'),
+    ('iPhone 14', 9.8, 'regular', 'iPhone 14 Series', 'iPhone14', 'IP 14'),
+    
+    ('iPhone 13 Pro Max', 10.65, 'plus_max', 'iPhone 13 Series', 'iPhone13ProMax', 'IP 13 Pro Max'),
+    ('iPhone 13 Pro', 9.8, 'regular', 'iPhone 13 Series', 'iPhone13Pro', 'IP 13 Pro'),
+    ('iPhone 13', 9.8, 'regular', 'iPhone 13 Series', 'iPhone13', 'IP 13'),
+    ('iPhone 13 mini', 9.0, 'mini', 'iPhone 13 Series', 'iPhone13mini', 'IP 13 mini'),  # CHANGED from 9.5 to 9.0
+    
+    ('iPhone 12 Pro Max', 10.65, 'plus_max', 'iPhone 12 Series', 'iPhone12ProMax', 'IP 12 Pro Max'),
+    ('iPhone 12 Pro', 9.8, 'regular', 'iPhone 12 Series', 'iPhone12Pro', 'IP 12 Pro'),
+    ('iPhone 12', 9.8, 'regular', 'iPhone 12 Series', 'iPhone12', 'IP 12'),
+    ('iPhone 12 mini', 9.0, 'mini', 'iPhone 12 Series', 'iPhone12mini', 'IP 12 mini'),  # CHANGED from 9.5 to 9.0
+    
+    ('iPhone 11 Pro Max', 10.8, 'xs_max', 'iPhone 11 Series', 'iPhone11ProMax', 'IP 11 Pro Max'),  # CHANGED from 10.45 to 10.8
+    ('iPhone 11 Pro', 10.0, 'x_xs', 'iPhone 11 Series', 'iPhone11Pro', 'IP 11 Pro'),              # CHANGED from 11.3 to 10.0
+    ('iPhone 11', 10.5, 'xr11', 'iPhone 11 Series', 'iPhone11', 'IP 11'),                         # CHANGED from 10.2 to 10.5
+    
+    ('iPhone XS Max', 10.7, 'xs_max', 'iPhone X Series', 'iPhoneXSMax', 'IP XS Max'),  # CHANGED from 10.45 to 10.7
+    ('iPhone XS', 8.3, 'x_xs', 'iPhone X Series', 'iPhoneXS', 'IP XS'),                # CHANGED from 11.3 to 8.3
+    ('iPhone XR', 10.5, 'xr11', 'iPhone X Series', 'iPhoneXR', 'IP XR'),               # CHANGED from 10.2 to 10.5
+    ('iPhone X', 8.3, 'x_xs', 'iPhone X Series', 'iPhoneX', 'IP X'),                   # CHANGED from 11.3 to 8.3
+    
+    ('iPhone 8 Plus', 10.8, 'legacy_plus', 'iPhone 8 Series', 'iPhone8Plus', 'IP 8 Plus'),
+    ('iPhone 8', 9.5, 'legacy', 'iPhone 8 Series', 'iPhone8', 'IP 8'),
+    
+    ('iPhone 7 Plus', 10.8, 'legacy_plus', 'iPhone 7 Series', 'iPhone7Plus', 'IP 7 Plus'),
+    ('iPhone 7', 9.5, 'legacy', 'iPhone 7 Series', 'iPhone7', 'IP 7'),
+]
+MODEL_REGISTRY_FOLDER = os.path.join(os.path.expanduser('~'), '.ip_case_proc')
+MODEL_REGISTRY_FILENAMES = ('models.toml', 'models.json')
+
+# Remembered model decisions per filename stem (see ModelDecisionCache): the default file,
+# its format version, the kinds of decision, and how many auto decisions are kept
+MODEL_DECISIONS_PATH = os.path.join(MODEL_REGISTRY_FOLDER, 'model_decisions.json')
+MODEL_DECISIONS_VERSION = 1
+MODEL_DECISION_SOURCES = ('auto', 'manual', 'override')
+MODEL_DECISIONS_MAX_AUTO = 20000
+
+# ===== Phone model detection tables =====
+# COMPREHENSIVE MODEL PATTERNS - UPDATED WITH iPhone 7/8 SERIES
+# Order is CRITICAL - most specific patterns first to avoid false matches
+
+MODEL_PATTERNS = {
+    # ===== iPhone 16 Series =====
+    # Pro Max patterns (must come before Pro)
+    r'(?:i?phone?|iph?|ip|a|apple)?\s*16\s*(?:pro?\s*)?(?:max|mx|pm|prm|promax|promx)': 'iPhone 16 Pro Max',
+    
+    # Plus patterns  
+    r'(?:i?phone?|iph?|ip|a|apple)?\s*16\s*(?:plus|pl|\+|p(?=\s|$))': 'iPhone 16 Plus',
+    
+    # Pro patterns (must come after Pro Max and Plus)
+    r'(?:i?phone?|iph?|ip|a|apple)?\s*16\s*(?:pro?|pr|p)(?!\s*(?:max|mx|plus|pl|\+))': 'iPhone 16 Pro',
+    
+    # Base model - enhanced to handle "iphone16" and "iphone 16"
+    r'(?:i?phone?|iph?|ip|a|apple)?\s*16(?!\d)(?!\s*(?:pro?|pr|p|plus|pl|\+|max|mx))': 'iPhone 16',
+    
+    # ===== iPhone 15 Series =====
+    # Pro Max patterns
+    r'(?:i?phone?|iph?|ip|a|apple)?\s*15\s*(?:pro?\s*)?(?:max|mx|pm|prm|promax|promx)': 'iPhone 15 Pro Max',
+    
+    # Plus patterns
+    r'(?:i?phone?|iph?|ip|a|apple)?\s*15\s*(?:plus|pl|\+|p(?=\s|$))': 'iPhone 15 Plus',
+    
+    # Pro patterns
+    r'(?:i?phone?|iph?|ip|a|apple)?\s*15\s*(?:pro?|pr|p)(?!\s*(?:max|mx|plus|pl|\+))': 'iPhone 15 Pro',
+    
+    # Base model - enhanced to handle "iphone15" and "iphone 15"
+    r'(?:i?phone?|iph?|ip|a|apple)?\s*15(?!\d)(?!\s*(?:pro?|pr|p|plus|pl|\+|max|mx))': 'iPhone 15',
+    
+    # ===== iPhone 14 Series =====
+    # Pro Max patterns
+    r'(?:i?phone?|iph?|ip|a|apple)?\s*14\s*(?:pro?\s*)?(?:max|mx|pm|prm|promax|promx)': 'iPhone 14 Pro Max',
+    
+    # Plus patterns
+    r'(?:i?phone?|iph?|ip|a|apple)?\s*14\s*(?:plus|pl|\+|p(?=\s|$))': 'iPhone 14 Plus',
+    
+    # Pro patterns
+    r'(?:i?phone?|iph?|ip|a|apple)?\s*14\s*(?:pro?|pr|p)(?!\s*(?:max|mx|plus|pl|\+))': 'iPhone 14 Pro',
+    
+    # Base model - enhanced to handle "iphone14" and "iphone 14"
+    r'(?:i?phone?|iph?|ip|a|apple)?\s*14(?!\d)(?!\s*(?:pro?|pr|p|plus|pl|\+|max|mx))': 'iPhone 14',
+    
+    # ===== iPhone 13 Series =====
+    # Pro Max patterns
+    r'(?:i?phone?|iph?|ip|a|apple)?\s*13\s*(?:pro?\s*)?(?:max|mx|pm|prm|promax|promx)': 'iPhone 13 Pro Max',
+    
+    # Pro patterns (must come before base model to avoid conflicts)
+    r'(?:i?phone?|iph?|ip|a|apple)?\s*13\s*(?:pro?|pr|p)(?!\s*(?:max|mx))': 'iPhone 13 Pro',
+    
+    # Mini patterns
+    r'(?:i?phone?|iph?|ip|a|apple)?\s*13\s*(?:mini?|mn|m)(?!\s*(?:ax|x))': 'iPhone 13 mini',
+    
+    # Base model - enhanced to handle "iphone13" and "iphone 13"
+    r'(?:i?phone?|iph?|ip|a|apple)?\s*13(?!\d)(?!\s*(?:pro?|pr|p|mini?|mn|m|max|mx))': 'iPhone 13',
+    
+    # ===== iPhone 12 Series =====
+    # Pro Max patterns
+    r'(?:i?phone?|iph?|ip|a|apple)?\s*12\s*(?:pro?\s*)?(?:max|mx|pm|prm|promax|promx)': 'iPhone 12 Pro Max',
+    
+    # Pro patterns
+    r'(?:i?phone?|iph?|ip|a|apple)?\s*12\s*(?:pro?|pr|p)(?!\s*(?:max|mx))': 'iPhone 12 Pro',
+    
+    # Mini patterns
+    r'(?:i?phone?|iph?|ip|a|apple)?\s*12\s*(?:mini?|mn|m)(?!\s*(?:ax|x))': 'iPhone 12 mini',
+    
+    # Base model - enhanced to handle "iphone12" and "iphone 12"
+    r'(?:i?phone?|iph?|ip|a|apple)?\s*12(?!\d)(?!\s*(?:pro?|pr|p|mini?|mn|m|max|mx))': 'iPhone 12',
+    
+    # ===== iPhone 11 Series =====
+    # Pro Max patterns
+    r'(?:i?phone?|iph?|ip|a|apple)?\s*11\s*(?:pro?\s*)?(?:max|mx|pm|prm|promax|promx)': 'iPhone 11 Pro Max',
+    
+    # Pro patterns
+    r'(?:i?phone?|iph?|ip|a|apple)?\s*11\s*(?:pro?|pr|p)(?!\s*(?:max|mx))': 'iPhone 11 Pro',
+    
+    # Base model - enhanced to handle "iphone11" and "iphone 11"
+    r'(?:i?phone?|iph?|ip|a|apple)?\s*11(?!\d)(?!\s*(?:pro?|pr|p|max|mx))': 'iPhone 11',
+    
+    # ===== iPhone X Series (Handle carefully due to conflicts) =====
+    # XS Max - most specific first
+    r'(?:i?phone?|iph?|ip|a|apple)?\s*xs?\s*(?:max|mx|m)(?!\s*(?:in))': 'iPhone XS Max',
+    
+    # XS (but not XS Max)
+    r'(?:i?phone?|iph?|ip|a|apple)?\s*xs(?!\s*(?:max|mx|m))': 'iPhone XS',
+    
+    # XR
+    r'(?:i?phone?|iph?|ip|a|apple)?\s*xr': 'iPhone XR',
+    
+    # iPhone X (most ambiguous - comes last)
+    # Be very careful here - only match isolated X patterns
+    r'(?:i?phone?|iph?|ip|a|apple)\s*x(?!\w)': 'iPhone X',
+    r'^x$': 'iPhone X',  # Only standalone X
+    
+    # ===== iPhone 8 Series - NEW =====
+    # Plus patterns (must come before base model)
+    r'(?:i?phone?|iph?|ip|a|apple)?\s*8\s*(?:plus|pl|\+|p(?=\s|$))': 'iPhone 8 Plus',
+    
+    # Base model - enhanced to handle "iphone8" and "iphone 8"
+    r'(?:i?phone?|iph?|ip|a|apple)?\s*8(?!\d)(?!\s*(?:plus|pl|\+|p))': 'iPhone 8',
+    
+    # ===== iPhone 7 Series - NEW =====
+    # Plus patterns (must come before base model)
+    r'(?:i?phone?|iph?|ip|a|apple)?\s*7\s*(?:plus|pl|\+|p(?=\s|$))': 'iPhone 7 Plus',
+    
+    # Base model - enhanced to handle "iphone7" and "iphone 7"
+    r'(?:i?phone?|iph?|ip|a|apple)?\s*7(?!\d)(?!\s*(?:plus|pl|\+|p))': 'iPhone 7',
+}
+
+# ===== FALLBACK: Ultra-minimal number-only patterns =====
+# Only trigger if no other pattern matched
+NUMBER_ONLY_PATTERNS = {
+    r'^16$': 'iPhone 16',
+    r'^15$': 'iPhone 15', 
+    r'^14$': 'iPhone 14',
+    r'^13$': 'iPhone 13',
+    r'^12$': 'iPhone 12',
+    r'^11$': 'iPhone 11',
+    r'^8$': 'iPhone 8',    # NEW
+    r'^7$': 'iPhone 7',    # NEW
+}
+
+# Filename normalization used before matching
+ORDER_PREFIX_RE = re.compile(r'^\d+[a-zA-Z]?[-_\s\.]*')
+SEPARATORS_RE = re.compile(r'[-_\s\.]+')
+WHITESPACE_RE = re.compile(r'\s+')
+
+@functools.lru_cache(maxsize=None)
+def get_compiled_model_patterns():
+    """Detection patterns compiled once, on first use (they are most of the import time
+    otherwise) - returns (model patterns, number-only patterns) in priority order"""
+    return ([(re.compile(pattern), model) for pattern, model in MODEL_PATTERNS.items()],
+            [(re.compile(pattern), model) for pattern, model in NUMBER_ONLY_PATTERNS.items()])
+
+def normalize_model_stem(filename):
+    """Reduce a filename to the lowercase, separator-normalized stem that detection works on"""
+    # Remove file extension and convert to lowercase
+    name = os.path.splitext(filename.lower())[0]
+    
+    # Remove order number prefix (including leading zeros and letter suffixes like 3a, 3b)
+    name = ORDER_PREFIX_RE.sub('', name)
+    
+    # Normalize separators - replace any combination of separators with single space
+    name = SEPARATORS_RE.sub(' ', name).strip()
+    
+    # Remove extra whitespace
+    return WHITESPACE_RE.sub(' ', name)
+
+@functools.lru_cache(maxsize=4096)
+def match_model_stem(name):
+    """Return the first-priority model matching a normalized stem (memoized), or None"""
+    # Try to match patterns in order
+    model_patterns, number_only_patterns = get_compiled_model_patterns()
+    for pattern, model in model_patterns:
+        if pattern.search(name):
+            return model
+    
+    for pattern, model in number_only_patterns:
+        if pattern.search(name):
+            return model
+            
+    return None
+
+def reference_detect_phone_model(filename):
+    """Uncompiled, uncached detection exactly as it used to run - kept for benchmarks"""
+    name = os.path.splitext(filename.lower())[0]
+    name = re.sub(r'^\d+[a-zA-Z]?[-_\s\.]*', '', name)
+    name = re.sub(r'[-_\s\.]+', ' ', name).strip()
+    name = re.sub(r'\s+', ' ', name)
+    for pattern, model in dict(MODEL_PATTERNS).items():
+        if re.search(pattern, name):
+            return model
+    for pattern, model in dict(NUMBER_ONLY_PATTERNS).items():
+        if re.search(pattern, name):
+            return model
+    return None
+
+# A model's render inputs at one DPI and width compensation, worked out once per registry
+# and settings change so each render only does a dict lookup
+ModelRenderPlan = collections.namedtuple(
+    'ModelRenderPlan', ['name', 'width_cm', 'target_width_cm', 'target_width_px', 'stem', 'label', 'label_sprite'])
+
+class ModelRegistry:
+    """Every model the app knows, keyed by name - print width, category, series, file stem and label
+    
+    Starts from DEFAULT_MODELS. A registry file can override fields of a built-in model or
+    add new ones; entries for new models may carry detection patterns (regexes matched
+    against the normalized filename stem), which are tried before the built-in patterns.
+    """
+    FIELDS = ('width_cm', 'category', 'series', 'stem', 'label', 'patterns')
+    
+    def __init__(self):
+        self.models = {}
+        self.patterns = []
+        self.source = None
+        for name, width_cm, category, series, stem, label in DEFAULT_MODELS:
+            self.models[name] = {'name': name, 'width_cm': width_cm, 'category': category,
+                                 'series': series, 'stem': stem, 'label': label, 'patterns': []}
+            
+    def __contains__(self, model_name):
+        return model_name in self.models
+        
+    def __getitem__(self, model_name):
+        return self.models[model_name]
+        
+    def add(self, entry):
+        """Add a model or override fields of a known one - raises ValueError if the entry is invalid"""
+        name = str(entry.get('name', '')).strip()
+        if not name:
+            raise ValueError("model entry without a name")
+        unknown = set(entry) - set(self.FIELDS) - {'name'}
+        if unknown:
+            raise ValueError(f"{name}: unknown field(s) {', '.join(sorted(unknown))}")
+        
+        model = self.models.get(name)
+        if model is None:
+            if 'width_cm' not in entry:
+                raise ValueError(f"{name}: a new model needs width_cm")
+            # Same naming as the built-in models, e.g. iPhone 17 Pro -> iPhone17Pro / IP 17 Pro
+            model = {'name': name, 'category': 'custom', 'series': f"{' '.join(name.split()[:2])} Series",
+                     'stem': name.replace(' ', ''), 'label': name.replace('iPhone', 'IP'), 'patterns': []}
+        model = dict(model, **{field: entry[field] for field in self.FIELDS if field in entry})
+        
+        try:
+            model['width_cm'] = float(model['width_cm'])
+        except (TypeError, ValueError):
+            raise ValueError(f"{name}: width_cm must be a number")
+        if model['width_cm'] <= 0:
+            raise ValueError(f"{name}: width_cm must be positive")
+        if isinstance(model['patterns'], str):
+            model['patterns'] = [model['patterns']]
+        try:
+            compiled = [(re.compile(pattern), name) for pattern in model['patterns']]
+        except (TypeError, re.error) as e:
+            raise ValueError(f"{name}: bad detection pattern ({str(e)})")
+        
+        self.models[name] = model
+        self.patterns = [pair for pair in self.patterns if pair[1] != name] + compiled
+        
+    def load(self, path):
+        """Merge a registry file - TOML or JSON with a "models" list of entries
+        
+        Raises ValueError (naming the file) if it can't be read or an entry is invalid.
+        """
+        try:
+            if path.lower().endswith('.toml'):
+                # Optional - TOML needs tomllib (Python 3.11+); JSON always works
+                try:
+                    import tomllib
+                except ImportError:
+                    raise ValueError("reading TOML needs Python 3.11 or newer - use JSON instead")
+                with open(path, 'rb') as f:
+                    data = tomllib.load(f)
+            else:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            # Both decoders' errors are ValueErrors
+            entries = data.get('models') if isinstance(data, dict) else data
+            if not isinstance(entries, list) or not all(isinstance(entry, dict) for entry in entries):
+                raise ValueError('expected a "models" list of tables/objects')
+            for entry in entries:
+                self.add(entry)
+        except (OSError, ValueError) as e:
+            raise ValueError(f"{path}: {str(e)}")
+        self.source = path
+        
+    def match_model_stem(self, name):
+        """Return the first registry-file model whose pattern matches a normalized stem, or None"""
+        for pattern, model in self.patterns:
+            if pattern.search(name):
+                return model
+        return None
+        
+    def get_series(self):
+        """Model names grouped by series, in registry order (for model pickers)"""
+        series = {}
+        for name, model in self.models.items():
+            series.setdefault(model['series'], []).append(name)
+        return series
+
+def find_model_registry_file():
+    """The registry file in MODEL_REGISTRY_FOLDER, or None if there isn't one"""
+    for filename in MODEL_REGISTRY_FILENAMES:
+        path = os.path.join(MODEL_REGISTRY_FOLDER, filename)
+        if os.path.isfile(path):
+            return path
+    return None
+
+def get_decision_stem(name):
+    """The stem a decision is stored under - a filename's detection stem, or a stem as given
+    (with separators normalized)"""
+    if name.lower().endswith(IMAGE_EXTENSIONS):
+        return normalize_model_stem(name)
+    return WHITESPACE_RE.sub(' ', SEPARATORS_RE.sub(' ', name.lower())).strip()
+
+def get_pattern_fingerprint(registry):
+    """Short hash of every detection pattern (built-in and registry file) - changes whenever
+    detection could give a different answer"""
+    import hashlib
+    patterns = [list(MODEL_PATTERNS.items()), list(NUMBER_ONLY_PATTERNS.items()),
+                [(pattern.pattern, model) for pattern, model in registry.patterns]]
+    return hashlib.sha256(json.dumps(patterns).encode('utf-8')).hexdigest()[:16]
+
+class ModelDecisionCache:
+    """Remembers the model decided for each normalized filename stem across runs
+    
+    A decision is 'auto' (detected), 'manual' (picked for a file that couldn't be
+    detected) or 'override' (set in the decision editor, replacing detection). Decisions
+    are looked up before detection, so reprints and re-runs need neither the patterns
+    nor the operator. Auto decisions are dropped when the detection patterns change;
+    manual and override ones stay until edited. Decisions for models that are no longer
+    in the registry are ignored. Saving merges with what other processes saved meanwhile.
+    """
+    def __init__(self, path, fingerprint, entries=None):
+        self.path = path
+        self.fingerprint = fingerprint
+        self.entries = entries or {}
+        self.changed = set()
+        self.lock = threading.Lock()
+        
+    @classmethod
+    def load(cls, path, fingerprint):
+        """Load the decisions saved at path (missing or unreadable means none)"""
+        return cls(path, fingerprint, cls.read_entries(path, fingerprint))
+        
+    @staticmethod
+    def read_entries(path, fingerprint):
+        """Saved decisions, without auto decisions made by a different pattern set"""
+        try:
+            with open(path, encoding='utf-8') as handle:
+                data = json.load(handle)
+            if data.get('version') != MODEL_DECISIONS_VERSION:
+                return {}
+            entries = data.get('entries', {})
+            if data.get('patterns') != fingerprint:
+                entries = {stem: entry for stem, entry in entries.items() if entry['source'] != 'auto'}
+            return entries
+        except (OSError, ValueError, AttributeError, KeyError, TypeError):
+            return {}
+            
+    def lookup(self, stem, registry):
+        """Return (model, source) decided for a stem, or None"""
+        entry = self.entries.get(stem)
+        if entry is None or entry['model'] not in registry:
+            return None
+        return entry['model'], entry['source']
+        
+    def record(self, stem, model_name, source):
+        """Remember a decision - auto decisions never replace manual or override ones"""
+        if not stem:
+            # Number-only names say nothing about the design
+            return
+        with self.lock:
+            entry = self.entries.get(stem)
+            if entry is not None and (source == 'auto' and entry['source'] != 'auto'
+                                      or (entry['model'], entry['source']) == (model_name, source)):
+                return
+            self.entries[stem] = {'model': model_name, 'source': source, 'updated': round(time.time())}
+            self.changed.add(stem)
+            
+    def remove(self, stem):
+        """Forget a decision (the stem is detected again next time)"""
+        with self.lock:
+            if self.entries.pop(stem, None) is not None:
+                self.changed.add(stem)
+                
+    def save(self):
+        """Merge this session's changes into the file and write it atomically"""
+        with self.lock:
+            if not self.changed:
+                return
+            entries = self.read_entries(self.path, self.fingerprint)
+            for stem in self.changed:
+                if stem in self.entries:
+                    entries[stem] = self.entries[stem]
+                else:
+                    entries.pop(stem, None)
+            
+            # Auto decisions can be detected again - keep only the most recent ones
+            auto_stems = [stem for stem, entry in entries.items() if entry['source'] == 'auto']
+            if len(auto_stems) > MODEL_DECISIONS_MAX_AUTO:
+                auto_stems.sort(key=lambda stem: entries[stem]['updated'])
+                for stem in auto_stems[:len(auto_stems) - MODEL_DECISIONS_MAX_AUTO]:
+                    del entries[stem]
+            
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            temp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as handle:
+                json.dump({'version': MODEL_DECISIONS_VERSION, 'patterns': self.fingerprint, 'entries': entries},
+                          handle, indent=1, sort_keys=True)
+            os.replace(temp_path, self.path)
+            self.entries = entries
+            self.changed.clear()
+            
+    def get_rows(self):
+        """Decisions as export rows, sorted by stem"""
+        with self.lock:
+            return [{'stem': stem, 'model': entry['model'], 'source': entry['source'],
+                     'updated': time.strftime('%Y-%m-%d %H:%M', time.localtime(entry['updated']))}
+                    for stem, entry in sorted(self.entries.items())]
+            
+    def export(self, path):
+        """Write the decisions as CSV, or JSON when path ends in .json"""
+        rows = self.get_rows()
+        with open(path, 'w', encoding='utf-8', newline='') as handle:
+            if path.lower().endswith('.json'):
+                json.dump(rows, handle, indent=1)
+            else:
+                writer = csv.DictWriter(handle, fieldnames=('stem', 'model', 'source', 'updated'))
+                writer.writeheader()
+                writer.writerows(rows)
+                
+    def import_rows(self, path, registry):
+        """Apply an edited export (CSV or JSON) - rows with a model become override decisions
+        unless they keep their manual/override source, rows with no model are forgotten.
+        Returns (changed, removed); raises ValueError naming the first bad row"""
+        with open(path, encoding='utf-8', newline='') as handle:
+            rows = json.load(handle) if path.lower().endswith('.json') else list(csv.DictReader(handle))
+        updates = []
+        for line, row in enumerate(rows, 1):
+            stem = get_decision_stem(row.get('stem') or '')
+            model_name = (row.get('model') or '').strip()
+            if not stem or (model_name and model_name not in registry):
+                raise ValueError(f"row {line}: needs a filename stem and a known model (or none to forget it)")
+            source = row.get('source') if row.get('source') in ('manual', 'override') else 'override'
+            updates.append((stem, model_name, source))
+        
+        changed = removed = 0
+        for stem, model_name, source in updates:
+            if not model_name:
+                if stem in self.entries:
+                    removed += 1
+                    self.remove(stem)
+                continue
+            entry = self.entries.get(stem)
+            if entry is None or (entry['model'], entry['source']) != (model_name, source):
+                # An unchanged auto row stays auto - only edited rows become overrides
+                if entry is not None and entry['model'] == model_name and entry['source'] == 'auto':
+                    continue
+                changed += 1
+                self.record(stem, model_name, source)
+        return changed, removed
+
+# Fast decoding for oversized artwork: only used when the source is at least this many
+# times wider than the target, and never decodes below that much detail (quality guard)
+FAST_DECODE_MIN_RATIO = 2
+# Resize reduces by whole factors first while staying this many times above the target
+FAST_DECODE_REDUCING_GAP = 3.0
+# Quality guard tolerance for "bench decode" - worst per-channel mean absolute difference
+# (0-255 levels; saturated 4:2:0 JPEGs drift ~1.5 from scaled chroma decoding, invisible on film)
+FAST_DECODE_TOLERANCE = 2.0
+
+# GUI log view: events are drained every UI_DRAIN_INTERVAL_MS in batches, and the
+# results pane keeps at most LOG_VIEW_MAX_LINES lines (the full log is kept on disk)
+UI_DRAIN_INTERVAL_MS = 100
+UI_DRAIN_MAX_EVENTS = 5000
+LOG_VIEW_MAX_LINES = 2000
+
+# Incremental mode manifest, stored in each output folder
+MANIFEST_FILENAME = '.print_manifest.json'
+MANIFEST_VERSION = 1
+
+# Content-addressed artwork layer cache (bump the version when the layer pipeline changes)
+LAYER_CACHE_VERSION = 1
+LAYER_CACHE_DEFAULT_SIZE_MB = 2048
+LAYER_CACHE_DEFAULT_FOLDER = os.path.join(os.path.expanduser('~'), '.ip_case_proc', 'layer_cache')
+
+# PNG encode settings - balanced is Pillow's default zlib level (the original output)
+ENCODE_PROFILES = {
+    'fast': {'compress_level': 1},
+    'balanced': {},
+    'smallest': {'optimize': True},
+}
+
+# Batch documents for the print RIP - every page of a batch in one file (see
+# BatchDocumentWriter): the formats, the default file name, the GUI choices, the TIFF
+# compressions offered (name -> Pillow compression) and the TIFF PageName tag
+BATCH_DOCUMENT_FORMATS = ('tiff', 'pdf')
+BATCH_DOCUMENT_NAME = 'print_batch'
+BATCH_OUTPUT_CHOICES = {'PNG files': None, 'Multi-page TIFF': 'tiff', 'PDF': 'pdf'}
+TIFF_COMPRESSIONS = {
+    'none': 'raw',
+    'lzw': 'tiff_lzw',
+    'deflate': 'tiff_adobe_deflate',
+    'packbits': 'packbits',
+}
+TIFF_PAGE_NAME_TAG = 285
+
+# Per-file stage timings written to the output folder after each batch (.jsonl or .csv),
+# the stages in report order, and how many entries deep profiles list
+STAGE_PROFILE_FILENAME = '.render_profile'
+RENDER_STAGES = ('detect', 'read', 'load', 'convert', 'resize', 'color', 'flip', 'paste', 'overlays', 'save')
+DEEP_PROFILE_TOP_N = 15
+
+# Colour management - rendering intents by name (ImageCms.Intent values) and the ICC
+# header's data colour space per source mode whose profile can be applied to it directly
+COLOR_INTENTS = {'perceptual': 0, 'relative': 1, 'saturation': 2, 'absolute': 3}
+ICC_SOURCE_SPACES = {'L': b'GRAY', 'CMYK': b'CMYK'}
+
+# Read-ahead for inputs on network shares: files read ahead of the one rendering, the
+# memory they may hold, the reader threads, and the filesystems that count as remote
+PREFETCH_DEFAULT_DEPTH = 4
+PREFETCH_DEFAULT_MEMORY_MB = 512
+PREFETCH_MAX_THREADS = 4
+NETWORK_FILESYSTEMS = ('cifs', 'smb3', 'smbfs', 'nfs', 'nfs4', 'afpfs', 'fuse.sshfs', 'davfs', '9p')
+
+# Hot-folder watching - how long a new file's size and mtime must stay unchanged before it
+# is rendered, how often folders are checked, render attempts per file, how long an empty
+# file is waited for, and how far back to look for missed files if the inotify queue overflows
+WATCH_SETTLE_SEC = 0.75
+WATCH_POLL_INTERVAL_SEC = 0.5
+WATCH_MAX_ATTEMPTS = 3
+WATCH_EMPTY_TIMEOUT_SEC = 120
+WATCH_OVERFLOW_LOOKBACK_SEC = 300
+
+# Job queue for rendering on several hosts (see JobQueue): the default database file, how
+# long a claimed job is leased (renewed while it renders), claims per job before it is
+# failed, how often idle workers look for work, how long to wait for a locked database,
+# and the window status reports throughput over
+JOB_QUEUE_DEFAULT_DB = 'print_queue.db'
+JOB_QUEUE_VERSION = 1
+JOB_LEASE_SEC = 120
+JOB_MAX_ATTEMPTS = 3
+JOB_POLL_INTERVAL_SEC = 2.0
+JOB_QUEUE_BUSY_TIMEOUT_SEC = 30
+JOB_STATUS_WINDOW_SEC = 600
+
+# Film-sheet nesting - default gap between designs, the band above each design that
+# holds its order/model labels, and the sheet list written to the output folder
+NEST_DEFAULT_GUTTER_MM = 3.0
+NEST_LABEL_BAND_PX = 130
+NEST_MANIFEST_FILENAME = 'sheet_manifest.json'
+
+# Dry-run plans - the default plan file (in the output folder), its columns, the formats
+# header reads try first, threads reading headers from network shares, and how many problem
+# files the summary lists
+PLAN_FILENAME = 'print_plan.csv'
+PLAN_FIELDS = ('file', 'order_number', 'model', 'model_source', 'format', 'width_px', 'height_px',
+               'target_width_px', 'target_height_px', 'clipped', 'output', 'status', 'issues')
+PLAN_HEADER_FORMATS = ('PNG', 'JPEG')
+PLAN_HEADER_THREADS = 8
+PLAN_SUMMARY_MAX_FILES = 20
+
+# Modes that can be resized as-is and converted to RGBA afterwards (no alpha to premultiply)
+LATE_CONVERT_MODES = ('RGB', 'L')
+
+# Sources above this many (decoded) pixels are converted and resized in horizontal strips of
+# TILED_RENDER_STRIP_ROWS output rows, so no full-size RGBA copy is ever made (the source
+# itself is still decoded whole)
+TILED_RENDER_MIN_PIXELS = 40_000_000
+TILED_RENDER_STRIP_ROWS = 128
+# Mean per-channel difference allowed between striped and whole-image layers (0-255 levels)
+TILED_RENDER_TOLERANCE = 1.0
+# Modes Pillow stores at one byte per pixel (everything else takes four)
+SINGLE_BYTE_MODES = ('1', 'L', 'P')
+
+# Font file paths to try for overlay text (Windows system fonts)
+OVERLAY_FONT_PATHS = [
+    "C:/Windows/Fonts/arialn.ttf",      # Arial Narrow (thinnest standard font)
+    "C:/Windows/Fonts/calibril.ttf",    # Calibri Light  
+    "C:/Windows/Fonts/segoeuil.ttf",    # Segoe UI Light
+    "C:/Windows/Fonts/arial.ttf",       # Fallback
+]
+
+# Overlay text sizes and colour
+ORDER_FONT_SIZE = 104
+MODEL_FONT_SIZE = 64
+OVERLAY_TEXT_COLOR = '#808080'
+
+# Rendered label bitmaps kept per process (order numbers repeat a lot, model labels ~31)
+LABEL_SPRITE_CACHE_SIZE = 1024
+
+@functools.lru_cache(maxsize=None)
+def load_overlay_fonts():
+    """Resolve and load the overlay fonts once per process - returns (order_font, model_font)"""
+    from PIL import ImageFont
+    
+    # Try to load fonts
+    for font_path in OVERLAY_FONT_PATHS:
+        try:
+            return (ImageFont.truetype(font_path, ORDER_FONT_SIZE),
+                    ImageFont.truetype(font_path, MODEL_FONT_SIZE))
+        except OSError:
+            continue
+    
+    # Fallback to default font if none found
+    try:
+        return ImageFont.load_default(), ImageFont.load_default()
+    except Exception:
+        # Last resort fallback
+        return None, None
+
+def warm_up_render_caches():
+    """Compile the detection patterns and load the overlay fonts ahead of the first render"""
+    get_compiled_model_patterns()
+    load_overlay_fonts()
+
+@functools.lru_cache(maxsize=LABEL_SPRITE_CACHE_SIZE)
+def get_label_sprite(text, font_size):
+    """Rasterize a label once and return (mask, (offset_x, offset_y), text_width)
+    
+    The mask is the glyph coverage draw.text would lay down at the origin, so
+    pasting OVERLAY_TEXT_COLOR through it at (x + offset_x, y + offset_y) gives
+    the same pixels as drawing the text at (x, y).
+    """
+    from PIL import ImageDraw
+    
+    order_font, model_font = load_overlay_fonts()
+    font = order_font if font_size == ORDER_FONT_SIZE else model_font
+    
+    left, top, right, bottom = ImageDraw.Draw(Image.new('L', (1, 1))).textbbox((0, 0), text, font=font)
+    mask = Image.new('L', (max(right - left, 1), max(bottom - top, 1)), 0)
+    ImageDraw.Draw(mask).text((-left, -top), text, fill=255, font=font)
+    return mask, (left, top), right - left
+
+_print_lock = threading.Lock()
+
+def print_log(message):
+    """Default engine log sink - one whole line at a time, safe from background threads"""
+    with _print_lock:
+        sys.stdout.write(message + "\n")
+        sys.stdout.flush()
+
+def get_peak_rss_bytes():
+    """Peak resident memory of this process in bytes, or None where it can't be measured"""
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is kilobytes on Linux, bytes on macOS
+        return peak if sys.platform == 'darwin' else peak * 1024
+    if psutil is not None:
+        # Windows reports the peak working set
+        memory_info = psutil.Process().memory_info()
+        return getattr(memory_info, 'peak_wset', memory_info.rss)
+    return None
+
+def read_image_header(path):
+    """Return (width, height, format) from an image's header without decoding its pixels"""
+    try:
+        with Image.open(path, formats=PLAN_HEADER_FORMATS) as image:
+            return image.width, image.height, image.format
+    except Image.UnidentifiedImageError:
+        # Anything else Pillow can open renders too (e.g. a .png that is really WebP)
+        with Image.open(path) as image:
+            return image.width, image.height, image.format
+
+def hash_file(path, chunk_size=1024 * 1024):
+    """SHA-256 of a file's contents"""
+    import hashlib
+    
+    digest = hashlib.sha256()
+    with open(path, 'rb') as handle:
+        for chunk in iter(lambda: handle.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class RenderManifest:
+    """Records what was rendered into an output folder so unchanged inputs can be skipped
+    
+    Entries are keyed by the input path relative to the batch and hold the input's
+    size, mtime and SHA-256, the model and the render settings used.
+    """
+    def __init__(self, path, entries=None):
+        self.path = path
+        self.entries = entries or {}
+        
+    @classmethod
+    def load(cls, output_folder):
+        """Load the manifest from an output folder (missing or unreadable means empty)"""
+        path = os.path.join(output_folder, MANIFEST_FILENAME)
+        try:
+            with open(path, encoding='utf-8') as handle:
+                data = json.load(handle)
+            if data.get('version') == MANIFEST_VERSION:
+                return cls(path, data.get('entries', {}))
+        except (OSError, ValueError, AttributeError):
+            pass
+        return cls(path)
+        
+    def save(self):
+        """Write the manifest atomically"""
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as handle:
+            json.dump({'version': MANIFEST_VERSION, 'entries': self.entries}, handle, indent=1, sort_keys=True)
+        os.replace(temp_path, self.path)
+        
+    def is_up_to_date(self, key, input_path, model_name, settings, output_path):
+        """True if input_path was already rendered with this model and these settings"""
+        entry = self.entries.get(key)
+        if not entry or entry['model'] != model_name or entry['settings'] != settings:
+            return False
+        if not os.path.exists(output_path):
+            return False
+        
+        stat = os.stat(input_path)
+        if stat.st_size != entry['size']:
+            return False
+        if stat.st_mtime_ns == entry['mtime_ns']:
+            return True
+        
+        # Touched but maybe not changed - fall back to the content hash
+        if hash_file(input_path) != entry['sha256']:
+            return False
+        entry['mtime_ns'] = stat.st_mtime_ns
+        return True
+        
+    def record(self, key, input_path, model_name, settings, output_relpath):
+        """Remember a successful render"""
+        stat = os.stat(input_path)
+        self.entries[key] = {
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'sha256': hash_file(input_path),
+            'model': model_name,
+            'settings': settings,
+            'output': output_relpath,
+        }
+
+class LayerCache:
+    """On-disk, content-addressed cache of flipped and resized artwork layers
+    
+    Keys combine the input's SHA-256 with the target width and resample settings,
+    so the same design printed for many orders is only decoded and resized once.
+    Least recently used entries are evicted once the folder grows past max_size_mb.
+    """
+    def __init__(self, folder, max_size_mb=LAYER_CACHE_DEFAULT_SIZE_MB):
+        self.folder = folder
+        self.max_bytes = max_size_mb * 1024 * 1024
+        self.total_bytes = None
+        
+    def make_key(self, input_hash, target_width_px, resample_settings):
+        """Cache key for one artwork at one print width"""
+        import hashlib
+        
+        key_text = f"{LAYER_CACHE_VERSION}:{input_hash}:{target_width_px}:{resample_settings}"
+        return hashlib.sha256(key_text.encode('utf-8')).hexdigest()
+        
+    def get(self, key):
+        """Return the cached layer for key, or None on a miss"""
+        path = os.path.join(self.folder, key + '.png')
+        try:
+            with Image.open(path) as cached_image:
+                cached_image.load()
+                layer = cached_image if cached_image.mode == 'RGBA' else cached_image.convert('RGBA')
+            # Mark as recently used for eviction
+            os.utime(path)
+            return layer
+        except (OSError, ValueError):
+            return None
+            
+    def put(self, key, layer):
+        """Store a layer, evicting old entries if the cache is over its size limit"""
+        os.makedirs(self.folder, exist_ok=True)
+        path = os.path.join(self.folder, key + '.png')
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            layer.save(temp_path, "PNG", compress_level=1)
+            os.replace(temp_path, path)
+        except OSError:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            return
+        
+        if self.total_bytes is None:
+            self.total_bytes = sum(size for path, size, mtime in self.list_entries())
+        else:
+            self.total_bytes += os.path.getsize(path)
+        if self.total_bytes > self.max_bytes:
+            self.evict()
+            
+    def list_entries(self):
+        """(path, size, mtime) for every cached layer"""
+        entries = []
+        try:
+            with os.scandir(self.folder) as scan:
+                for entry in scan:
+                    if entry.name.endswith('.png'):
+                        try:
+                            stat = entry.stat()
+                        except OSError:
+                            continue
+                        entries.append((entry.path, stat.st_size, stat.st_mtime))
+        except OSError:
+            pass
+        return entries
+        
+    def evict(self):
+        """Remove least recently used layers until the cache fits in max_bytes"""
+        entries = sorted(self.list_entries(), key=lambda entry: entry[2])
+        self.total_bytes = sum(size for path, size, mtime in entries)
+        for path, size, mtime in entries:
+            if self.total_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                # Another worker may have evicted it already
+                pass
+            self.total_bytes -= size
+
+def iter_image_files(input_folder):
+    """Yield (file_path, relative_folder, filename) for images under input_folder as they are found
+    
+    Uses os.scandir and visits folders in the same order as os.walk (each folder's
+    files first, then its subfolders), so the first job is available immediately.
+    Output folders are skipped - renders land in them while the walk is still running.
+    """
+    pending_folders = [input_folder]
+    while pending_folders:
+        folder = pending_folders.pop()
+        try:
+            with os.scandir(folder) as scan:
+                entries = list(scan)
+        except OSError:
+            # Unreadable folders are skipped, like os.walk does
+            continue
+        
+        subfolders = []
+        relative_path = os.path.relpath(folder, input_folder)
+        for entry in entries:
+            try:
+                is_folder = entry.is_dir()
+            except OSError:
+                is_folder = False
+            if is_folder:
+                # Like os.walk, don't follow symlinked folders
+                if not entry.is_symlink() and not is_output_folder_name(entry.name):
+                    subfolders.append(entry.path)
+            elif entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                yield entry.path, relative_path, entry.name
+        
+        pending_folders.extend(reversed(subfolders))
+
+class FolderScanner:
+    """Discovers a folder's images on a background thread and hands them out in order
+    
+    found grows while the scan runs; finished turns True once the whole tree is walked.
+    """
+    def __init__(self, input_folder, on_finished=None):
+        self.input_folder = input_folder
+        self.on_finished = on_finished
+        self.found = 0
+        self.finished = False
+        self.jobs = queue.Queue()
+        self.thread = threading.Thread(target=self.scan, daemon=True)
+        self.thread.start()
+        
+    def scan(self):
+        """Background thread - walk the folder and queue each image"""
+        try:
+            for job in iter_image_files(self.input_folder):
+                self.found += 1
+                self.jobs.put(job)
+        finally:
+            self.finished = True
+            self.jobs.put(None)
+            if self.on_finished:
+                self.on_finished(self.found)
+                
+    def __iter__(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                return
+            yield job
+            
+    def known_total(self):
+        """(images found so far, whether the scan is complete)"""
+        return self.found, self.finished
+
+def is_network_path(path):
+    """True if path is on a network share - a UNC path or mapped network drive on Windows,
+    a network filesystem mount elsewhere"""
+    path = os.path.abspath(path)
+    if os.name == 'nt':
+        if path.startswith('\\\\'):
+            return True
+        import ctypes
+        return ctypes.windll.kernel32.GetDriveTypeW(os.path.splitdrive(path)[0] + '\\') == 4  # DRIVE_REMOTE
+    
+    # The longest mount point containing the path decides its filesystem
+    try:
+        with open('/proc/mounts', encoding='utf-8') as f:
+            mounts = [line.split()[1:3] for line in f]
+    except OSError:
+        return False
+    best_mount, best_type = '', ''
+    for mount_point, fs_type in mounts:
+        mount_point = mount_point.replace('\\040', ' ')
+        inside = path == mount_point or path.startswith(mount_point.rstrip('/') + '/')
+        if inside and len(mount_point) > len(best_mount):
+            best_mount, best_type = mount_point, fs_type
+    return best_type in NETWORK_FILESYSTEMS
+
+class InputPrefetcher:
+    """Reads the next few input files into memory on background threads while the current one renders
+    
+    A feeder thread pulls jobs in batch order (so slow discovery doesn't hold up a render)
+    and starts reading each one, at most depth ahead of the job being rendered. Read-but-
+    unrendered bytes stay under max_bytes: a read waits for earlier files to be handed out
+    when it doesn't fit, except for the next file to render (and files bigger than the
+    cap), which are left for the render to read itself.
+    """
+    def __init__(self, jobs, depth, max_bytes, threads=PREFETCH_MAX_THREADS):
+        import concurrent.futures
+        
+        self.max_bytes = max_bytes
+        self.buffered_bytes = 0
+        self.next_index = 0  # the job the render loop is waiting for
+        self.room = threading.Condition()
+        self.slots = threading.Semaphore(depth)
+        self.stopped = False
+        self.ready = queue.Queue()  # (job, future of its bytes) in batch order, then None
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=max(1, min(depth, threads)),
+                                                              thread_name_prefix='prefetch')
+        self.thread = threading.Thread(target=self.feed, args=(jobs,), daemon=True)
+        self.thread.start()
+        
+    def feed(self, jobs):
+        """Background thread - start reading each job's file once a read-ahead slot is free"""
+        try:
+            for index, job in enumerate(jobs):
+                self.slots.acquire()
+                if self.stopped:
+                    return
+                self.ready.put((job, self.executor.submit(self.read, job[0], index)))
+        except Exception as e:
+            # Handed to the render loop, which raises it as if it had iterated the jobs itself
+            self.ready.put((e, None))
+        finally:
+            self.ready.put(None)
+            
+    def read(self, path, index):
+        """Reader thread - return the file's bytes, or None if it is left for the render to read"""
+        try:
+            size = os.path.getsize(path)
+            with self.room:
+                while self.buffered_bytes + size > self.max_bytes:
+                    if size > self.max_bytes or index <= self.next_index or self.stopped:
+                        return None
+                    self.room.wait()
+                self.buffered_bytes += size
+            try:
+                with open(path, 'rb') as f:
+                    data = f.read()
+            except OSError:
+                self.release(size)
+                raise
+            # The file may have changed size since it was measured
+            self.release(size - len(data))
+            return data
+        except OSError:
+            # The render reads the file itself and reports the error
+            return None
+            
+    def release(self, size):
+        """Return size bytes of the memory cap and wake readers waiting for room"""
+        with self.room:
+            self.buffered_bytes -= size
+            self.room.notify_all()
+            
+    def __iter__(self):
+        """Yield (job, bytes or None, seconds spent waiting for the read) in batch order"""
+        try:
+            index = 0
+            while True:
+                item = self.ready.get()
+                if item is None:
+                    return
+                job, future = item
+                if future is None:
+                    raise job  # the feeder failed - job is its exception
+                
+                # A read still waiting for room gives up now that its file is the next one
+                with self.room:
+                    self.next_index = index
+                    self.room.notify_all()
+                start_time = time.perf_counter()
+                data = future.result()
+                wait = time.perf_counter() - start_time
+                if data is not None:
+                    self.release(len(data))
+                self.slots.release()
+                index += 1
+                yield job, data, wait
+                del data
+        finally:
+            self.close()
+            
+    def close(self):
+        """Stop reading ahead and drop anything not yet handed out"""
+        self.stopped = True
+        self.slots.release()
+        with self.room:
+            self.room.notify_all()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+def match_filename_pattern(filename, pattern):
+    """True if a filename matches a case-insensitive wildcard pattern such as "*_custom*" """
+    return fnmatch.fnmatch(filename.lower(), pattern.strip().lower() or '*')
+
+def match_jobs_by_pattern(jobs, pattern):
+    """Indices of (file_path, relative_folder, filename) jobs whose filename matches a
+    case-insensitive wildcard pattern such as "*_custom*" """
+    return [index for index, job in enumerate(jobs) if match_filename_pattern(job[2], pattern)]
+
+def is_output_folder_name(name):
+    """True for folders this tool writes into, which watchers and scans of an inbox skip"""
+    return name.endswith(" (PRINT MODE)") or name == "PRINT_MODE_OUTPUT"
+
+class PollingEvents:
+    """Portable change source for hot folders - each poll re-lists only the folders whose
+    modification time changed, so the whole tree is never rescanned"""
+    def __init__(self, folders):
+        self.folders = {}  # folder -> (mtime_ns, entry names)
+        for folder in folders:
+            self.add_tree(folder)
+            
+    def add_tree(self, folder):
+        """Start tracking folder and its subfolders, returning the files already inside"""
+        files = []
+        for root, dirs, filenames in os.walk(folder):
+            dirs[:] = [name for name in dirs if not is_output_folder_name(name)]
+            try:
+                self.folders[root] = (os.stat(root).st_mtime_ns, set(dirs) | set(filenames))
+            except OSError:
+                continue
+            files.extend(os.path.join(root, filename) for filename in filenames)
+        return files
+        
+    def poll(self, timeout):
+        """Wait timeout seconds and return paths of files that appeared since the last poll"""
+        time.sleep(timeout)
+        changed = []
+        for folder, (mtime_ns, names) in list(self.folders.items()):
+            try:
+                current_mtime_ns = os.stat(folder).st_mtime_ns
+                if current_mtime_ns == mtime_ns:
+                    continue
+                with os.scandir(folder) as scan:
+                    entries = list(scan)
+            except OSError:
+                # Folder removed - forget it (its subfolders fail the same way)
+                self.folders.pop(folder, None)
+                continue
+            
+            self.folders[folder] = (current_mtime_ns, {entry.name for entry in entries})
+            for entry in entries:
+                if entry.name in names:
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    if not is_output_folder_name(entry.name):
+                        changed.extend(self.add_tree(entry.path))
+                else:
+                    changed.append(entry.path)
+        return changed
+        
+    def close(self):
+        self.folders.clear()
+
+class InotifyEvents:
+    """Linux inotify change source for hot folders (through libc, no extra packages)
+    
+    Raises OSError where inotify isn't available so callers can fall back to polling.
+    """
+    IN_MODIFY = 0x2
+    IN_CLOSE_WRITE = 0x8
+    IN_MOVED_TO = 0x80
+    IN_CREATE = 0x100
+    IN_Q_OVERFLOW = 0x4000
+    IN_IGNORED = 0x8000
+    IN_ISDIR = 0x40000000
+    WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+    EVENT_HEADER = struct.Struct('iIII')
+    
+    def __init__(self, folders):
+        if not sys.platform.startswith('linux'):
+            raise OSError("inotify is only available on Linux")
+        import ctypes
+        import ctypes.util
+        
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_CLOEXEC | os.O_NONBLOCK)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.watches = {}  # watch descriptor -> folder
+        self.overflowed = False
+        for folder in folders:
+            self.add_tree(folder)
+            
+    def add_tree(self, folder):
+        """Watch folder and its subfolders, returning the files already inside"""
+        files = []
+        for root, dirs, filenames in os.walk(folder):
+            dirs[:] = [name for name in dirs if not is_output_folder_name(name)]
+            watch = self.libc.inotify_add_watch(self.fd, os.fsencode(root), self.WATCH_MASK)
+            if watch >= 0:
+                self.watches[watch] = root
+            files.extend(os.path.join(root, filename) for filename in filenames)
+        return files
+        
+    def poll(self, timeout):
+        """Wait up to timeout seconds and return paths of files created or written since the last poll"""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return []
+        try:
+            data = os.read(self.fd, 256 * 1024)
+        except BlockingIOError:
+            return []
+        
+        changed = []
+        offset = 0
+        while offset + self.EVENT_HEADER.size <= len(data):
+            watch, mask, cookie, name_length = self.EVENT_HEADER.unpack_from(data, offset)
+            offset += self.EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + name_length].rstrip(b'\0'))
+            offset += name_length
+            
+            if mask & self.IN_Q_OVERFLOW:
+                # Events were dropped - the watcher looks for recent files itself
+                self.overflowed = True
+                continue
+            if mask & self.IN_IGNORED:
+                self.watches.pop(watch, None)
+                continue
+            folder = self.watches.get(watch)
+            if folder is None or not name:
+                continue
+            path = os.path.join(folder, name)
+            if not mask & self.IN_ISDIR:
+                changed.append(path)
+            elif mask & (self.IN_CREATE | self.IN_MOVED_TO) and not is_output_folder_name(name):
+                # Files can land in a new folder before its watch exists - pick them up now
+                changed.extend(self.add_tree(path))
+        return changed
+        
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+def pack_film_sheets(items, sheet_width, sheet_height, gutter):
+    """Shelf-pack items (dicts with 'width' and 'height') onto as few sheets as possible
+    
+    Returns a list of sheets, each a list of (item, x, y) placements inside a
+    sheet_width x sheet_height area. Tallest items go first and each takes the first
+    shelf with room for it (first-fit decreasing height) - a single fast pass that
+    packs well for the handful of case sizes a batch contains. Items too big for an
+    empty sheet are left out for the caller to render on their own.
+    """
+    sheets = []
+    for item in sorted(items, key=lambda item: (-item['height'], -item['width'])):
+        width, height = item['width'], item['height']
+        if width > sheet_width or height > sheet_height:
+            continue
+        
+        placed = False
+        for sheet in sheets:
+            for shelf in sheet['shelves']:
+                if height <= shelf['height'] and shelf['x'] + width <= sheet_width:
+                    sheet['placements'].append((item, shelf['x'], shelf['y']))
+                    shelf['x'] += width + gutter
+                    placed = True
+                    break
+            if not placed and sheet['next_y'] + height <= sheet_height:
+                # Open a new shelf below the last one
+                sheet['shelves'].append({'y': sheet['next_y'], 'height': height, 'x': width + gutter})
+                sheet['placements'].append((item, 0, sheet['next_y']))
+                sheet['next_y'] += height + gutter
+                placed = True
+            if placed:
+                break
+        
+        if not placed:
+            sheets.append({'shelves': [{'y': 0, 'height': height, 'x': width + gutter}],
+                           'placements': [(item, 0, 0)], 'next_y': height + gutter})
+    return [sheet['placements'] for sheet in sheets]
+
+def summarize_stage_timings(rows):
+    """Per-stage (count, p50, p95, max) seconds from per-file timing rows (nearest-rank percentiles)"""
+    summary = {}
+    for stage in RENDER_STAGES:
+        values = sorted(row[stage] for row in rows if stage in row)
+        if not values:
+            continue
+        p50 = values[max(0, math.ceil(len(values) * 0.50) - 1)]
+        p95 = values[max(0, math.ceil(len(values) * 0.95) - 1)]
+        summary[stage] = (len(values), p50, p95, values[-1])
+    return summary
+
+class OutputWriter:
+    """Encodes and writes rendered canvases, optionally on background threads
+    
+    Files are written to a temporary name and renamed into place, so a crash never
+    leaves a half-written PNG behind. Folders are created once per writer.
+    """
+    def __init__(self, encode_profile='balanced', threads=2, queue_size=4, log=print):
+        self.encode_profile = encode_profile
+        self.save_options = ENCODE_PROFILES[encode_profile]
+        self.log = log
+        self.created_folders = set()
+        self.folders_lock = threading.Lock()
+        
+        # Bounded hand-off: the render loop blocks once queue_size canvases are waiting
+        self.slots = threading.BoundedSemaphore(queue_size + threads)
+        self.executor = None
+        self.threads = threads
+        
+    def ensure_folder(self, folder):
+        """Create an output folder the first time it is used"""
+        with self.folders_lock:
+            if folder in self.created_folders:
+                return
+            os.makedirs(folder, exist_ok=True)
+            self.created_folders.add(folder)
+            
+    def write(self, image, output_path, timings=None):
+        """Encode and atomically write one PNG - returns True on success
+        
+        The time taken is recorded as timings['save'] when a timings dict is given.
+        """
+        output_filename = os.path.basename(output_path)
+        temp_path = os.path.join(os.path.dirname(output_path),
+                                 f".{output_filename}.{os.getpid()}.{threading.get_ident()}.tmp")
+        start_time = time.perf_counter()
+        try:
+            image.save(temp_path, "PNG", **self.save_options)
+            os.replace(temp_path, output_path)
+            if timings is not None:
+                timings['save'] = time.perf_counter() - start_time
+            self.log(f"Saved: {output_filename}")
+            return True
+        except Exception as e:
+            self.log(f"Error saving {output_filename}: {str(e)}")
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            return False
+            
+    def submit(self, image, output_path, timings=None):
+        """Queue a write on the writer threads and return its Future (resolves to True/False)"""
+        if self.executor is None:
+            import concurrent.futures
+            self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.threads,
+                                                                  thread_name_prefix='png-writer')
+        self.slots.acquire()
+        try:
+            future = self.executor.submit(self.write, image, output_path, timings)
+        except Exception:
+            self.slots.release()
+            raise
+        future.add_done_callback(lambda done: self.slots.release())
+        return future
+        
+    def close(self):
+        """Wait for queued writes to finish and stop the writer threads"""
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+        # Folders may be removed between batches - check them again next time
+        with self.folders_lock:
+            self.created_folders.clear()
+
+def get_png_idat(image, save_options=None):
+    """Encode an RGB or L image as PNG and return its joined IDAT chunks - a zlib stream of
+    PNG-filtered scanlines that a PDF Flate filter with /Predictor 15 decodes as is"""
+    buffer = io.BytesIO()
+    image.save(buffer, "PNG", **(save_options or {}))
+    data = buffer.getbuffer()
+    chunks = []
+    position = 8
+    while position < len(data):
+        length, kind = struct.unpack('>I4s', data[position:position + 8])
+        if kind == b'IDAT':
+            chunks.append(bytes(data[position + 8:position + 8 + length]))
+        position += 12 + length
+    del data
+    return b''.join(chunks)
+
+def pdf_text_string(text):
+    """A PDF text string (UTF-16 hex) for any name"""
+    return '<FEFF' + text.encode('utf-16-be').hex().upper() + '>'
+
+class BatchDocumentWriter(OutputWriter, abc.ABC):
+    """Appends rendered canvases as pages of one batch document instead of one PNG each
+    
+    A single writer thread keeps pages in the order they are written, and each page goes
+    to disk as soon as it is encoded. The document is built under a temporary name and
+    renamed into place by finish(); if any page fails, the whole document is discarded.
+    """
+    extension = None
+    
+    def __init__(self, document_path, encode_profile='balanced', dpi=300, queue_size=4, log=print):
+        super().__init__(encode_profile, threads=1, queue_size=queue_size, log=log)
+        self.document_path = document_path
+        self.temp_path = os.path.join(os.path.dirname(document_path),
+                                      f".{os.path.basename(document_path)}.{os.getpid()}.tmp")
+        self.dpi = dpi
+        self.file = None
+        self.pages = []
+        self.failed = False
+        
+    def ensure_folder(self, folder):
+        """Pages don't go into folders - only the document's own folder is needed"""
+        
+    def write(self, image, output_path, timings=None):
+        """Append one page, named after the file the canvas would have been saved as"""
+        page_name = os.path.splitext(os.path.basename(output_path))[0]
+        if self.failed:
+            # The document will be discarded - don't spend time encoding the rest
+            return False
+        start_time = time.perf_counter()
+        try:
+            if self.file is None:
+                os.makedirs(os.path.dirname(self.temp_path), exist_ok=True)
+                self.file = open(self.temp_path, 'w+b')
+                self.start_document()
+            self.write_page(image, page_name)
+            self.pages.append(page_name)
+            if timings is not None:
+                timings['save'] = time.perf_counter() - start_time
+            self.log(f"Page {len(self.pages)}: {page_name}")
+            return True
+        except Exception as e:
+            # The document may hold half a page now - it is discarded by finish()
+            self.failed = True
+            self.log(f"Error adding page {page_name}: {str(e)}")
+            return False
+            
+    def finish(self):
+        """Wait for queued pages, complete the document and move it into place -
+        returns its path, or None if there were no pages or one failed"""
+        self.close()
+        if self.file is None:
+            return None
+        try:
+            if self.failed:
+                raise OSError("a page could not be written")
+            self.finish_document()
+            self.file.close()
+            os.replace(self.temp_path, self.document_path)
+            return self.document_path
+        except Exception as e:
+            self.log(f"Error saving {os.path.basename(self.document_path)}: {str(e)}")
+            self.file.close()
+            try:
+                os.remove(self.temp_path)
+            except OSError:
+                pass
+            return None
+        finally:
+            self.file = None
+            
+    def start_document(self):
+        """Write whatever comes before the first page"""
+        
+    @abc.abstractmethod
+    def write_page(self, image, page_name):
+        """Append one page to the open document"""
+        
+    def finish_document(self):
+        """Write whatever comes after the last page"""
+        
+class TiffBatchWriter(BatchDocumentWriter):
+    """Multi-page TIFF - one frame per canvas, tagged with its DPI and page name"""
+    extension = '.tif'
+    
+    def __init__(self, document_path, compression='lzw', **kwargs):
+        super().__init__(document_path, **kwargs)
+        self.compression = TIFF_COMPRESSIONS[compression]
+        self.tiff = None
+        
+    def start_document(self):
+        from PIL import TiffImagePlugin
+        self.tiff = TiffImagePlugin.AppendingTiffWriter(self.file, new=True)
+        
+    def write_page(self, image, page_name):
+        image.save(self.tiff, "TIFF", compression=self.compression, dpi=(self.dpi, self.dpi),
+                   tiffinfo={TIFF_PAGE_NAME_TAG: page_name})
+        self.tiff.newFrame()
+        
+    def finish_document(self):
+        self.tiff.close()
+        
+class PdfBatchWriter(BatchDocumentWriter):
+    """PDF - one page per canvas at its print size, transparency kept as a soft mask and a
+    bookmark per page
+    
+    Pixels are stored losslessly as the Flate streams Pillow's PNG encoder produces, so a
+    page costs about what its PNG would. Objects are written as each page arrives; the page
+    tree, bookmarks and cross-reference table follow the last page.
+    """
+    extension = '.pdf'
+    
+    def start_document(self):
+        # Object 1 is the catalog and 2 the page tree - both written by finish_document()
+        self.offsets = {}
+        self.object_count = 2
+        self.page_objects = []
+        self.icc_objects = {}
+        self.file.write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+        
+    def add_object(self, entries, stream=None, number=None):
+        """Write one dictionary object (with its stream, if any) and return its number"""
+        if number is None:
+            self.object_count += 1
+            number = self.object_count
+        self.offsets[number] = self.file.tell()
+        if stream is None:
+            self.file.write(f"{number} 0 obj\n<< {entries} >>\nendobj\n".encode('ascii'))
+        else:
+            self.file.write(f"{number} 0 obj\n<< {entries} /Length {len(stream)} >>\nstream\n".encode('ascii'))
+            self.file.write(stream)
+            self.file.write(b'\nendstream\nendobj\n')
+        return number
+        
+    def write_page(self, image, page_name):
+        width, height = image.size
+        image_entries = f"/Type /XObject /Subtype /Image /Width {width} /Height {height} /BitsPerComponent 8"
+        soft_mask = ''
+        if 'A' in image.getbands():
+            alpha = self.add_object(f"{image_entries} /ColorSpace /DeviceGray {self.get_flate_entries(width, 1)}",
+                                    get_png_idat(image.getchannel('A'), self.save_options))
+            soft_mask = f" /SMask {alpha} 0 R"
+        
+        # Colour-managed canvases carry the output profile - embed it once for every page
+        color_space = "/DeviceRGB"
+        icc_profile = image.info.get('icc_profile')
+        if icc_profile and icc_profile[16:20] == b'RGB ':
+            if icc_profile not in self.icc_objects:
+                self.icc_objects[icc_profile] = self.add_object("/N 3 /Alternate /DeviceRGB", icc_profile)
+            color_space = f"[/ICCBased {self.icc_objects[icc_profile]} 0 R]"
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        pixels = self.add_object(f"{image_entries} /ColorSpace {color_space}{soft_mask} "
+                                 f"{self.get_flate_entries(width, 3)}",
+                                 get_png_idat(image, self.save_options))
+        del image
+        
+        # Page size in points (1/72 inch) so the page prints at the render DPI
+        page_width = f"{width * 72 / self.dpi:.2f}"
+        page_height = f"{height * 72 / self.dpi:.2f}"
+        contents = self.add_object("", f"q {page_width} 0 0 {page_height} 0 0 cm /Im0 Do Q".encode('ascii'))
+        self.page_objects.append(self.add_object(
+            f"/Type /Page /Parent 2 0 R /MediaBox [0 0 {page_width} {page_height}] "
+            f"/Resources << /XObject << /Im0 {pixels} 0 R >> >> /Contents {contents} 0 R"))
+        
+    def get_flate_entries(self, width, colors):
+        """Stream filter entries for PNG-predicted 8-bit pixels"""
+        return (f"/Filter /FlateDecode /DecodeParms << /Predictor 15 /Colors {colors} "
+                f"/BitsPerComponent 8 /Columns {width} >>")
+        
+    def finish_document(self):
+        # Bookmarks - one per page, titled with its name
+        count = len(self.page_objects)
+        outlines = self.object_count + 1
+        items = [outlines + 1 + index for index in range(count)]
+        self.add_object(f"/Type /Outlines /First {items[0]} 0 R /Last {items[-1]} 0 R /Count {count}")
+        for index, (item, page, page_name) in enumerate(zip(items, self.page_objects, self.pages)):
+            links = f" /Prev {items[index - 1]} 0 R" if index > 0 else ""
+            links += f" /Next {items[index + 1]} 0 R" if index + 1 < count else ""
+            self.add_object(f"/Title {pdf_text_string(page_name)} /Parent {outlines} 0 R{links} "
+                            f"/Dest [{page} 0 R /Fit]")
+        
+        kids = ' '.join(f"{page} 0 R" for page in self.page_objects)
+        self.add_object(f"/Type /Pages /Kids [{kids}] /Count {count}", number=2)
+        self.add_object(f"/Type /Catalog /Pages 2 0 R /Outlines {outlines} 0 R /PageMode /UseOutlines", number=1)
+        
+        xref_offset = self.file.tell()
+        lines = [f"xref\n0 {self.object_count + 1}\n", "0000000000 65535 f \n"]
+        lines += [f"{self.offsets[number]:010d} 00000 n \n" for number in range(1, self.object_count + 1)]
+        lines.append(f"trailer\n<< /Size {self.object_count + 1} /Root 1 0 R >>\n"
+                     f"startxref\n{xref_offset}\n%%EOF\n")
+        self.file.write(''.join(lines).encode('ascii'))
+
+class PrintFilmEngine:
+    """GUI-free rendering pipeline shared by the Tk application and the command line"""
+    def __init__(self, log=None):
+        # Where log output goes - the GUI passes its results pane, the CLI uses stdout
+        self.log = log or print_log
+        
+        # Render processes for batch jobs (1 = render in-process, 0 = one per CPU core)
+        self.workers = 1
+        
+        # Draft/reduce-first decoding for artwork much larger than the print width
+        self.fast_decode = True
+        
+        # Skip inputs whose output is already up to date (see RenderManifest)
+        self.incremental = False
+        
+        # Set undetected files aside for one review at the end instead of asking per file,
+        # and the models assigned to them at review (input path -> model name)
+        self.defer_undetected = False
+        self.model_overrides = {}
+        
+        # On-disk artwork layer cache for duplicate designs (None = disabled)
+        self.layer_cache_folder = None
+        self.layer_cache_size_mb = LAYER_CACHE_DEFAULT_SIZE_MB
+        self.layer_cache = None
+        
+        # Estimated render memory allowed in flight across workers (0 = no limit)
+        self.memory_budget_mb = 0
+        
+        # Read upcoming inputs into memory while rendering ('auto' = only from network
+        # shares, 'on', 'off'), how many files ahead and how much memory they may hold.
+        # job_input is the current job's (path, bytes) when it was read ahead
+        self.prefetch = 'auto'
+        self.prefetch_depth = PREFETCH_DEFAULT_DEPTH
+        self.prefetch_memory_mb = PREFETCH_DEFAULT_MEMORY_MB
+        self.job_input = None
+        
+        # Pack several small designs onto one film sheet where their sizes allow
+        self.nest_sheets = False
+        self.nest_gutter_mm = NEST_DEFAULT_GUTTER_MM
+        
+        # Added to the names of the run files a review pass writes, so they sit beside the
+        # main pass's instead of replacing them ('' for the main pass)
+        self.pass_suffix = ''
+        
+        # Per-job measurements (merged into the batch summary), the most render processes
+        # the batch actually kept busy, and the reusable blank canvas
+        self.job_stats = {}
+        self.batch_stats = {}
+        self.batch_workers = 1
+        
+        # Wall time per render stage for the current job, every job's timings for the batch,
+        # the profile file format ('jsonl', 'csv' or None) and the opt-in deep profiler
+        # ('cprofile' or 'tracemalloc' - renders then stay in this process)
+        self.job_timings = {}
+        self.batch_timings = []
+        self.profile_format = 'jsonl'
+        self.deep_profile = None
+        
+        # PNG encoding - profile name from ENCODE_PROFILES, and background writer threads
+        # used by single-process batches so encoding overlaps the next render
+        self.encode_profile = 'balanced'
+        self.writer_threads = 2
+        self.writer = None
+        self.pipeline_writes = False
+        self.job_write = None
+        self.canvas_template = None
+        
+        # Colour management (None = plain conversion): the printer's RGB output profile (ICC
+        # bytes) and its name and digest, the rendering intent, and the transforms built so
+        # far per (source profile, output profile, intent, modes)
+        self.output_profile = None
+        self.output_profile_name = None
+        self.output_profile_id = None
+        self.color_intent = 'perceptual'
+        self.color_transforms = {}
+        
+        # Stream a batch into one multi-page document instead of PNGs ('tiff', 'pdf' or None),
+        # its TIFF compression and file name, and the writer while a batch is running
+        self.batch_document = None
+        self.tiff_compression = 'lzw'
+        self.document_name = BATCH_DOCUMENT_NAME
+        self.document_writer = None
+        
+        # Model widths, file stems and labels (see load_model_registry), and the per-model
+        # render plans derived from them at the current DPI and compensation
+        self.registry = ModelRegistry()
+        self.render_plans = {}
+        self.render_plans_key = None
+        
+        # Remembered model decisions per filename stem (None = don't remember), loaded
+        # for the current registry on first use - under the lock, since the read-ahead
+        # feeder thread detects models while the render thread does
+        self.model_decisions_path = None
+        self.model_decisions = None
+        self.model_decisions_key = None
+        self.model_decisions_lock = threading.RLock()
+        
+        # Print film specifications - Portrait orientation
+        self.film_width_cm = 14.8
+        self.film_height_cm = 25.5
+        self.dpi = 300
+        
+        # Added to every model width to compensate for the printer's systematic offset
+        self.width_compensation_cm = 0.3
+        
+        # Convert cm to pixels at 300 DPI with proper rounding (FIXED)
+        self.film_width_px = round(self.film_width_cm * self.dpi / 2.54)
+        self.film_height_px = round(self.film_height_cm * self.dpi / 2.54)
+        
+    def log_message(self, message):
+        """Send a message to the configured log sink"""
+        self.log(message)
+        
+    def extract_order_number(self, filename):
+        """Extract order number from filename (supports letter suffixes like 3a, 3b, 3c)"""
+        # Remove file extension
+        name = os.path.splitext(filename)[0]
+        
+        # Look for leading digits optionally followed by a letter (e.g., 3, 3a, 3b, 3c)
+        match = re.match(r'^(\d+[a-zA-Z]?)', name)
+        if match:
+            return match.group(1)  # Return as string to preserve letter suffix
+        
+        return None
+        
+    def detect_phone_model(self, filename):
+        """Auto-detect phone model from filename using comprehensive fuzzy matching - UPDATED WITH NEW MODELS"""
+        return self.decide_phone_model(filename)[0]
+        
+    def decide_phone_model(self, filename, record=True):
+        """Return (model, source) for a filename - a remembered decision ('auto', 'manual' or
+        'override') if there is one, otherwise detection ('auto'), or (None, None)
+        
+        record=False only looks decisions up, leaving the cache unchanged.
+        """
+        name = normalize_model_stem(filename)
+        decisions = self.get_model_decisions()
+        if decisions is not None:
+            decision = decisions.lookup(name, self.registry)
+            if decision is not None:
+                return decision
+        
+        # Patterns are compiled once and results memoized per normalized stem; models added
+        # by a registry file are tried first
+        model_name = self.registry.match_model_stem(name) or match_model_stem(name)
+        if model_name is None:
+            return None, None
+        if decisions is not None and record:
+            decisions.record(name, model_name, 'auto')
+        return model_name, 'auto'
+        
+    def get_model_decisions(self):
+        """The decision cache for the current registry, or None when decisions aren't remembered"""
+        if not self.model_decisions_path:
+            return None
+        decisions_key = (self.model_decisions_path, self.registry)
+        with self.model_decisions_lock:
+            if self.model_decisions_key != decisions_key:
+                # A different registry can detect differently - reload against its patterns
+                self.save_model_decisions()
+                self.model_decisions = ModelDecisionCache.load(self.model_decisions_path,
+                                                               get_pattern_fingerprint(self.registry))
+                self.model_decisions_key = decisions_key
+            return self.model_decisions
+        
+    def record_model_decision(self, filename, model_name, source='manual'):
+        """Remember the model decided for a file's stem"""
+        decisions = self.get_model_decisions()
+        if decisions is not None:
+            decisions.record(normalize_model_stem(filename), model_name, source)
+            
+    def save_model_decisions(self):
+        """Write decisions made since the last save"""
+        with self.model_decisions_lock:
+            if self.model_decisions is None:
+                return
+            try:
+                self.model_decisions.save()
+            except OSError as e:
+                self.log_message(f"Warning: could not save model decisions: {str(e)}")
+        
+    def standardize_model_name(self, model_name):
+        """Convert model name to standardized filename format with proper case (from the model registry)"""
+        model = self.registry.models.get(model_name)
+        return model['stem'] if model else model_name.replace(' ', '_')
+        
+    def format_display_model_name(self, model_name):
+        """Convert model name for display on canvas - e.g. iPhone 15 Pro -> IP 15 Pro (from the model registry)"""
+        model = self.registry.models.get(model_name)
+        return model['label'] if model else model_name.replace('iPhone', 'IP')
+        
+    def load_model_registry(self, path=None):
+        """Use the built-in models plus a registry file - path, or the default file if there is one
+        
+        Returns False (after logging why) if the file can't be used; the current models are kept.
+        """
+        path = path or find_model_registry_file()
+        registry = ModelRegistry()
+        if path:
+            try:
+                registry.load(path)
+            except ValueError as e:
+                self.log_message(f"Error: could not load model registry {str(e)}")
+                return False
+            self.log_message(f"Models: {len(registry.models)} loaded ({os.path.basename(path)})")
+        self.registry = registry
+        return True
+        
+    def get_render_plan(self, model_name):
+        """Precomputed pixel width, file stem, label and label sprite for a known model"""
+        plans_key = (self.registry, self.dpi, self.width_compensation_cm)
+        if self.render_plans_key != plans_key:
+            self.build_render_plans()
+            self.render_plans_key = plans_key
+        return self.render_plans[model_name]
+        
+    def build_render_plans(self):
+        """Work out every model's render plan for the current registry, DPI and compensation"""
+        self.render_plans = {}
+        for name, model in self.registry.models.items():
+            target_width_cm = model['width_cm'] + self.width_compensation_cm
+            self.render_plans[name] = ModelRenderPlan(
+                name, model['width_cm'], target_width_cm, round(target_width_cm * self.dpi / 2.54),
+                model['stem'], model['label'], get_label_sprite(model['label'], MODEL_FONT_SIZE))
+        
+    def get_folder_output_path(self, input_folder, custom_output_folder=None):
+        """Return the "(PRINT MODE)" output folder for a date folder"""
+        folder_name = os.path.basename(os.path.normpath(input_folder))
+        if custom_output_folder:
+            # Use custom output folder
+            return os.path.join(custom_output_folder, f"{folder_name} (PRINT MODE)")
+        # Use default behavior (same directory as input)
+        return os.path.join(os.path.dirname(os.path.normpath(input_folder)), f"{folder_name} (PRINT MODE)")
+        
+    def get_file_list_output_path(self, file_paths, custom_output_folder=None):
+        """Return the output folder used for individually selected files"""
+        if custom_output_folder:
+            # Use custom output folder
+            return os.path.join(custom_output_folder, "PRINT_MODE_OUTPUT")
+        # Use default behavior (same directory as first file)
+        return os.path.join(os.path.dirname(file_paths[0]), "PRINT_MODE_OUTPUT")
+        
+    def find_image_files(self, input_folder):
+        """Find all image files in subfolders as (file_path, relative_folder, filename) tuples"""
+        return list(iter_image_files(input_folder))
+        
+    def process_folder(self, input_folder, custom_output_folder=None, progress=None, select_model=None):
+        """Process all images in a date folder structure and return the batch summary
+        
+        Discovery streams from a background scan, so rendering starts with the first
+        image found instead of waiting for the whole tree to be listed.
+        """
+        self.log_message(f"Processing folder: {input_folder}")
+        
+        output_folder = self.get_folder_output_path(input_folder, custom_output_folder)
+        if custom_output_folder:
+            self.log_message(f"Using custom output location: {output_folder}")
+        else:
+            self.log_message(f"Using default output location: {output_folder}")
+        
+        os.makedirs(output_folder, exist_ok=True)
+        
+        def on_scan_finished(found):
+            if found:
+                self.log_message(f"Found {found} image files to process")
+        
+        image_files = FolderScanner(input_folder, on_finished=on_scan_finished)
+        summary = self.process_batch(image_files, output_folder, progress, select_model)
+        if image_files.found == 0:
+            self.log_message("No image files found in the selected folder.")
+            return None
+            
+        self.log_batch_summary(summary, list_failures=True)
+        return summary
+        
+    def plan_batch(self, image_files, select_model=None):
+        """Work out what rendering (file_path, relative_folder, filename) jobs would do,
+        without rendering - returns one PLAN_FIELDS row per job
+        
+        Only image headers are read (on several threads for network shares), so thousands
+        of files take seconds. A row's status is 'error' when the file would not render
+        as intended (no model, unreadable, or its output name is shared with another
+        file), 'warning' when it renders with a caveat (no order number, or clipped like
+        create_print_ready_image warns) and otherwise 'ok'.
+        """
+        jobs = list(image_files)
+        if not jobs:
+            return []
+        
+        def read_header(file_path):
+            try:
+                return read_image_header(file_path), None
+            except Exception as e:
+                return None, str(e)
+        
+        if is_network_path(jobs[0][0]):
+            import concurrent.futures
+            with concurrent.futures.ThreadPoolExecutor(max_workers=PLAN_HEADER_THREADS) as executor:
+                headers = list(executor.map(read_header, (job[0] for job in jobs), chunksize=16))
+        else:
+            headers = [read_header(job[0]) for job in jobs]
+        
+        rows = []
+        outputs = collections.defaultdict(list)
+        for (file_path, relative_folder, filename), (header, header_error) in zip(jobs, headers):
+            issues = []
+            errors = False
+            order_number = self.extract_order_number(filename)
+            if order_number is None:
+                issues.append("no order number (renders as 1)")
+            # A plan only looks decisions up - it never changes what later runs remember
+            model_name, model_source = self.decide_phone_model(filename, record=False)
+            if model_name is None and select_model:
+                model_name = select_model(filename)
+                model_source = 'assigned'
+            if model_name is None or model_name not in self.registry:
+                issues.append("model not detected")
+                errors = True
+                model_name = model_source = None
+            
+            row = dict.fromkeys(PLAN_FIELDS)
+            row.update(file=os.path.normpath(os.path.join(relative_folder, filename)).replace(os.sep, '/'),
+                       order_number=order_number, model=model_name, model_source=model_source)
+            if header is None:
+                issues.append(f"unreadable: {header_error}")
+                errors = True
+            else:
+                row.update(width_px=header[0], height_px=header[1], format=header[2])
+            
+            if model_name is not None:
+                row['output'] = self.get_output_relpath(relative_folder, filename, model_name)
+                outputs[row['output'].lower()].append(row)
+                if header is not None:
+                    # Same size and clipping check as create_print_ready_image
+                    target_width_px = self.get_render_plan(model_name).target_width_px
+                    target_height_px = round(target_width_px * header[1] / header[0])
+                    row.update(target_width_px=target_width_px, target_height_px=target_height_px,
+                               clipped=target_height_px > self.film_height_px)
+                    if row['clipped']:
+                        issues.append(f"clipped ({target_height_px}px > {self.film_height_px}px canvas)")
+            row['issues'] = issues
+            row['status'] = 'error' if errors else 'warning' if issues else 'ok'
+            rows.append(row)
+        
+        # Files that would overwrite each other's output (case-insensitively, like Windows)
+        for shared in outputs.values():
+            if len(shared) < 2:
+                continue
+            for row in shared:
+                others = [other['file'] for other in shared if other is not row]
+                listed = ', '.join(others[:3]) + (f" and {len(others) - 3} more" if len(others) > 3 else "")
+                row['issues'].append(f"same output as {listed}")
+                row['status'] = 'error'
+        
+        for row in rows:
+            row['issues'] = '; '.join(row['issues'])
+        return rows
+        
+    def save_plan(self, rows, plan_path):
+        """Write a plan as CSV, or as JSON when plan_path ends in .json - True on success"""
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(plan_path)), exist_ok=True)
+            with open(plan_path, 'w', encoding='utf-8', newline='') as f:
+                if plan_path.lower().endswith('.json'):
+                    counts = collections.Counter(row['status'] for row in rows)
+                    json.dump({'version': 1, 'counts': {status: counts[status] for status in ('ok', 'warning', 'error')},
+                               'files': rows}, f, indent=1)
+                else:
+                    writer = csv.DictWriter(f, fieldnames=PLAN_FIELDS)
+                    writer.writeheader()
+                    writer.writerows(rows)
+            self.log_message(f"Plan saved: {plan_path}")
+            return True
+        except OSError as e:
+            self.log_message(f"Error: could not save plan: {str(e)}")
+            return False
+            
+    def log_plan_summary(self, rows, elapsed):
+        """Log a plan's totals and the files that need attention"""
+        counts = collections.Counter(row['status'] for row in rows)
+        self.log_message(f"\nPlanned {len(rows)} files in {elapsed:.2f}s: {counts['ok']} ok, "
+                         f"{counts['warning']} with warnings, {counts['error']} with errors")
+        problems = [row for row in rows if row['status'] != 'ok']
+        for row in problems[:PLAN_SUMMARY_MAX_FILES]:
+            self.log_message(f"  - {row['status']}: {row['file']}: {row['issues']}")
+        if len(problems) > PLAN_SUMMARY_MAX_FILES:
+            self.log_message(f"  ... and {len(problems) - PLAN_SUMMARY_MAX_FILES} more (see the plan file)")
+            
+    def process_file_list(self, file_paths, custom_output_folder=None, progress=None, select_model=None):
+        """Process individually selected files and return the batch summary"""
+        self.log_message(f"Processing {len(file_paths)} individual files")
+        
+        if not file_paths:
+            return None
+        
+        output_folder = self.get_file_list_output_path(file_paths, custom_output_folder)
+        if custom_output_folder:
+            self.log_message(f"Using custom output location: {output_folder}")
+        else:
+            self.log_message(f"Using default output location: {output_folder}")
+        
+        os.makedirs(output_folder, exist_ok=True)
+        
+        image_files = [(file_path, "", os.path.basename(file_path)) for file_path in file_paths]
+        summary = self.process_batch(image_files, output_folder, progress, select_model)
+        self.log_batch_summary(summary, list_failures=False)
+        return summary
+        
+    def process_batch(self, image_files, output_folder, progress=None, select_model=None):
+        """Render (file_path, relative_folder, filename) jobs and return the batch summary
+        
+        image_files is a list or a FolderScanner that is still discovering files.
+        progress is called as progress(index, total, filename, total_final) as images
+        complete; total keeps growing until total_final is True.
+        With workers > 1 rendering runs in a process pool; results stay in input order.
+        In incremental mode jobs already recorded in the output folder's manifest with
+        the same content, model and settings are skipped. With defer_undetected, jobs
+        whose model can't be detected are returned in summary['deferred'] unrendered.
+        With nest_sheets, small designs share film sheets (see process_batch_nested).
+        With batch_document, every page goes into one TIFF or PDF (see process_batch_document).
+        """
+        start_time = time.perf_counter()
+        self.batch_stats = {}
+        self.batch_timings = []
+        self.batch_workers = 1
+        
+        incremental = self.incremental
+        nest_sheets = self.nest_sheets
+        if self.batch_document and (incremental or nest_sheets):
+            # The document is rewritten whole, one design per page
+            self.log_message("Incremental mode and nesting are not used for batch documents - rendering every page")
+            incremental = nest_sheets = False
+        if incremental and nest_sheets:
+            # Sheet contents change whenever the batch changes, so there is nothing to skip
+            self.log_message("Incremental mode is not used when nesting sheets - rendering everything")
+            incremental = False
+        manifest = RenderManifest.load(output_folder) if incremental else None
+        jobs = []
+        deferred_jobs = []
+        skipped_count = 0
+        # With read-ahead the stream runs on the feeder thread while report reads the counts
+        stream_lock = threading.Lock()
+        
+        def job_stream():
+            nonlocal skipped_count
+            for job in image_files:
+                if manifest is not None and self.is_job_up_to_date(job, output_folder, manifest):
+                    with stream_lock:
+                        skipped_count += 1
+                    continue
+                if self.defer_undetected and self.needs_model_review(job):
+                    # Set aside for the end-of-batch review instead of stalling the batch
+                    self.log_message(f"Deferred: {job[2]} (model not detected - assign at end of batch)")
+                    with stream_lock:
+                        deferred_jobs.append(job)
+                    continue
+                with stream_lock:
+                    jobs.append(job)
+                yield job
+        
+        def report(index, filename):
+            if not progress:
+                return
+            if isinstance(image_files, FolderScanner):
+                found, finished = image_files.known_total()
+            else:
+                found, finished = len(image_files), True
+            with stream_lock:
+                not_rendered = skipped_count + len(deferred_jobs)
+            progress(index, max(found - not_rendered, index + 1), filename, finished)
+        
+        parallel = self.get_worker_count() > 1 and (isinstance(image_files, FolderScanner) or len(image_files) > 1)
+        profiler = self.start_deep_profile()
+        if self.batch_document:
+            results = self.process_batch_document(job_stream(), output_folder, report, select_model,
+                                                  prefetch=self.should_prefetch(image_files))
+        elif nest_sheets:
+            results = self.process_batch_nested(job_stream(), output_folder, report, select_model)
+        elif parallel:
+            results = self.process_batch_parallel(job_stream(), output_folder, report, select_model)
+        else:
+            results = self.process_batch_serial(job_stream(), output_folder, report, select_model,
+                                                prefetch=self.should_prefetch(image_files))
+        self.finish_deep_profile(profiler, output_folder)
+        
+        timing_rows = [dict(file=name, **{stage: round(timings[stage], 6) for stage in RENDER_STAGES if stage in timings})
+                       for name, timings in self.batch_timings]
+        if self.profile_format and timing_rows:
+            self.save_stage_profile(output_folder, timing_rows)
+        
+        if manifest is not None:
+            self.log_message(f"Incremental: {skipped_count} up to date, {len(jobs)} rendered")
+            self.update_manifest(manifest, jobs, results)
+        self.save_model_decisions()
+        
+        return {
+            'total': len(jobs),
+            'processed': sum(1 for model_name in results if model_name),
+            'skipped': skipped_count,
+            'deferred': deferred_jobs,
+            'failed': [job[2] for job, model_name in zip(jobs, results) if not model_name],
+            'elapsed': time.perf_counter() - start_time,
+            'output_folder': output_folder,
+            'workers': self.batch_workers,
+            'stats': self.batch_stats,
+            'timings': timing_rows,
+        }
+        
+    def process_batch_serial(self, image_files, output_folder, report=None, select_model=None, prefetch=False):
+        """Render jobs in this process and return the rendered model (None = failed) per job
+        
+        PNG encoding is handed to the writer threads so it overlaps the next
+        decode/resize; a job only counts as processed once its file is written.
+        With prefetch, upcoming inputs are read into memory while each job renders
+        (see InputPrefetcher).
+        """
+        results = []
+        pending_writes = []
+        self.pipeline_writes = True
+        try:
+            for i, ((file_path, relative_folder, filename), data, read_wait) in enumerate(
+                    self.read_ahead(image_files, prefetch)):
+                try:
+                    if report:
+                        report(i, filename)
+                    
+                    # Process the image (from the bytes read ahead, when there are any)
+                    self.job_stats = {}
+                    self.job_timings = self.start_job_timings(self.get_manifest_key(relative_folder, filename))
+                    self.job_write = None
+                    if read_wait is not None:
+                        self.job_timings['read'] = read_wait
+                        self.job_stats['prefetch_hits' if data is not None else 'prefetch_misses'] = 1
+                    self.job_input = (file_path, data) if data is not None else None
+                    del data
+                    resolved = self.resolve_image_job(filename, select_model, file_path)
+                    success = resolved is not None and self.render_image_job(
+                        file_path, output_folder, relative_folder, filename, *resolved)
+                    self.job_input = None
+                    results.append(resolved[1] if success else None)
+                    self.merge_job_stats(self.job_stats)
+                    if self.job_write is not None:
+                        pending_writes.append((i, self.job_write))
+                except Exception as e:
+                    self.log_message(f"Error processing {filename}: {str(e)}")
+                    results.append(None)
+        finally:
+            self.pipeline_writes = False
+            self.job_write = None
+            self.job_input = None
+            self.get_writer().close()
+        
+        for i, future in pending_writes:
+            if not future.result():
+                results[i] = None
+        return results
+    
+    def process_batch_document(self, image_files, output_folder, report=None, select_model=None, prefetch=False):
+        """Render jobs as the pages of one TIFF/PDF and return the rendered model (None = failed) per job
+        
+        Pages are rendered in order-number order and appended as they are produced, so
+        only the canvases waiting for the writer are in memory. If the document can't be
+        completed every job counts as failed.
+        """
+        jobs = list(image_files)
+        order = sorted(range(len(jobs)), key=lambda index: self.get_order_sort_key(jobs[index][2]))
+        writer_class = TiffBatchWriter if self.batch_document == 'tiff' else PdfBatchWriter
+        document_path = os.path.join(output_folder, self.document_name + writer_class.extension)
+        options = {'compression': self.tiff_compression} if self.batch_document == 'tiff' else {}
+        writer = writer_class(document_path, encode_profile=self.encode_profile, dpi=self.dpi,
+                              log=self.log_message, **options)
+        
+        self.document_writer = writer
+        try:
+            page_results = self.process_batch_serial([jobs[index] for index in order], output_folder,
+                                                     report, select_model, prefetch)
+        finally:
+            self.document_writer = None
+            saved_path = writer.finish()
+        if saved_path is None:
+            page_results = [None] * len(jobs)
+        else:
+            self.log_message(f"Batch document saved: {saved_path} ({len(writer.pages)} pages)")
+        
+        # Back to input order for the summary and manifest
+        results = [None] * len(jobs)
+        for position, index in enumerate(order):
+            results[index] = page_results[position]
+        return results
+        
+    def get_order_sort_key(self, filename):
+        """Sort key putting files in order-number order (3 < 3a < 3b < 10)"""
+        number, suffix = re.match(r'(\d+)(\D*)', self.extract_order_number(filename) or "1").groups()
+        return int(number), suffix.lower()
+        
+    def should_prefetch(self, image_files):
+        """True if a batch's inputs should be read ahead - with prefetch 'auto', only from a network share"""
+        if self.prefetch == 'off' or self.prefetch_depth <= 0:
+            return False
+        if self.prefetch == 'on':
+            return True
+        if isinstance(image_files, FolderScanner):
+            return is_network_path(image_files.input_folder)
+        return bool(image_files) and is_network_path(image_files[0][0])
+        
+    def read_ahead(self, jobs, prefetch):
+        """Yield (job, bytes or None, read wait in seconds or None) - reading upcoming inputs
+        on background threads when prefetch is True"""
+        if not prefetch:
+            for job in jobs:
+                yield job, None, None
+            return
+        self.log_message(f"Read-ahead: up to {self.prefetch_depth} files / {self.prefetch_memory_mb} MB")
+        yield from InputPrefetcher(jobs, self.prefetch_depth, self.prefetch_memory_mb * 1024 * 1024)
+        
+    def open_input(self, input_path):
+        """Image.open an input - from the current job's read-ahead bytes when it has them"""
+        if self.job_input is not None and self.job_input[0] == input_path:
+            return Image.open(io.BytesIO(self.job_input[1]))
+        return Image.open(input_path)
+        
+    def hash_input(self, input_path):
+        """SHA-256 of an input - from the current job's read-ahead bytes when it has them"""
+        if self.job_input is not None and self.job_input[0] == input_path:
+            import hashlib
+            return hashlib.sha256(self.job_input[1]).hexdigest()
+        return hash_file(input_path)
+        
+    def process_batch_nested(self, image_files, output_folder, report=None, select_model=None):
+        """Pack designs onto shared film sheets and return the rendered model (None = failed) per job
+        
+        Every job is resolved and measured from its header first, then packed in one
+        pass with pack_film_sheets. Designs that end up alone on a sheet (or are too big
+        to share one) render exactly as in normal mode; shared sheets are saved as
+        SHEET_001_<orders>.png (SHEET_ASSIGNED_001_... in a review pass) with each
+        design's labels above it. Every sheet is listed in the sheet manifest so the
+        operator can match prints to orders.
+        """
+        jobs = list(image_files)
+        results = [None] * len(jobs)
+        margin = round(0.5 * self.dpi / 2.54)  # same 5mm margin as the labels
+        gutter = round(self.nest_gutter_mm / 10 * self.dpi / 2.54)
+        
+        items = []
+        for i, (file_path, relative_folder, filename) in enumerate(jobs):
+            try:
+                resolved = self.resolve_image_job(filename, select_model, file_path)
+                if resolved is None:
+                    continue
+                target_width_px = self.get_render_plan(resolved[1]).target_width_px
+                with Image.open(file_path) as image:
+                    width, height = image.size
+            except Exception as e:
+                self.log_message(f"Error processing {filename}: {str(e)}")
+                continue
+            items.append({'index': i, 'order_number': resolved[0], 'model_name': resolved[1],
+                          'target_width_px': target_width_px, 'width': target_width_px,
+                          'height': NEST_LABEL_BAND_PX + round(target_width_px * height / width)})
+        
+        sheets = [sheet for sheet in pack_film_sheets(items, self.film_width_px - margin * 2,
+                                                      self.film_height_px - margin * 2, gutter)
+                  if len(sheet) > 1]
+        nested = {item['index'] for sheet in sheets for item, x, y in sheet}
+        
+        # Tasks run in input order of their first design: (method, args, item list, output relpath)
+        tasks = []
+        for item in items:
+            if item['index'] in nested:
+                continue
+            file_path, relative_folder, filename = jobs[item['index']]
+            args = (file_path, output_folder, relative_folder, filename, item['order_number'], item['model_name'])
+            tasks.append(('render_image_job', args, [item],
+                          self.get_output_relpath(relative_folder, filename, item['model_name'])))
+        for sheet in sorted(sheets, key=lambda sheet: min(item['index'] for item, x, y in sheet)):
+            sheet.sort(key=lambda placement: (placement[2], placement[1]))
+            for item, x, y in sheet:
+                item['x'], item['y'] = margin + x, margin + y
+            slots = [{'input_path': jobs[item['index']][0], 'order_number': item['order_number'],
+                      'model_name': item['model_name'], 'target_width_px': item['target_width_px'],
+                      'x': item['x'], 'y': item['y']} for item, x, y in sheet]
+            tasks.append(('render_sheet', slots, [item for item, x, y in sheet], None))
+        tasks.sort(key=lambda task: min(item['index'] for item in task[2]))
+        
+        sheet_number = 0
+        for i, (method, args, task_items, relpath) in enumerate(tasks):
+            if method == 'render_sheet':
+                sheet_number += 1
+                relpath = f"SHEET{self.pass_suffix.upper()}_{sheet_number:03d}_{'+'.join(item['order_number'] for item in task_items)}.png"
+                tasks[i] = (method, (args, output_folder, relpath), task_items, relpath)
+        
+        self.log_message(f"Nesting: {len(nested)} designs on {sheet_number} shared sheets, "
+                         f"{len(tasks) - sheet_number} on their own")
+        
+        completed = 0
+        sheet_list = []
+        
+        def finish(task, success):
+            nonlocal completed
+            method, args, task_items, relpath = task
+            for item in task_items:
+                results[item['index']] = item['model_name'] if success else None
+            completed += len(task_items)
+            if report:
+                report(completed, os.path.basename(relpath))
+            if success:
+                designs = []
+                for item in task_items:
+                    file_path, relative_folder, filename = jobs[item['index']]
+                    design = {'source': self.get_manifest_key(relative_folder, filename),
+                              'order': item['order_number'], 'model': item['model_name']}
+                    if 'x' in item:
+                        # Top-left of the design's label band on the shared sheet
+                        design.update(x=item['x'], y=item['y'], width=item['width'], height=item['height'])
+                    designs.append(design)
+                sheet_list.append({'file': relpath, 'designs': designs})
+        
+        if self.get_worker_count() > 1 and len(tasks) > 1:
+            import concurrent.futures
+            self.log_message(f"Rendering with {self.get_worker_count()} worker processes")
+            self.batch_workers = min(self.get_worker_count(), len(tasks))
+            with concurrent.futures.ProcessPoolExecutor(max_workers=self.get_worker_count(),
+                                                        initializer=_init_render_worker,
+                                                        initargs=(self.get_worker_settings(),)) as executor:
+                futures = [executor.submit(_render_worker_task, task[0], task[1], task[3]) for task in tasks]
+                for task, future in zip(tasks, futures):
+                    try:
+                        success, messages, job_stats, job_timings = future.result()
+                        for message in messages:
+                            self.log_message(message)
+                        self.merge_job_stats(job_stats)
+                        self.start_job_timings(task[3]).update(job_timings)
+                    except Exception as e:
+                        self.log_message(f"Error processing {task[3]}: {str(e)}")
+                        success = False
+                    finish(task, success)
+        else:
+            for task in tasks:
+                self.job_stats = {}
+                self.job_timings = self.start_job_timings(task[3])
+                try:
+                    success = getattr(self, task[0])(*task[1])
+                except Exception as e:
+                    self.log_message(f"Error processing {task[3]}: {str(e)}")
+                    success = False
+                self.merge_job_stats(self.job_stats)
+                finish(task, success)
+        
+        self.save_sheet_manifest(output_folder, sheet_list, gutter)
+        return results
+    
+    def save_sheet_manifest(self, output_folder, sheet_list, gutter):
+        """Write the list of printed sheets and the designs on each to the output folder"""
+        manifest_name = self.pass_suffix.join(os.path.splitext(NEST_MANIFEST_FILENAME))
+        try:
+            with open(os.path.join(output_folder, manifest_name), 'w', encoding='utf-8') as f:
+                json.dump({'version': 1, 'gutter_px': gutter, 'label_band_px': NEST_LABEL_BAND_PX,
+                           'sheets': sheet_list}, f, indent=1)
+            self.log_message(f"Sheet list saved: {manifest_name}")
+        except OSError as e:
+            self.log_message(f"Warning: could not save sheet list: {str(e)}")
+    
+    def get_render_settings(self, model_name):
+        """Settings that change a model's rendered output, as recorded in the manifest"""
+        return {
+            'width_cm': self.registry[model_name]['width_cm'],
+            'dpi': self.dpi,
+            'compensation_cm': self.width_compensation_cm,
+            'film_px': [self.film_width_px, self.film_height_px],
+            **self.get_color_settings(),
+        }
+        
+    def get_manifest_key(self, relative_folder, filename):
+        """Manifest key for a job - its input path relative to the batch"""
+        return os.path.normpath(os.path.join(relative_folder, filename)).replace(os.sep, '/')
+        
+    def needs_model_review(self, job):
+        """True if a job's model can't be worked out without asking the operator"""
+        file_path, relative_folder, filename = job
+        return file_path not in self.model_overrides and self.detect_phone_model(filename) is None
+        
+    def process_deferred(self, assignments, output_folder, progress=None):
+        """Render deferred jobs with the models assigned at review - assignments is [(job, model)]"""
+        self.log_message(f"\nRendering {len(assignments)} files with assigned models")
+        self.model_overrides = {job[0]: model_name for job, model_name in assignments}
+        for job, model_name in assignments:
+            self.record_model_decision(job[2], model_name)
+        # A batch document, sheet list or stage profile from this pass sits beside the main one
+        self.document_name = f"{BATCH_DOCUMENT_NAME}_assigned"
+        self.pass_suffix = '_assigned'
+        try:
+            summary = self.process_batch([job for job, model_name in assignments], output_folder, progress)
+        finally:
+            self.model_overrides = {}
+            self.document_name = BATCH_DOCUMENT_NAME
+            self.pass_suffix = ''
+        self.log_batch_summary(summary, list_failures=True)
+        return summary
+        
+    def is_job_up_to_date(self, job, output_folder, manifest):
+        """True if the manifest shows this job's output is already up to date"""
+        file_path, relative_folder, filename = job
+        key = self.get_manifest_key(relative_folder, filename)
+        entry = manifest.entries.get(key)
+        
+        # Undetectable names reuse the model picked for this exact content last time
+        model_name = self.detect_phone_model(filename) or (entry['model'] if entry else None)
+        try:
+            return model_name in self.registry and manifest.is_up_to_date(
+                key, file_path, model_name, self.get_render_settings(model_name),
+                os.path.join(output_folder, self.get_output_relpath(relative_folder, filename, model_name)))
+        except OSError:
+            return False
+        
+    def update_manifest(self, manifest, image_files, results):
+        """Record successful renders and save the manifest"""
+        for (file_path, relative_folder, filename), model_name in zip(image_files, results):
+            if not model_name:
+                continue
+            try:
+                manifest.record(self.get_manifest_key(relative_folder, filename), file_path, model_name,
+                                self.get_render_settings(model_name),
+                                self.get_output_relpath(relative_folder, filename, model_name))
+            except OSError as e:
+                self.log_message(f"Warning: could not record {filename} in manifest: {str(e)}")
+        try:
+            manifest.save()
+        except OSError as e:
+            self.log_message(f"Warning: could not save manifest: {str(e)}")
+        
+    def merge_job_stats(self, job_stats):
+        """Fold one job's measurements into the batch totals (peak_* keys keep the maximum)"""
+        for key, value in job_stats.items():
+            if key.startswith('peak_'):
+                self.batch_stats[key] = max(self.batch_stats.get(key, value), value)
+            else:
+                self.batch_stats[key] = self.batch_stats.get(key, 0) + value
+        
+    @contextlib.contextmanager
+    def time_stage(self, stage):
+        """Add the wall time of the with-block to the current job's timing for stage"""
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.job_timings[stage] = self.job_timings.get(stage, 0.0) + time.perf_counter() - start_time
+        
+    def start_job_timings(self, name):
+        """Start a job's stage timings in the batch list and return its (live) timings dict"""
+        timings = {}
+        self.batch_timings.append((name, timings))
+        return timings
+        
+    def save_stage_profile(self, output_folder, timing_rows):
+        """Write per-file stage timings (seconds) as JSON lines or CSV next to the output"""
+        profile_path = os.path.join(output_folder,
+                                    f"{STAGE_PROFILE_FILENAME}{self.pass_suffix}.{self.profile_format}")
+        try:
+            with open(profile_path, 'w', encoding='utf-8', newline='') as f:
+                if self.profile_format == 'csv':
+                    writer = csv.DictWriter(f, fieldnames=('file',) + RENDER_STAGES)
+                    writer.writeheader()
+                    writer.writerows(timing_rows)
+                else:
+                    for row in timing_rows:
+                        f.write(json.dumps(row) + '\n')
+        except OSError as e:
+            self.log_message(f"Warning: could not save stage profile: {str(e)}")
+        
+    def start_deep_profile(self):
+        """Start the opt-in cProfile or tracemalloc session for a batch (None when off)"""
+        if self.deep_profile == 'cprofile':
+            import cProfile
+            profiler = cProfile.Profile()
+            profiler.enable()
+            return profiler
+        if self.deep_profile == 'tracemalloc':
+            import tracemalloc
+            tracemalloc.start()
+            return tracemalloc
+        return None
+        
+    def finish_deep_profile(self, profiler, output_folder):
+        """Stop a deep profiling session and log (and for cProfile, save) its top entries"""
+        if profiler is None:
+            return
+        import pstats
+        import tracemalloc
+        
+        if profiler is tracemalloc:
+            snapshot = tracemalloc.take_snapshot()
+            current_bytes, peak_bytes = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            # Pillow allocates pixel buffers in C, outside what tracemalloc can see
+            self.log_message(f"\ntracemalloc: peak {peak_bytes / (1024 * 1024):.1f} MB of Python allocations "
+                             f"(image pixel buffers are not traced)")
+            for statistic in snapshot.statistics('lineno')[:DEEP_PROFILE_TOP_N]:
+                self.log_message(f"  {statistic}")
+            return
+        
+        profiler.disable()
+        stats_path = os.path.join(output_folder, f"{STAGE_PROFILE_FILENAME}{self.pass_suffix}.prof")
+        try:
+            profiler.dump_stats(stats_path)
+            self.log_message(f"\ncProfile stats saved: {stats_path}")
+        except OSError as e:
+            self.log_message(f"Warning: could not save cProfile stats: {str(e)}")
+        report = io.StringIO()
+        pstats.Stats(profiler, stream=report).sort_stats('cumulative').print_stats(DEEP_PROFILE_TOP_N)
+        self.log_message(report.getvalue().strip())
+        
+    def get_writer(self):
+        """Return the output writer for the current encode profile (or batch document)"""
+        if self.document_writer is not None:
+            return self.document_writer
+        if self.writer is None or self.writer.encode_profile != self.encode_profile:
+            self.writer = OutputWriter(self.encode_profile, self.writer_threads, log=self.log_message)
+        return self.writer
+        
+    def get_worker_settings(self):
+        """Engine settings copied into each worker process"""
+        return {
+            'fast_decode': self.fast_decode,
+            'encode_profile': self.encode_profile,
+            'layer_cache_folder': self.layer_cache_folder,
+            'layer_cache_size_mb': self.layer_cache_size_mb,
+            'registry': self.registry,
+            'output_profile': self.output_profile,
+            'output_profile_name': self.output_profile_name,
+            'output_profile_id': self.output_profile_id,
+            'color_intent': self.color_intent,
+        }
+        
+    def get_worker_count(self):
+        """Number of render processes to use (0 means one per CPU core)"""
+        if self.deep_profile or self.batch_document:
+            # The profilers only see this process, and pages stream into one file from it
+            return 1
+        return self.workers if self.workers > 0 else (os.cpu_count() or 1)
+        
+    def process_batch_parallel(self, image_files, output_folder, report=None, select_model=None):
+        """Render jobs across a process pool and return the rendered model (None = failed) per job
+        
+        Order numbers and models are resolved here in the parent (the model dialog needs
+        the GUI); workers only load, render and save. Log lines from each worker are
+        replayed in input order. With a memory budget, new jobs wait until the estimated
+        memory of the jobs in flight leaves room for them.
+        """
+        worker_count = self.get_worker_count()
+        budget_bytes = self.memory_budget_mb * 1024 * 1024
+        results = []
+        pending = collections.deque()
+        completed = 0
+        in_flight_bytes = 0
+        
+        def collect(index, filename, model_name, future, estimate, timings):
+            nonlocal completed, in_flight_bytes
+            try:
+                success, messages, job_stats, job_timings = future.result()
+                for message in messages:
+                    self.log_message(message)
+                self.merge_job_stats(job_stats)
+                timings.update(job_timings)
+                results[index] = model_name if success else None
+            except Exception as e:
+                self.log_message(f"Error processing {filename}: {str(e)}")
+            in_flight_bytes -= estimate
+            completed += 1
+            if report:
+                report(completed, filename)
+        
+        import concurrent.futures
+        
+        self.log_message(f"Rendering with {worker_count} worker processes")
+        with concurrent.futures.ProcessPoolExecutor(max_workers=worker_count,
+                                                    initializer=_init_render_worker,
+                                                    initargs=(self.get_worker_settings(),)) as executor:
+            for i, (file_path, relative_folder, filename) in enumerate(image_files):
+                results.append(None)
+                try:
+                    # Detection runs here; the worker's stage timings are added when it finishes
+                    self.job_timings = self.start_job_timings(self.get_manifest_key(relative_folder, filename))
+                    resolved = self.resolve_image_job(filename, select_model, file_path)
+                except Exception as e:
+                    self.log_message(f"Error processing {filename}: {str(e)}")
+                    resolved = None
+                if resolved is None:
+                    continue
+                
+                estimate = 0
+                if budget_bytes:
+                    try:
+                        estimate = self.estimate_render_memory(file_path,
+                                                               self.get_render_plan(resolved[1]).target_width_px)
+                    except Exception:
+                        estimate = 0
+                
+                # Keep a small window in flight so results stream back in order,
+                # and stay inside the memory budget (one job always runs)
+                while pending and (len(pending) >= worker_count * 2 or
+                                   (budget_bytes and in_flight_bytes + estimate > budget_bytes)):
+                    collect(*pending.popleft())
+                
+                job = (file_path, output_folder, relative_folder, filename) + resolved
+                in_flight_bytes += estimate
+                pending.append((i, filename, resolved[1], executor.submit(_render_worker_job, job), estimate,
+                                self.job_timings))
+                # The memory budget or a short batch can keep fewer workers busy than the pool has
+                self.batch_workers = max(self.batch_workers, min(len(pending), worker_count))
+            
+            while pending:
+                collect(*pending.popleft())
+        
+        return results
+        
+    def log_batch_summary(self, summary, list_failures=True):
+        """Log the end-of-batch results including throughput"""
+        self.log_message(f"\nProcessing completed!")
+        self.log_message(f"Successfully processed: {summary['processed']} files")
+        if summary['failed']:
+            self.log_message(f"Failed to process: {len(summary['failed'])} files")
+            if list_failures:
+                for failed_file in summary['failed']:
+                    self.log_message(f"  - {failed_file}")
+        
+        elapsed = summary['elapsed']
+        rate = summary['total'] / elapsed if elapsed > 0 else 0.0
+        self.log_message(f"Throughput: {summary['total']} images in {elapsed:.2f}s ({rate:.2f} images/sec, "
+                         f"{summary['workers']} worker{'s' if summary['workers'] != 1 else ''})")
+        if summary['skipped']:
+            self.log_message(f"Skipped (already up to date): {summary['skipped']} files")
+        if summary['deferred']:
+            self.log_message(f"Deferred for model review: {len(summary['deferred'])} files")
+        if self.layer_cache_folder:
+            self.log_message(f"Render cache: {summary['stats'].get('layer_cache_hits', 0)} hits, "
+                             f"{summary['stats'].get('layer_cache_misses', 0)} misses")
+        prefetch_hits = summary['stats'].get('prefetch_hits', 0)
+        prefetch_misses = summary['stats'].get('prefetch_misses', 0)
+        if prefetch_hits or prefetch_misses:
+            self.log_message(f"Read-ahead: {prefetch_hits} files read ahead, {prefetch_misses} read during render "
+                             f"(memory cap or read error)")
+        if self.output_profile:
+            self.log_message(f"Colour management: {self.output_profile_name} ({self.color_intent}), "
+                             f"{summary['stats'].get('color_transforms_built', 0)} transforms built")
+        if 'peak_rss_mb' in summary['stats']:
+            self.log_message(f"Peak memory per render process: {summary['stats']['peak_rss_mb']:.0f} MB")
+        
+        stage_summary = summarize_stage_timings(summary['timings'])
+        if stage_summary:
+            self.log_message(f"Stage timings (ms):  {'p50':>8} {'p95':>8} {'max':>8}")
+            for stage, (count, p50, p95, maximum) in stage_summary.items():
+                self.log_message(f"  {stage:<18}{p50 * 1000:>8.2f} {p95 * 1000:>8.2f} {maximum * 1000:>8.2f}  ({count})")
+        
+    def process_single_image(self, input_path, output_folder, relative_folder, filename, select_model=None):
+        """Process a single image file"""
+        try:
+            resolved = self.resolve_image_job(filename, select_model, input_path)
+            if resolved is None:
+                return False
+            order_number, detected_model = resolved
+            return self.render_image_job(input_path, output_folder, relative_folder, filename,
+                                         order_number, detected_model)
+            
+        except Exception as e:
+            self.log_message(f"Error processing {filename}: {str(e)}")
+            return False
+            
+    def resolve_image_job(self, filename, select_model=None, file_path=None):
+        """Work out (order_number, model_name) for a file, or None if it should be skipped"""
+        # Extract order number
+        order_number = self.extract_order_number(filename)
+        if order_number is None:
+            self.log_message(f"Warning: Could not extract order number from {filename}")
+            order_number = "1"  # Default fallback as string
+        
+        # Detect phone model (models assigned at review take precedence)
+        with self.time_stage('detect'):
+            detected_model = self.model_overrides.get(file_path) or self.detect_phone_model(filename)
+        if detected_model is None:
+            self.log_message(f"Warning: Could not auto-detect model for {filename}")
+            # Let the caller pick a model (the GUI shows a selection dialog)
+            detected_model = select_model(filename) if select_model else None
+            if detected_model is None:
+                self.log_message(f"Skipped: {filename} (no model selected)")
+                return None
+            # Remember the pick so this design isn't asked about again
+            self.record_model_decision(filename, detected_model)
+                
+        self.log_message(f"Processing: {filename} -> Order #{order_number}, {detected_model}")
+        
+        # Get model specifications
+        if detected_model not in self.registry:
+            self.log_message(f"Error: Unknown model specification for {detected_model}")
+            return None
+        
+        return order_number, detected_model
+        
+    def render_image_job(self, input_path, output_folder, relative_folder, filename, order_number, detected_model):
+        """Render one resolved image and save it - safe to run in a worker process"""
+        # Load and process the image
+        processed_image = self.create_print_ready_image(input_path, order_number, detected_model)
+        
+        if processed_image is None:
+            return False
+            
+        # Create output path (each folder is only created once per writer)
+        writer = self.get_writer()
+        output_subfolder = os.path.join(output_folder, relative_folder) if relative_folder else output_folder
+        writer.ensure_folder(output_subfolder)
+        
+        # Generate output filename
+        output_filename = self.get_output_filename(order_number, detected_model)
+        output_path = os.path.join(output_subfolder, output_filename)
+        
+        # Save the processed image - hand it to the writer threads when pipelining
+        if self.pipeline_writes:
+            self.job_write = writer.submit(processed_image, output_path, self.job_timings)
+        elif not writer.write(processed_image, output_path, self.job_timings):
+            return False
+        del processed_image
+        
+        # Report the process high-water mark so oversized inputs stand out
+        peak_rss = get_peak_rss_bytes()
+        if peak_rss is not None:
+            self.job_stats['peak_rss_mb'] = peak_rss / (1024 * 1024)
+            self.log_message(f"Memory: peak RSS {peak_rss / (1024 * 1024):.0f} MB")
+        
+        return True
+        
+    def render_sheet(self, slots, output_folder, sheet_filename):
+        """Render several designs onto one shared film sheet and save it - safe to run in a worker process
+        
+        slots are dicts with input_path, order_number, model_name, target_width_px and the
+        x, y of the slot's top-left corner; each design's labels sit in the band above it.
+        """
+        canvas = self.get_canvas_template().copy()
+        for slot in slots:
+            try:
+                layer = self.get_artwork_layer(slot['input_path'], slot['target_width_px'])
+            except Exception as e:
+                self.log_message(f"Error creating print-ready image: {str(e)}")
+                return False
+            with self.time_stage('paste'):
+                canvas.paste(layer, (slot['x'], slot['y'] + NEST_LABEL_BAND_PX), layer)
+            del layer
+            with self.time_stage('overlays'):
+                self.add_text_overlays(canvas, slot['order_number'],
+                                       self.format_display_model_name(slot['model_name']),
+                                       origin=(slot['x'], slot['y']))
+        
+        writer = self.get_writer()
+        writer.ensure_folder(output_folder)
+        if not writer.write(canvas, os.path.join(output_folder, sheet_filename), self.job_timings):
+            return False
+        del canvas
+        
+        peak_rss = get_peak_rss_bytes()
+        if peak_rss is not None:
+            self.job_stats['peak_rss_mb'] = peak_rss / (1024 * 1024)
+        return True
+        
+    def get_output_filename(self, order_number, model_name):
+        """Output filename for a render, e.g. 12_iPhone15ProMax.png"""
+        standardized_model = self.standardize_model_name(model_name)
+        return f"{order_number}_{standardized_model}.png"
+        
+    def get_output_relpath(self, relative_folder, filename, model_name):
+        """Output path relative to the output folder, as render_image_job names it"""
+        order_number = self.extract_order_number(filename) or "1"
+        output_filename = self.get_output_filename(order_number, model_name)
+        return os.path.normpath(os.path.join(relative_folder, output_filename)).replace(os.sep, '/')
+        
+    def create_print_ready_image(self, input_path, order_number, model_name):
+        """Create the final print-ready image with proper layout - graphics centered on full canvas
+        
+        NOTE: Adding 0.3cm to all target widths to compensate for systematic printing offset
+        """
+        try:
+            # Target width in pixels with 0.3cm compensation, precomputed per model
+            plan = self.get_render_plan(model_name)
+            target_width_px = plan.target_width_px
+            
+            # Load, flip and resize the artwork (or reuse it from the layer cache)
+            resized_image = self.get_artwork_layer(input_path, target_width_px)
+            target_height_px = resized_image.height
+            
+            # Copy the transparent canvas template at film sheet size
+            with self.time_stage('paste'):
+                canvas = self.get_canvas_template().copy()
+            
+            # Calculate positions for centering the image on the FULL canvas
+            image_x = (self.film_width_px - target_width_px) // 2
+            image_y = (self.film_height_px - target_height_px) // 2
+            
+            # Check if image will be clipped and warn user
+            if target_height_px > self.film_height_px:
+                self.log_message(f"Warning: {os.path.basename(input_path)} is very tall ({target_height_px}px > {self.film_height_px}px canvas) - image will be clipped to maintain {plan.width_cm}cm width")
+                # Center the image even if it extends beyond canvas
+                image_y = (self.film_height_px - target_height_px) // 2
+            
+            # Paste the resized image onto the canvas (may clip if too tall)
+            with self.time_stage('paste'):
+                canvas.paste(resized_image, (image_x, image_y), resized_image)
+            del resized_image
+            
+            # Add text overlays with shortened model name (IP instead of iPhone)
+            with self.time_stage('overlays'):
+                canvas = self.add_text_overlays(canvas, order_number, plan.label)
+            
+            # Debug logging to verify dimensions
+            actual_width_cm = target_width_px * 2.54 / self.dpi
+            self.log_message(f"Original: {plan.width_cm}cm -> Compensated: {plan.target_width_cm}cm ({target_width_px}px) -> Actual: {actual_width_cm:.3f}cm")
+            
+            return canvas
+            
+        except Exception as e:
+            self.log_message(f"Error creating print-ready image: {str(e)}")
+            return None
+            
+    def get_artwork_layer(self, input_path, target_width_px):
+        """Return the flipped, resized artwork layer - from the layer cache when enabled"""
+        cache = self.get_layer_cache()
+        if cache is None:
+            return self.create_artwork_layer(input_path, target_width_px)
+        
+        resample_settings = (f"lanczos:{self.fast_decode}:{FAST_DECODE_MIN_RATIO}:{FAST_DECODE_REDUCING_GAP}"
+                             + ''.join(f":{value}" for value in self.get_color_settings().values()))
+        key = cache.make_key(self.hash_input(input_path), target_width_px, resample_settings)
+        layer = cache.get(key)
+        if layer is not None:
+            self.job_stats['layer_cache_hits'] = 1
+            return layer
+        
+        self.job_stats['layer_cache_misses'] = 1
+        layer = self.create_artwork_layer(input_path, target_width_px)
+        cache.put(key, layer)
+        return layer
+        
+    def get_layer_cache(self):
+        """Return the layer cache for the configured folder, or None when caching is off"""
+        if not self.layer_cache_folder:
+            return None
+        if (self.layer_cache is None or self.layer_cache.folder != self.layer_cache_folder or
+                self.layer_cache.max_bytes != self.layer_cache_size_mb * 1024 * 1024):
+            self.layer_cache = LayerCache(self.layer_cache_folder, self.layer_cache_size_mb)
+        return self.layer_cache
+        
+    def create_artwork_layer(self, input_path, target_width_px, fast_decode=None, tiled=None):
+        """Load an artwork file and return it flipped and resized to target_width_px as RGBA
+        
+        With fast decoding, JPEGs much wider than the target are decoded at a reduced
+        scale (Image.draft) and the resize reduces by whole factors before LANCZOS,
+        always keeping at least FAST_DECODE_MIN_RATIO x the target width of real detail.
+        
+        To keep peak memory low the image is resized before it is flipped, RGB/L
+        sources are only converted to RGBA once they are small, and each full-size
+        intermediate is released as soon as the next one exists. Sources above
+        TILED_RENDER_MIN_PIXELS (or with tiled=True) go through resize_in_strips.
+        """
+        if fast_decode is None:
+            fast_decode = self.fast_decode
+        
+        # Load the original image
+        with self.open_input(input_path) as original_image:
+            # Aspect ratio comes from the full-size header, before any draft scaling
+            original_width, original_height = original_image.size
+            aspect_ratio = original_height / original_width
+            target_height_px = round(target_width_px * aspect_ratio)
+            
+            oversized = original_width >= target_width_px * FAST_DECODE_MIN_RATIO
+            if fast_decode and oversized and original_image.format == 'JPEG':
+                # Let the JPEG decoder skip detail we would throw away anyway
+                original_image.draft(original_image.mode, (target_width_px * FAST_DECODE_MIN_RATIO,
+                                                           target_height_px * FAST_DECODE_MIN_RATIO))
+            
+            reducing_gap = FAST_DECODE_REDUCING_GAP if fast_decode and oversized else None
+            if tiled is None:
+                # draft() has already updated size to the scale the decoder will produce
+                tiled = original_image.width * original_image.height > TILED_RENDER_MIN_PIXELS
+            
+            # Decode now (convert/resize would do it anyway) so decoding is timed on its own
+            with self.time_stage('load'):
+                original_image.load()
+            
+            # Colour management - greyscale and CMYK profiles only fit the source pixels, so
+            # those go to RGB at full size; RGB sources are converted once they are small
+            late_color = False
+            if self.output_profile:
+                source_profile = self.get_source_profile(original_image, input_path)
+                if source_profile is not None and source_profile[16:20] != b'RGB ':
+                    with self.time_stage('color'):
+                        original_image = self.apply_color_transform(original_image, source_profile, 'RGB',
+                                                                    input_path)
+                else:
+                    late_color = True
+            
+            if tiled:
+                resized_image = self.resize_in_strips(original_image, (target_width_px, target_height_px),
+                                                      reducing_gap)
+            else:
+                # Opaque sources resize the same before or after adding alpha - convert the small copy.
+                # RGBA is never converted: convert() to the same mode still copies the whole image
+                source_image = original_image
+                if original_image.mode not in LATE_CONVERT_MODES and original_image.mode != 'RGBA':
+                    with self.time_stage('convert'):
+                        source_image = original_image.convert('RGBA')
+                
+                # Resize image maintaining aspect ratio
+                with self.time_stage('resize'):
+                    resized_image = source_image.resize((target_width_px, target_height_px),
+                                                        Image.Resampling.LANCZOS, reducing_gap=reducing_gap)
+                del source_image
+        
+        if resized_image.mode != 'RGBA':
+            with self.time_stage('convert'):
+                resized_image = resized_image.convert('RGBA')
+        
+        if late_color:
+            with self.time_stage('color'):
+                resized_image = self.apply_color_transform(resized_image, source_profile, 'RGBA', input_path)
+        
+        # Horizontally flip the image (LANCZOS is symmetric, so flipping after resizing is equivalent)
+        with self.time_stage('flip'):
+            return resized_image.transpose(Image.FLIP_LEFT_RIGHT)
+        
+    def set_output_profile(self, path):
+        """Colour manage renders into the RGB ICC profile at path (None = plain conversion)
+        
+        Returns False (after logging why) if the profile can't be used; the current one is kept.
+        """
+        if not path:
+            self.output_profile = self.output_profile_name = self.output_profile_id = None
+            return True
+        from PIL import ImageCms
+        import hashlib
+        try:
+            with open(path, 'rb') as handle:
+                profile_data = handle.read()
+            profile = ImageCms.ImageCmsProfile(io.BytesIO(profile_data))
+        except (OSError, ImageCms.PyCMSError) as e:
+            self.log_message(f"Error: could not load colour profile {path}: {str(e)}")
+            return False
+        if profile_data[16:20] != b'RGB ':
+            self.log_message(f"Error: {os.path.basename(path)} is not an RGB profile - the film canvas is RGB")
+            return False
+        self.output_profile = profile_data
+        self.output_profile_name = ImageCms.getProfileDescription(profile).strip() or os.path.basename(path)
+        self.output_profile_id = hashlib.sha256(profile_data).hexdigest()[:16]
+        self.log_message(f"Colour management: {self.output_profile_name} ({self.color_intent})")
+        return True
+        
+    def get_color_settings(self):
+        """Colour settings that change rendered output (empty without colour management)"""
+        if not self.output_profile:
+            return {}
+        return {'output_profile': self.output_profile_id, 'intent': self.color_intent}
+        
+    def get_source_profile(self, image, input_path):
+        """The embedded ICC profile to convert an image from, or None to treat it as sRGB"""
+        profile_data = image.info.get('icc_profile')
+        if not profile_data:
+            return None
+        space = profile_data[16:20]
+        if space == b'RGB ' or ICC_SOURCE_SPACES.get(image.mode) == space:
+            return profile_data
+        self.log_message(f"Warning: {os.path.basename(input_path)} has a {space.decode('ascii', 'replace').strip()} "
+                         f"profile for {image.mode} pixels - treated as sRGB")
+        return None
+        
+    def get_color_transform(self, source_profile, mode, output_mode):
+        """ImageCms transform from a source profile (None = sRGB) to the output profile,
+        built once per (source, output, intent, modes) and reused for every image"""
+        key = (source_profile, self.output_profile, self.color_intent, mode, output_mode)
+        transform = self.color_transforms.get(key)
+        if transform is None:
+            from PIL import ImageCms
+            source = (ImageCms.ImageCmsProfile(io.BytesIO(source_profile)) if source_profile
+                      else ImageCms.createProfile('sRGB'))
+            transform = ImageCms.buildTransform(source, ImageCms.ImageCmsProfile(io.BytesIO(self.output_profile)),
+                                                mode, output_mode, renderingIntent=COLOR_INTENTS[self.color_intent])
+            self.color_transforms[key] = transform
+            self.job_stats['color_transforms_built'] = self.job_stats.get('color_transforms_built', 0) + 1
+        return transform
+        
+    def apply_color_transform(self, image, source_profile, output_mode, input_path):
+        """Convert an image into the output profile - unchanged (with a warning) if its profile is unusable"""
+        from PIL import ImageCms
+        try:
+            transform = self.get_color_transform(source_profile, image.mode, output_mode)
+            return ImageCms.applyTransform(image, transform)
+        except (ImageCms.PyCMSError, OSError, ValueError) as e:
+            self.log_message(f"Warning: could not colour manage {os.path.basename(input_path)} ({str(e)}) "
+                             "- converted without its profile")
+            return image
+            
+    def resize_in_strips(self, source_image, size, reducing_gap=None):
+        """LANCZOS-resize an image to an RGBA layer one horizontal strip at a time
+        
+        The source stays decoded in its own mode (one byte per pixel for palette and
+        greyscale art); only a strip of it plus the kernel's reach above and below is
+        converted to RGBA at once. Each strip resizes its exact share of the source via
+        the box argument, so strips join without seams.
+        
+        Only the converted and resized buffers are bounded by the strip height - Pillow
+        can't resume a PNG or JPEG decode part way, so the whole source is decoded first
+        and peak memory still grows with it. RGB, RGBA and L sources, which never get a
+        full-size RGBA copy on the plain path either, save little here.
+        """
+        source_width, source_height = source_image.size
+        target_width, target_height = size
+        scale_y = source_height / target_height
+        # LANCZOS reaches 3 output pixels each way - that many source rows once downscaled
+        reach = math.ceil(3 * max(scale_y, 1.0)) + 2
+        
+        source_image.load()
+        layer = Image.new('RGBA', size)
+        for top in range(0, target_height, TILED_RENDER_STRIP_ROWS):
+            bottom = min(top + TILED_RENDER_STRIP_ROWS, target_height)
+            box_top, box_bottom = top * scale_y, bottom * scale_y
+            crop_top = max(0, math.floor(box_top) - reach)
+            crop_bottom = min(source_height, math.ceil(box_bottom) + reach)
+            
+            with self.time_stage('convert'):
+                strip = source_image.crop((0, crop_top, source_width, crop_bottom))
+                if strip.mode not in LATE_CONVERT_MODES and strip.mode != 'RGBA':
+                    strip = strip.convert('RGBA')
+            with self.time_stage('resize'):
+                strip = strip.resize((target_width, bottom - top), Image.Resampling.LANCZOS,
+                                     box=(0, box_top - crop_top, source_width, box_bottom - crop_top),
+                                     reducing_gap=reducing_gap)
+                layer.paste(strip, (0, top))
+            del strip
+        return layer
+        
+    def get_canvas_template(self):
+        """Return the cleared, transparent full-film canvas that every render copies - tagged
+        with the output profile when colour managing, so saved files carry it"""
+        if self.canvas_template is None:
+            self.canvas_template = Image.new('RGBA', (self.film_width_px, self.film_height_px), (0, 0, 0, 0))
+        if self.output_profile:
+            self.canvas_template.info['icc_profile'] = self.output_profile
+        else:
+            self.canvas_template.info.pop('icc_profile', None)
+        return self.canvas_template
+        
+    def estimate_render_memory(self, input_path, target_width_px):
+        """Estimate peak bytes needed to render one file, from its header only"""
+        with Image.open(input_path) as image:
+            width, height = image.size
+            image_format = image.format
+            image_mode = image.mode
+        
+        # Account for JPEG draft scaling (1/2, 1/4 or 1/8) on oversized sources
+        if self.fast_decode and image_format == 'JPEG':
+            scale = 1
+            while scale < 8 and width / (scale * 2) >= target_width_px * FAST_DECODE_MIN_RATIO:
+                scale *= 2
+            width, height = width // scale, height // scale
+        
+        # Pillow keeps RGB/RGBA at 4 bytes per pixel: decoded source, the horizontal
+        # resample pass, then the canvas and the PNG encoder's working copy
+        target_height_px = round(target_width_px * height / width)
+        canvas_bytes = self.film_width_px * self.film_height_px * 4
+        if width * height > TILED_RENDER_MIN_PIXELS:
+            # Striped: the source in its own mode plus one RGBA strip and its resample pass
+            source_bytes = width * height * (1 if image_mode in SINGLE_BYTE_MODES else 4)
+            strip_rows = math.ceil((TILED_RENDER_STRIP_ROWS + 8) * height / target_height_px)
+            strip_bytes = width * strip_rows * 4 + target_width_px * strip_rows * 4
+            return source_bytes + strip_bytes + target_width_px * target_height_px * 4 + canvas_bytes * 2
+        return width * height * 4 + target_width_px * height * 4 + target_width_px * target_height_px * 4 + canvas_bytes * 2
+        
+    def add_text_overlays(self, canvas, order_number, display_model_name, origin=None):
+        """Add order number and model name text to the canvas as overlay - INK SAVING VERSION (no bold)
+        
+        Labels start at the top-left margin, or at origin for a design on a shared sheet.
+        """
+        try:
+            # Fonts are loaded once per process and labels come from the sprite cache
+            order_font, model_font = load_overlay_fonts()
+            
+            # Position both order number and model name on the same top line
+            margin = round(0.5 * self.dpi / 2.54)  # 5mm margin in pixels (FIXED: use round())
+            label_x, label_y = origin or (margin, margin)
+            order_text = order_number  # Already a string (supports 3a, 3b, 3c format)
+            
+            # Add order number in top-left corner
+            if order_font:
+                # Draw the text once only to save ink
+                order_width = self.paste_label(canvas, (label_x, label_y), order_text, ORDER_FONT_SIZE)
+                
+                # Add model name on the same line, with spacing after order number
+                spacing = round(1.0 * self.dpi / 2.54)  # 1cm spacing between order and model (FIXED: use round())
+                model_text_x = label_x + order_width + spacing
+                model_text_y = label_y
+                
+                # Draw model name
+                self.paste_label(canvas, (model_text_x, model_text_y), display_model_name, MODEL_FONT_SIZE)
+            else:
+                # Fallback without font
+                from PIL import ImageDraw
+                draw = ImageDraw.Draw(canvas)
+                draw.text((label_x, label_y), order_text, fill='black')
+                # Simple fallback positioning for model name
+                model_text_x = label_x + 200  # Rough spacing
+                draw.text((model_text_x, label_y), display_model_name, fill='black')
+            
+            return canvas
+            
+        except Exception as e:
+            self.log_message(f"Error adding text overlays: {str(e)}")
+            return canvas
+            
+    def paste_label(self, canvas, position, text, font_size):
+        """Blit a cached label sprite onto the canvas and return the text width"""
+        mask, (offset_x, offset_y), text_width = get_label_sprite(text, font_size)
+        if text_width > 0:
+            canvas.paste(OVERLAY_TEXT_COLOR, (position[0] + offset_x, position[1] + offset_y), mask)
+        return text_width
+        
+# Per-process engine used by process-pool workers
+_worker_engine = None
+_worker_messages = []
+
+def _init_render_worker(settings):
+    """Process pool initializer - build one engine per worker process"""
+    global _worker_engine
+    _worker_engine = PrintFilmEngine(log=_worker_messages.append)
+    for name, value in settings.items():
+        setattr(_worker_engine, name, value)
+
+def _render_worker_job(job):
+    """Render and save one resolved job in a worker, returning (success, log messages, job stats, stage timings)"""
+    return _render_worker_task('render_image_job', job, job[3])
+
+def _render_worker_task(method, args, name):
+    """Run one engine render method (e.g. render_sheet) in a worker
+    
+    Returns (success, log messages, job stats, stage timings).
+    """
+    del _worker_messages[:]
+    _worker_engine.job_stats = {}
+    _worker_engine.job_timings = {}
+    try:
+        success = getattr(_worker_engine, method)(*args)
+    except Exception as e:
+        _worker_engine.log_message(f"Error processing {name}: {str(e)}")
+        success = False
+    return success, list(_worker_messages), _worker_engine.job_stats, _worker_engine.job_timings
+
+class HotFolderWatcher:
+    """Renders images dropped into inbox folders as soon as they finish arriving
+    
+    Each watched folder is handled like a date folder picked with Browse Folder: new
+    images go through the same resolve/render steps as process_single_image into the
+    folder's "(PRINT MODE)" output. A file is rendered once its size and mtime have
+    been unchanged for settle_sec. Only pending files and the watched tree's folder list
+    are kept, so memory stays flat however long it runs.
+    """
+    def __init__(self, engine, folders, custom_output_folder=None, select_model=None,
+                 settle_sec=WATCH_SETTLE_SEC, poll_interval=WATCH_POLL_INTERVAL_SEC, use_inotify=True):
+        self.engine = engine
+        self.folders = [os.path.abspath(folder) for folder in folders]
+        self.output_folders = {folder: os.path.abspath(engine.get_folder_output_path(folder, custom_output_folder))
+                               for folder in self.folders}
+        self.select_model = select_model
+        self.settle_sec = settle_sec
+        self.poll_interval = poll_interval
+        self.use_inotify = use_inotify
+        self.pending = {}  # path -> {'signature', 'stable_since', 'arrived', 'attempts'}
+        self.rendered = 0
+        
+    def open_events(self):
+        """Return the change source - inotify where available, otherwise folder polling"""
+        if self.use_inotify:
+            try:
+                events = InotifyEvents(self.folders)
+                self.engine.log_message("Watching with inotify")
+                return events
+            except (OSError, AttributeError) as e:
+                self.engine.log_message(f"inotify unavailable ({str(e)}) - polling every {self.poll_interval:g}s")
+        else:
+            self.engine.log_message(f"Polling every {self.poll_interval:g}s")
+        return PollingEvents(self.folders)
+        
+    def get_watched_folder(self, path):
+        """The watched folder a path belongs to, or None if it should be ignored"""
+        for folder in self.folders:
+            try:
+                if os.path.commonpath([folder, path]) != folder:
+                    continue
+                # Skip anything written into an output folder inside the inbox
+                if os.path.commonpath([self.output_folders[folder], path]) == self.output_folders[folder]:
+                    return None
+            except ValueError:
+                continue
+            return folder
+        return None
+        
+    def track(self, path, now):
+        """Add or refresh a pending file, restarting its settle time whenever it changes"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            # Deleted or renamed while waiting
+            self.pending.pop(path, None)
+            return
+        signature = (stat.st_size, stat.st_mtime_ns)
+        entry = self.pending.get(path)
+        if entry is None:
+            self.pending[path] = {'signature': signature, 'stable_since': now, 'arrived': now, 'attempts': 0}
+        elif entry['signature'] != signature:
+            entry['signature'] = signature
+            entry['stable_since'] = now
+            
+    def queue_recent_files(self, now):
+        """After an inotify overflow, queue images modified in the last few minutes"""
+        self.engine.log_message("Warning: change events were dropped - checking recent files")
+        for folder in self.folders:
+            for file_path, relative_folder, filename in iter_image_files(folder):
+                try:
+                    if time.time() - os.stat(file_path).st_mtime <= WATCH_OVERFLOW_LOOKBACK_SEC:
+                        self.track(file_path, now)
+                except OSError:
+                    continue
+                    
+    def render(self, path):
+        """Render one settled file - True when rendered, None when skipped (no model) and
+        False when it should be tried again later"""
+        folder = self.get_watched_folder(path)
+        filename = os.path.basename(path)
+        relative_folder = os.path.relpath(os.path.dirname(path), folder)
+        engine = self.engine
+        engine.job_stats = {}
+        engine.job_timings = {}
+        try:
+            resolved = engine.resolve_image_job(filename, self.select_model, path)
+            if resolved is None:
+                # Nothing to retry - the model can't be worked out
+                return None
+            return engine.render_image_job(path, self.output_folders[folder], relative_folder, filename, *resolved)
+        except Exception as e:
+            engine.log_message(f"Error processing {filename}: {str(e)}")
+            return False
+        finally:
+            # Forget created folders so an output folder deleted while watching is recreated
+            engine.get_writer().close()
+            engine.save_model_decisions()
+            
+    def run(self, stop_event=None):
+        """Watch until stop_event is set (or forever) and return the number of files rendered"""
+        stop_event = stop_event or threading.Event()
+        for folder in self.folders:
+            self.engine.log_message(f"Watching: {folder} -> {self.output_folders[folder]}")
+        events = self.open_events()
+        try:
+            while not stop_event.is_set():
+                # Wake up in time to render files that are about to settle
+                changed = events.poll(min(self.poll_interval, self.settle_sec) if self.pending else self.poll_interval)
+                now = time.monotonic()
+                if getattr(events, 'overflowed', False):
+                    events.overflowed = False
+                    self.queue_recent_files(now)
+                for path in changed:
+                    if path.lower().endswith(IMAGE_EXTENSIONS) and self.get_watched_folder(path):
+                        self.track(path, now)
+                
+                for path in list(self.pending):
+                    self.track(path, now)
+                    entry = self.pending.get(path)
+                    if entry is None or now - entry['stable_since'] < self.settle_sec:
+                        continue
+                    if entry['signature'][0] == 0:
+                        # Created but not written yet - drop an abandoned upload instead of re-checking it forever
+                        if now - entry['stable_since'] >= WATCH_EMPTY_TIMEOUT_SEC:
+                            del self.pending[path]
+                            self.engine.log_message(f"Giving up on {os.path.basename(path)} - still empty after "
+                                                    f"{WATCH_EMPTY_TIMEOUT_SEC}s")
+                        continue
+                    
+                    result = self.render(path)
+                    if result is not False:
+                        del self.pending[path]
+                        if result:
+                            self.rendered += 1
+                            self.engine.log_message(f"Ready: {os.path.basename(path)} "
+                                                    f"({time.monotonic() - entry['arrived']:.1f}s after it arrived)")
+                    elif entry['attempts'] + 1 >= WATCH_MAX_ATTEMPTS:
+                        del self.pending[path]
+                        self.engine.log_message(f"Giving up on {os.path.basename(path)} after {WATCH_MAX_ATTEMPTS} attempts")
+                    else:
+                        # Perhaps still being written in a way the settle check missed - wait again
+                        entry['attempts'] += 1
+                        entry['stable_since'] = time.monotonic()
+                    if stop_event.is_set():
+                        break
+        finally:
+            events.close()
+        return self.rendered
+
+class JobQueue:
+    """Render jobs in a SQLite database shared by any number of worker processes and hosts
+    
+    Workers claim the oldest pending job with a lease and renew it while they render.
+    A job whose lease runs out (its worker crashed or lost the share) is claimed again
+    by the next worker, up to JOB_MAX_ATTEMPTS claims. Claims take the database's write
+    lock (BEGIN IMMEDIATE), so two workers never get the same job. The file must be on a
+    filesystem with working locks; every host needs the same paths and a synced clock.
+    """
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY,
+            input_path TEXT NOT NULL,
+            relative_folder TEXT NOT NULL,
+            filename TEXT NOT NULL,
+            output_folder TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            worker TEXT,
+            lease_expires REAL,
+            enqueued_at REAL NOT NULL,
+            started_at REAL,
+            finished_at REAL,
+            error TEXT,
+            UNIQUE (input_path, output_folder)
+        );
+        CREATE INDEX IF NOT EXISTS jobs_by_status ON jobs (status, id);
+    """
+    STATUSES = ('pending', 'leased', 'done', 'failed')
+    
+    def __init__(self, path):
+        import sqlite3
+        self.path = path
+        # Autocommit - transactions are opened explicitly where they are needed
+        self.connection = sqlite3.connect(path, timeout=JOB_QUEUE_BUSY_TIMEOUT_SEC, isolation_level=None)
+        self.connection.row_factory = sqlite3.Row
+        version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+        if version not in (0, JOB_QUEUE_VERSION):
+            self.connection.close()
+            raise ValueError(f"{path} is a version {version} job queue (expected {JOB_QUEUE_VERSION})")
+        if version == 0:
+            self.connection.executescript(f"BEGIN IMMEDIATE; {self.SCHEMA} "
+                                          f"PRAGMA user_version = {JOB_QUEUE_VERSION}; COMMIT;")
+                
+    @contextlib.contextmanager
+    def transaction(self):
+        """Run the with-block holding the database write lock"""
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+        self.connection.execute("COMMIT")
+        
+    def close(self):
+        self.connection.close()
+        
+    def add(self, jobs, output_folder):
+        """Queue (file_path, relative_folder, filename) jobs for output_folder - returns how many
+        were new (inputs already queued for that folder are left as they are)"""
+        now = time.time()
+        with self.transaction():
+            before = self.connection.total_changes
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO jobs (input_path, relative_folder, filename, output_folder, enqueued_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                ((os.path.abspath(file_path), relative_folder, filename, output_folder, now)
+                 for file_path, relative_folder, filename in jobs))
+            return self.connection.total_changes - before
+            
+    def claim(self, worker, lease_sec=JOB_LEASE_SEC, max_attempts=JOB_MAX_ATTEMPTS, log=print):
+        """Lease the next job to worker and return its row, or None if nothing is waiting
+        
+        Jobs whose lease has expired are reclaimed; after max_attempts claims they are
+        failed instead, so a file that crashes every worker can't stall the queue.
+        """
+        while True:
+            now = time.time()
+            with self.transaction():
+                job = self.connection.execute(
+                    "SELECT * FROM jobs WHERE status = 'pending' OR (status = 'leased' AND lease_expires < ?) "
+                    "ORDER BY id LIMIT 1", (now,)).fetchone()
+                if job is None:
+                    return None
+                if job['status'] == 'leased':
+                    if job['attempts'] >= max_attempts:
+                        self.connection.execute(
+                            "UPDATE jobs SET status = 'failed', finished_at = ?, error = ? WHERE id = ?",
+                            (now, f"Lease expired {job['attempts']} times (last worker: {job['worker']})", job['id']))
+                        log(f"Giving up on {job['filename']} after {job['attempts']} expired leases")
+                        continue
+                    log(f"Reclaimed: {job['filename']} (lease held by {job['worker']} expired)")
+                self.connection.execute(
+                    "UPDATE jobs SET status = 'leased', worker = ?, lease_expires = ?, attempts = attempts + 1, "
+                    "started_at = ?, error = NULL WHERE id = ?", (worker, now + lease_sec, now, job['id']))
+                return job
+                
+    def renew(self, job_id, worker, lease_sec=JOB_LEASE_SEC):
+        """Extend a lease - False if the job is no longer leased to worker"""
+        cursor = self.connection.execute(
+            "UPDATE jobs SET lease_expires = ? WHERE id = ? AND worker = ? AND status = 'leased'",
+            (time.time() + lease_sec, job_id, worker))
+        return cursor.rowcount == 1
+        
+    def finish(self, job_id, worker, error=None):
+        """Record a job as done (or failed with error) - False if its lease had been lost"""
+        cursor = self.connection.execute(
+            "UPDATE jobs SET status = ?, finished_at = ?, lease_expires = NULL, error = ? "
+            "WHERE id = ? AND worker = ? AND status = 'leased'",
+            ('failed' if error else 'done', time.time(), error, job_id, worker))
+        return cursor.rowcount == 1
+        
+    def retry_failed(self):
+        """Put failed jobs back in the queue and return how many there were"""
+        cursor = self.connection.execute(
+            "UPDATE jobs SET status = 'pending', attempts = 0, worker = NULL, error = NULL WHERE status = 'failed'")
+        return cursor.rowcount
+        
+    def get_status(self, window_sec=JOB_STATUS_WINDOW_SEC):
+        """Job counts, active workers, recent throughput and failures
+        
+        The rate is over the last window_sec, or since the first of those jobs started if
+        that is more recent, so a short burst isn't averaged over the whole window.
+        """
+        now = time.time()
+        execute = self.connection.execute
+        counts = dict.fromkeys(self.STATUSES, 0)
+        counts.update(execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        active_workers = [row[0] for row in execute(
+            "SELECT DISTINCT worker FROM jobs WHERE status = 'leased' AND lease_expires >= ? ORDER BY worker", (now,))]
+        recent = execute(
+            "SELECT worker, COUNT(*), AVG(finished_at - started_at), MIN(started_at) FROM jobs "
+            "WHERE status = 'done' AND finished_at >= ? GROUP BY worker ORDER BY worker", (now - window_sec,)).fetchall()
+        recent_sec = min(window_sec, now - min((row[3] for row in recent), default=now))
+        failures = execute("SELECT input_path, error FROM jobs WHERE status = 'failed' ORDER BY id").fetchall()
+        return {
+            'counts': counts,
+            'active_workers': active_workers,
+            'expired_leases': execute("SELECT COUNT(*) FROM jobs WHERE status = 'leased' AND lease_expires < ?",
+                                      (now,)).fetchone()[0],
+            'recent_done': {worker: (count, avg_sec) for worker, count, avg_sec, first_start in recent},
+            'rate_per_min': sum(row[1] for row in recent) / recent_sec * 60 if recent_sec > 0 else 0.0,
+            'window_sec': window_sec,
+            'failures': [(input_path, error) for input_path, error in failures],
+        }
+        
+class QueueWorker:
+    """Claims jobs from a JobQueue and renders them with process_single_image until stopped
+    
+    Leases are renewed from a background thread while a job renders, so slow files
+    aren't reclaimed from a live worker. Each worker is named host:pid in the queue.
+    """
+    def __init__(self, engine, queue_path, select_model=None, lease_sec=JOB_LEASE_SEC,
+                 max_attempts=JOB_MAX_ATTEMPTS, poll_interval=JOB_POLL_INTERVAL_SEC):
+        import socket
+        self.engine = engine
+        self.queue_path = queue_path
+        self.select_model = select_model
+        self.lease_sec = lease_sec
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.rendered = 0
+        self.failed = 0
+        
+        # The last error/skip message logged for the current job - recorded with a failure
+        self.engine_log = engine.log
+        self.last_problem = None
+        engine.log = self.capture_log
+        
+    def capture_log(self, message):
+        if message.startswith(('Error', 'Skipped')):
+            self.last_problem = message
+        self.engine_log(message)
+        
+    def keep_lease(self, job_id, done):
+        """Renew a job's lease until done is set (runs on its own thread and connection)"""
+        queue = JobQueue(self.queue_path)
+        try:
+            while not done.wait(self.lease_sec / 3):
+                try:
+                    if not queue.renew(job_id, self.worker_id, self.lease_sec):
+                        return
+                except Exception as e:
+                    self.engine.log_message(f"Warning: could not renew lease: {str(e)}")
+        finally:
+            queue.close()
+            
+    def render(self, job):
+        """Render one claimed job - returns the error to record, or None on success"""
+        engine = self.engine
+        engine.job_stats = {}
+        engine.job_timings = {}
+        self.last_problem = None
+        done = threading.Event()
+        heartbeat = threading.Thread(target=self.keep_lease, args=(job['id'], done), daemon=True)
+        heartbeat.start()
+        try:
+            success = engine.process_single_image(job['input_path'], job['output_folder'],
+                                                  job['relative_folder'], job['filename'], self.select_model)
+        finally:
+            done.set()
+            heartbeat.join()
+            # Forget created folders so an output folder deleted meanwhile is recreated
+            engine.get_writer().close()
+            engine.save_model_decisions()
+        if success:
+            return None
+        return self.last_problem or f"Could not render {job['filename']}"
+        
+    def run(self, stop_event=None, exit_when_empty=False):
+        """Work until stop_event is set (or the queue is empty, with exit_when_empty) and
+        return the number of jobs rendered"""
+        stop_event = stop_event or threading.Event()
+        queue = JobQueue(self.queue_path)
+        self.engine.log_message(f"Worker {self.worker_id} on {os.path.abspath(self.queue_path)}")
+        try:
+            while not stop_event.is_set():
+                job = queue.claim(self.worker_id, self.lease_sec, self.max_attempts, self.engine.log_message)
+                if job is None:
+                    if exit_when_empty:
+                        break
+                    stop_event.wait(self.poll_interval)
+                    continue
+                
+                start_time = time.perf_counter()
+                error = self.render(job)
+                if not queue.finish(job['id'], self.worker_id, error):
+                    self.engine.log_message(f"Warning: lease on {job['filename']} expired while rendering "
+                                            "- another worker may render it too")
+                elif error:
+                    self.failed += 1
+                else:
+                    self.rendered += 1
+                    self.engine.log_message(f"Done: {job['filename']} ({time.perf_counter() - start_time:.1f}s)")
+        finally:
+            queue.close()
+        return self.rendered
+        
 class iPhoneCaseProcessor:
     def __init__(self):
+        load_tkinter()
         self.root = tk.Tk()
         self.root.title("iPhone Case Print Film Processor")
         self.root.geometry("800x600")
         
-        # iPhone model specifications
-        self.model_specs = {
-            # iPhone 7/8 Series
-            'iPhone 7': {'width_cm': 9.5, 'category': 'legacy'},
-            'iPhone 7 Plus': {'width_cm': 10.8, 'category': 'legacy_plus'},
-            'iPhone 8': {'width_cm': 9.5, 'category': 'legacy'},
-            'iPhone 8 Plus': {'width_cm': 10.8, 'category': 'legacy_plus'},
-            
-            # Mini Models
-            'iPhone 12 mini': {'width_cm': 9.0, 'category': 'mini'},  # CHANGED from 9.5 to 9.0
-            'iPhone 13 mini': {'width_cm': 9.0, 'category': 'mini'},  # CHANGED from 9.5 to 9.0
-            
-            # Regular/Pro Models
-            'iPhone 12': {'width_cm': 9.8, 'category': 'regular'},
-            'iPhone 12 Pro': {'width_cm': 9.8, 'category': 'regular'},
-            'iPhone 13': {'width_cm': 9.8, 'category': 'regular'},
-            'iPhone 13 Pro': {'width_cm': 9.8, 'category': 'regular'},
-            'iPhone 14': {'width_cm': 9.8, 'category': 'regular'},
-            'iPhone 14 Pro': {'width_cm': 9.8, 'category': 'regular'},
-            'iPhone 15': {'width_cm': 9.8, 'category': 'regular'},
-            'iPhone 15 Pro': {'width_cm': 9.8, 'category': 'regular'},
-            'iPhone 16': {'width_cm': 9.8, 'category': 'regular'},
-            'iPhone 16 Pro': {'width_cm': 9.8, 'category': 'regular'},
-            
-            # XR/11 Models
-            'iPhone XR': {'width_cm': 10.5, 'category': 'xr11'},        # CHANGED from 10.2 to 10.5
-            'iPhone 11': {'width_cm': 10.5, 'category': 'xr11'},       # CHANGED from 10.2 to 10.5
-            
-            # XS Max/11 Pro Max 
-            'iPhone XS Max': {'width_cm': 10.7, 'category': 'xs_max'}, # CHANGED from 10.45 to 10.7
-            'iPhone 11 Pro Max': {'width_cm': 10.8, 'category': 'xs_max'}, # CHANGED from 10.45 to 10.8
-            
-            # Plus/Pro Max Models
-            'iPhone 12 Pro Max': {'width_cm': 10.65, 'category': 'plus_max'},
-            'iPhone 13 Pro Max': {'width_cm': 10.65, 'category': 'plus_max'},
-            'iPhone 14 Plus': {'width_cm': 10.65, 'category': 'plus_max'},
-            'iPhone 14 Pro Max': {'width_cm': 10.65, 'category': 'plus_max'},
-            'iPhone 15 Plus': {'width_cm': 10.65, 'category': 'plus_max'},
-            'iPhone 15 Pro Max': {'width_cm': 10.65, 'category': 'plus_max'},
-            'iPhone 16 Plus': {'width_cm': 10.65, 'category': 'plus_max'},
-            'iPhone 16 Pro Max': {'width_cm': 10.65, 'category': 'plus_max'},
-            
-            # X/XS/11 Pro Models
-            'iPhone X': {'width_cm': 8.3, 'category': 'x_xs'},         # CHANGED from 11.3 to 8.3
-            'iPhone XS': {'width_cm': 8.3, 'category': 'x_xs'},        # CHANGED from 11.3 to 8.3
-            'iPhone 11 Pro': {'width_cm': 10.0, 'category': 'x_xs'},   # CHANGED from 11.3 to 10.0
-        }
-        
-        # Print film specifications - Portrait orientation
-        self.film_width_cm = 14.8
-        self.film_height_cm = 25.5
-        self.dpi = 300
+        # All rendering goes through the headless engine; undetected files wait for one review
+        self.engine = PrintFilmEngine(log=self.log_message)
+        self.engine.defer_undetected = True
+        # Models picked at review are remembered, so reprints aren't asked about again
+        self.engine.model_decisions_path = MODEL_DECISIONS_PATH
         
-        # Convert cm to pixels at 300 DPI with proper rounding (FIXED)
-        self.film_width_px = round(self.film_width_cm * self.dpi / 2.54)
-        self.film_height_px = round(self.film_height_cm * self.dpi / 2.54)
+        # Background threads post log/progress events here; the Tk thread drains them
+        self.ui_queue = queue.Queue()
+        self.full_log = tempfile.TemporaryFile(mode='w+', encoding='utf-8')
         
         self.setup_ui()
+        self.root.after(UI_DRAIN_INTERVAL_MS, self.drain_ui_queue)
         
+        # Only what the window needs is built here - the rest waits until it has been drawn
+        self.root.after_idle(self.finish_startup)
+        
+    def finish_startup(self):
+        """Setup that can wait until the window is on screen"""
+        self.engine.load_model_registry()
+        
+        # Compile the detection patterns and load the fonts in the background, so neither
+        # the window nor the first render waits for them
+        threading.Thread(target=warm_up_render_caches, daemon=True).start()
+        
+        if os.environ.get(STARTUP_PROBE_ENV):
+            # bench startup: report when the window is drawn and idle, then close
+            self.root.update()
+            print(f"gui_ready {time.time():.6f}", flush=True)
+            self.root.destroy()
+            
     def setup_ui(self):
         """Create the main user interface"""
         # Main frame
@@ -93,6 +3577,11 @@ class iPhoneCaseProcessor:
         ttk.Label(folder_frame, textvariable=self.folder_path_var, 
                  foreground="blue").grid(row=0, column=1, sticky=(tk.W, tk.E))
         
+        # Render new files dropped into the selected folder until stopped
+        self.watch_btn = ttk.Button(folder_frame, text="Watch Folder", command=self.toggle_watch)
+        self.watch_btn.grid(row=0, column=2, padx=(10, 0))
+        folder_frame.columnconfigure(1, weight=1)
+        
         # File processing section
         file_frame = ttk.LabelFrame(main_frame, text="Individual Files", padding="10")
         file_frame.grid(row=2, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=(0, 10))
@@ -119,6 +3608,24 @@ class iPhoneCaseProcessor:
         ttk.Button(output_frame, text="Use Default", 
                   command=self.clear_output_folder).grid(row=0, column=2, padx=(10, 0))
         
+        # PNG per design, or the whole batch as one document for the RIP
+        ttk.Label(output_frame, text="Save as:").grid(row=0, column=3, padx=(10, 5))
+        self.batch_output_var = tk.StringVar(value='PNG files')
+        ttk.Combobox(output_frame, textvariable=self.batch_output_var, values=list(BATCH_OUTPUT_CHOICES),
+                     state='readonly', width=15).grid(row=0, column=4)
+        
+        # Optional colour management into the printer's ICC profile
+        ttk.Button(output_frame, text="Printer Profile", 
+                  command=self.browse_output_profile).grid(row=1, column=0, padx=(0, 10), pady=(5, 0))
+        self.output_profile_var = tk.StringVar(value="No colour management")
+        ttk.Label(output_frame, textvariable=self.output_profile_var).grid(row=1, column=1, sticky=tk.W, pady=(5, 0))
+        ttk.Button(output_frame, text="No Profile", 
+                  command=self.clear_output_profile).grid(row=1, column=2, padx=(10, 0), pady=(5, 0))
+        ttk.Label(output_frame, text="Intent:").grid(row=1, column=3, padx=(10, 5), pady=(5, 0))
+        self.color_intent_var = tk.StringVar(value='perceptual')
+        ttk.Combobox(output_frame, textvariable=self.color_intent_var, values=list(COLOR_INTENTS),
+                     state='readonly', width=15).grid(row=1, column=4, pady=(5, 0))
+        
         # Configure output frame grid
         output_frame.columnconfigure(1, weight=1)
         
@@ -130,6 +3637,39 @@ class iPhoneCaseProcessor:
                                      command=self.start_processing, state='disabled')
         self.process_btn.grid(row=0, column=0, padx=(0, 10))
         
+        # Parallel render processes (1 = single process)
+        ttk.Label(control_frame, text="Workers:").grid(row=0, column=1, padx=(10, 5))
+        self.workers_var = tk.IntVar(value=1)
+        ttk.Spinbox(control_frame, from_=1, to=os.cpu_count() or 1, width=4,
+                    textvariable=self.workers_var).grid(row=0, column=2)
+        
+        # Memory budget shared by the workers (0 = no limit)
+        ttk.Label(control_frame, text="Memory budget (MB):").grid(row=0, column=3, padx=(10, 5))
+        self.memory_budget_var = tk.IntVar(value=0)
+        ttk.Spinbox(control_frame, from_=0, to=65536, increment=256, width=6,
+                    textvariable=self.memory_budget_var).grid(row=0, column=4)
+        
+        # PNG encode profile (speed vs file size)
+        ttk.Label(control_frame, text="PNG:").grid(row=0, column=5, padx=(10, 5))
+        self.encode_profile_var = tk.StringVar(value='balanced')
+        ttk.Combobox(control_frame, textvariable=self.encode_profile_var, values=list(ENCODE_PROFILES),
+                     state='readonly', width=9).grid(row=0, column=6)
+        
+        # Only re-render new or changed inputs
+        self.incremental_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(control_frame, text="Skip unchanged",
+                        variable=self.incremental_var).grid(row=0, column=7, padx=(10, 0))
+        
+        # Reuse resized artwork for repeated designs
+        self.layer_cache_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(control_frame, text="Cache artwork",
+                        variable=self.layer_cache_var).grid(row=0, column=8, padx=(10, 0))
+        
+        # Share film sheets between small designs
+        self.nest_sheets_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(control_frame, text="Nest on sheets",
+                        variable=self.nest_sheets_var).grid(row=0, column=9, padx=(10, 0))
+        
         # Progress bar
         self.progress_var = tk.DoubleVar()
         self.progress_bar = ttk.Progressbar(main_frame, variable=self.progress_var, 
@@ -151,6 +3691,14 @@ class iPhoneCaseProcessor:
         self.result_text.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
         scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
         
+        # The view only keeps the last LOG_VIEW_MAX_LINES lines - the full log can be saved
+        ttk.Button(result_frame, text="Save Full Log",
+                  command=self.save_full_log).grid(row=1, column=0, sticky=tk.E, pady=(5, 0))
+        
+        # Review, correct or export the models remembered per design
+        ttk.Button(result_frame, text="Model Decisions...",
+                  command=self.show_model_decisions_dialog).grid(row=1, column=0, sticky=tk.W, pady=(5, 0))
+        
         # Configure grid weights
         self.root.columnconfigure(0, weight=1)
         self.root.rowconfigure(0, weight=1)
@@ -160,6 +3708,7 @@ class iPhoneCaseProcessor:
         result_frame.rowconfigure(0, weight=1)
         
         # Storage for processing data
+        self.watch_stop = None
         self.selected_folder = None
         self.selected_files = []
         self.custom_output_folder = None
@@ -207,677 +3756,1418 @@ class iPhoneCaseProcessor:
         self.custom_output_folder = None
         self.output_path_var.set("Using default location")
         self.log_message("Reset to default output location")
+        
+    def browse_output_profile(self):
+        """Browse for the printer's ICC profile"""
+        profile_path = filedialog.askopenfilename(title="Select Printer Profile",
+                                                  filetypes=[("ICC profiles", "*.icc *.icm"), ("All files", "*.*")])
+        if profile_path and self.engine.set_output_profile(profile_path):
+            self.output_profile_var.set(f"Profile: {self.engine.output_profile_name}")
+            self.log_message(f"Printer profile set: {profile_path}")
+    
+    def clear_output_profile(self):
+        """Turn colour management off"""
+        self.engine.set_output_profile(None)
+        self.output_profile_var.set("No colour management")
+        self.log_message("Colour management off")
             
     def log_message(self, message):
-        """Add a message to the results text area"""
-        self.result_text.insert(tk.END, message + "\n")
-        self.result_text.see(tk.END)
-        self.root.update_idletasks()
-        
-    def extract_order_number(self, filename):
-        """Extract order number from filename (supports letter suffixes like 3a, 3b, 3c)"""
-        # Remove file extension
-        name = os.path.splitext(filename)[0]
-        
-        # Look for leading digits optionally followed by a letter (e.g., 3, 3a, 3b, 3c)
-        match = re.match(r'^(\d+[a-zA-Z]?)', name)
-        if match:
-            return match.group(1)  # Return as string to preserve letter suffix
-        
-        return None
-        
-    def detect_phone_model(self, filename):
-        """Auto-detect phone model from filename using comprehensive fuzzy matching - UPDATED WITH NEW MODELS"""
-        # Remove file extension and convert to lowercase
-        name = os.path.splitext(filename.lower())[0]
+        """Queue a message for the results text area (safe from any thread)"""
+        self.ui_queue.put(('log', message))
         
-        # Remove order number prefix (including leading zeros and letter suffixes like 3a, 3b)
-        name = re.sub(r'^\d+[a-zA-Z]?[-_\s\.]*', '', name)
-        
-        # Normalize separators - replace any combination of separators with single space
-        name = re.sub(r'[-_\s\.]+', ' ', name).strip()
-        
-        # Remove extra whitespace
-        name = re.sub(r'\s+', ' ', name)
-        
-        # COMPREHENSIVE MODEL PATTERNS - UPDATED WITH iPhone 7/8 SERIES
-        # Order is CRITICAL - most specific patterns first to avoid false matches
+    def drain_ui_queue(self):
+        """Apply queued log/progress events in one batch, then reschedule"""
+        lines = []
+        progress = None
+        status = None
+        button_state = None
+        review = None
+        try:
+            for _ in range(UI_DRAIN_MAX_EVENTS):
+                event = self.ui_queue.get_nowait()
+                if event[0] == 'log':
+                    lines.append(event[1])
+                elif event[0] == 'progress':
+                    progress = event[1]
+                elif event[0] == 'status':
+                    status = event[1]
+                elif event[0] == 'button':
+                    button_state = event[1]
+                elif event[0] == 'review':
+                    review = event[1]
+                    break
+        except queue.Empty:
+            pass
         
-        model_patterns = {
-            # ===== iPhone 16 Series =====
-            # Pro Max patterns (must come before Pro)
-            r'(?:i?phone?|iph?|ip|a|apple)?\s*16\s*(?:pro?\s*)?(?:max|mx|pm|prm|promax|promx)': 'iPhone 16 Pro Max',
-            
-            # Plus patterns  
-            r'(?:i?phone?|iph?|ip|a|apple)?\s*16\s*(?:plus|pl|\+|p(?=\s|$))': 'iPhone 16 Plus',
-            
-            # Pro patterns (must come after Pro Max and Plus)
-            r'(?:i?phone?|iph?|ip|a|apple)?\s*16\s*(?:pro?|pr|p)(?!\s*(?:max|mx|plus|pl|\+))': 'iPhone 16 Pro',
-            
-            # Base model - enhanced to handle "iphone16" and "iphone 16"
-            r'(?:i?phone?|iph?|ip|a|apple)?\s*16(?!\d)(?!\s*(?:pro?|pr|p|plus|pl|\+|max|mx))': 'iPhone 16',
+        if lines:
+            text = "\n".join(lines) + "\n"
+            self.full_log.write(text)
             
-            # ===== iPhone 15 Series =====
-            # Pro Max patterns
-            r'(?:i?phone?|iph?|ip|a|apple)?\s*15\s*(?:pro?\s*)?(?:max|mx|pm|prm|promax|promx)': 'iPhone 15 Pro Max',
+            # Only the tail of a big burst can stay in the view anyway
+            if len(lines) > LOG_VIEW_MAX_LINES:
+                text = "\n".join(lines[-LOG_VIEW_MAX_LINES:]) + "\n"
+            self.result_text.insert(tk.END, text)
             
-            # Plus patterns
-            r'(?:i?phone?|iph?|ip|a|apple)?\s*15\s*(?:plus|pl|\+|p(?=\s|$))': 'iPhone 15 Plus',
-            
-            # Pro patterns
-            r'(?:i?phone?|iph?|ip|a|apple)?\s*15\s*(?:pro?|pr|p)(?!\s*(?:max|mx|plus|pl|\+))': 'iPhone 15 Pro',
-            
-            # Base model - enhanced to handle "iphone15" and "iphone 15"
-            r'(?:i?phone?|iph?|ip|a|apple)?\s*15(?!\d)(?!\s*(?:pro?|pr|p|plus|pl|\+|max|mx))': 'iPhone 15',
-            
-            # ===== iPhone 14 Series =====
-            # Pro Max patterns
-            r'(?:i?phone?|iph?|ip|a|apple)?\s*14\s*(?:pro?\s*)?(?:max|mx|pm|prm|promax|promx)': 'iPhone 14 Pro Max',
-            
-            # Plus patterns
-            r'(?:i?phone?|iph?|ip|a|apple)?\s*14\s*(?:plus|pl|\+|p(?=\s|$))': 'iPhone 14 Plus',
-            
-            # Pro patterns
-            r'(?:i?phone?|iph?|ip|a|apple)?\s*14\s*(?:pro?|pr|p)(?!\s*(?:max|mx|plus|pl|\+))': 'iPhone 14 Pro',
-            
-            # Base model - enhanced to handle "iphone14" and "iphone 14"
-            r'(?:i?phone?|iph?|ip|a|apple)?\s*14(?!\d)(?!\s*(?:pro?|pr|p|plus|pl|\+|max|mx))': 'iPhone 14',
-            
-            # ===== iPhone 13 Series =====
-            # Pro Max patterns
-            r'(?:i?phone?|iph?|ip|a|apple)?\s*13\s*(?:pro?\s*)?(?:max|mx|pm|prm|promax|promx)': 'iPhone 13 Pro Max',
-            
-            # Pro patterns (must come before base model to avoid conflicts)
-            r'(?:i?phone?|iph?|ip|a|apple)?\s*13\s*(?:pro?|pr|p)(?!\s*(?:max|mx))': 'iPhone 13 Pro',
-            
-            # Mini patterns
-            r'(?:i?phone?|iph?|ip|a|apple)?\s*13\s*(?:mini?|mn|m)(?!\s*(?:ax|x))': 'iPhone 13 mini',
-            
-            # Base model - enhanced to handle "iphone13" and "iphone 13"
-            r'(?:i?phone?|iph?|ip|a|apple)?\s*13(?!\d)(?!\s*(?:pro?|pr|p|mini?|mn|m|max|mx))': 'iPhone 13',
-            
-            # ===== iPhone 12 Series =====
-            # Pro Max patterns
-            r'(?:i?phone?|iph?|ip|a|apple)?\s*12\s*(?:pro?\s*)?(?:max|mx|pm|prm|promax|promx)': 'iPhone 12 Pro Max',
-            
-            # Pro patterns
-            r'(?:i?phone?|iph?|ip|a|apple)?\s*12\s*(?:pro?|pr|p)(?!\s*(?:max|mx))': 'iPhone 12 Pro',
-            
-            # Mini patterns
-            r'(?:i?phone?|iph?|ip|a|apple)?\s*12\s*(?:mini?|mn|m)(?!\s*(?:ax|x))': 'iPhone 12 mini',
-            
-            # Base model - enhanced to handle "iphone12" and "iphone 12"
-            r'(?:i?phone?|iph?|ip|a|apple)?\s*12(?!\d)(?!\s*(?:pro?|pr|p|mini?|mn|m|max|mx))': 'iPhone 12',
-            
-            # ===== iPhone 11 Series =====
-            # Pro Max patterns
-            r'(?:i?phone?|iph?|ip|a|apple)?\s*11\s*(?:pro?\s*)?(?:max|mx|pm|prm|promax|promx)': 'iPhone 11 Pro Max',
-            
-            # Pro patterns
-            r'(?:i?phone?|iph?|ip|a|apple)?\s*11\s*(?:pro?|pr|p)(?!\s*(?:max|mx))': 'iPhone 11 Pro',
-            
-            # Base model - enhanced to handle "iphone11" and "iphone 11"
-            r'(?:i?phone?|iph?|ip|a|apple)?\s*11(?!\d)(?!\s*(?:pro?|pr|p|max|mx))': 'iPhone 11',
-            
-            # ===== iPhone X Series (Handle carefully due to conflicts) =====
-            # XS Max - most specific first
-            r'(?:i?phone?|iph?|ip|a|apple)?\s*xs?\s*(?:max|mx|m)(?!\s*(?:in))': 'iPhone XS Max',
-            
-            # XS (but not XS Max)
-            r'(?:i?phone?|iph?|ip|a|apple)?\s*xs(?!\s*(?:max|mx|m))': 'iPhone XS',
-            
-            # XR
-            r'(?:i?phone?|iph?|ip|a|apple)?\s*xr': 'iPhone XR',
-            
-            # iPhone X (most ambiguous - comes last)
-            # Be very careful here - only match isolated X patterns
-            r'(?:i?phone?|iph?|ip|a|apple)\s*x(?!\w)': 'iPhone X',
-            r'^x$': 'iPhone X',  # Only standalone X
-            
-            # ===== iPhone 8 Series - NEW =====
-            # Plus patterns (must come before base model)
-            r'(?:i?phone?|iph?|ip|a|apple)?\s*8\s*(?:plus|pl|\+|p(?=\s|$))': 'iPhone 8 Plus',
-            
-            # Base model - enhanced to handle "iphone8" and "iphone 8"
-            r'(?:i?phone?|iph?|ip|a|apple)?\s*8(?!\d)(?!\s*(?:plus|pl|\+|p))': 'iPhone 8',
-            
-            # ===== iPhone 7 Series - NEW =====
-            # Plus patterns (must come before base model)
-            r'(?:i?phone?|iph?|ip|a|apple)?\s*7\s*(?:plus|pl|\+|p(?=\s|$))': 'iPhone 7 Plus',
-            
-            # Base model - enhanced to handle "iphone7" and "iphone 7"
-            r'(?:i?phone?|iph?|ip|a|apple)?\s*7(?!\d)(?!\s*(?:plus|pl|\+|p))': 'iPhone 7',
-        }
-        
-        # Try to match patterns in order
-        for pattern, model in model_patterns.items():
-            if re.search(pattern, name):
-                return model
+            # Trim the view to a bounded ring of recent lines (text ends with a newline,
+            # so the last index is on the empty line after them)
+            line_count = int(self.result_text.index('end-1c').split('.')[0]) - 1
+            if line_count > LOG_VIEW_MAX_LINES:
+                self.result_text.delete('1.0', f"{line_count - LOG_VIEW_MAX_LINES + 1}.0")
+            self.result_text.see(tk.END)
         
-        # ===== FALLBACK: Ultra-minimal number-only patterns =====
-        # Only trigger if no other pattern matched
-        number_only_patterns = {
-            r'^16$': 'iPhone 16',
-            r'^15$': 'iPhone 15', 
-            r'^14$': 'iPhone 14',
-            r'^13$': 'iPhone 13',
-            r'^12$': 'iPhone 12',
-            r'^11$': 'iPhone 11',
-            r'^8$': 'iPhone 8',    # NEW
-            r'^7$': 'iPhone 7',    # NEW
-        }
-        
-        for pattern, model in number_only_patterns.items():
-            if re.search(pattern, name):
-                return model
-                
-        return None
+        if progress is not None:
+            self.progress_var.set(progress)
+        if status is not None:
+            self.status_var.set(status)
+        if button_state is not None:
+            self.process_btn.config(state=button_state)
         
-    def standardize_model_name(self, model_name):
-        """Convert model name to standardized filename format with proper case - UPDATED WITH NEW MODELS"""
-        model_map = {
-            'iPhone 16 Pro Max': 'iPhone16ProMax',
-            'iPhone 16 Plus': 'iPhone16Plus',
-            'iPhone 16 Pro': 'iPhone16Pro',
-            'iPhone 16': 'iPhone16',
-            'iPhone 15 Pro Max': 'iPhone15ProMax',
-            'iPhone 15 Plus': 'iPhone15Plus',
-            'iPhone 15 Pro': 'iPhone15Pro',
-            'iPhone 15': 'iPhone15',
-            'iPhone 14 Pro Max': 'iPhone14ProMax',
-            'iPhone 14 Plus': 'iPhone14Plus',
-            'iPhone 14 Pro': 'iPhone14Pro',
-            'iPhone 14': 'iPhone14',
-            'iPhone 13 Pro Max': 'iPhone13ProMax',
-            'iPhone 13 mini': 'iPhone13mini',
-            'iPhone 13 Pro': 'iPhone13Pro',
-            'iPhone 13': 'iPhone13',
-            'iPhone 12 Pro Max': 'iPhone12ProMax',
-            'iPhone 12 mini': 'iPhone12mini',
-            'iPhone 12 Pro': 'iPhone12Pro',
-            'iPhone 12': 'iPhone12',
-            'iPhone 11 Pro Max': 'iPhone11ProMax',
-            'iPhone 11 Pro': 'iPhone11Pro',
-            'iPhone 11': 'iPhone11',
-            'iPhone XS Max': 'iPhoneXSMax',
-            'iPhone XS': 'iPhoneXS',
-            'iPhone XR': 'iPhoneXR',
-            'iPhone X': 'iPhoneX',
-            # NEW iPhone 8 Series
-            'iPhone 8 Plus': 'iPhone8Plus',
-            'iPhone 8': 'iPhone8',
-            # NEW iPhone 7 Series
-            'iPhone 7 Plus': 'iPhone7Plus',
-            'iPhone 7': 'iPhone7',
-        }
-        return model_map.get(model_name, model_name.replace(' ', '_'))
+        self.root.after(UI_DRAIN_INTERVAL_MS, self.drain_ui_queue)
+        if review is not None:
+            self.review_deferred(review)
         
-    def format_display_model_name(self, model_name):
-        """Convert model name for display on canvas - replace iPhone with IP and use proper case - UPDATED WITH NEW MODELS"""
-        # Replace iPhone with IP and maintain proper case
-        display_map = {
-            'iPhone 16 Pro Max': 'IP 16 Pro Max',
-            'iPhone 16 Plus': 'IP 16 Plus',
-            'iPhone 16 Pro': 'IP 16 Pro',
-            'iPhone 16': 'IP 16',
-            'iPhone 15 Pro Max': 'IP 15 Pro Max',
-            'iPhone 15 Plus': 'IP 15 Plus',
-            'iPhone 15 Pro': 'IP 15 Pro',
-            'iPhone 15': 'IP 15',
-            'iPhone 14 Pro Max': 'IP 14 Pro Max',
-            'iPhone 14 Plus': 'IP 14 Plus',
-            'iPhone 14 Pro': 'IP 14 Pro',
-            'iPhone 14': 'IP 14',
-            'iPhone 13 Pro Max': 'IP 13 Pro Max',
-            'iPhone 13 mini': 'IP 13 mini',
-            'iPhone 13 Pro': 'IP 13 Pro',
-            'iPhone 13': 'IP 13',
-            'iPhone 12 Pro Max': 'IP 12 Pro Max',
-            'iPhone 12 mini': 'IP 12 mini',
-            'iPhone 12 Pro': 'IP 12 Pro',
-            'iPhone 12': 'IP 12',
-            'iPhone 11 Pro Max': 'IP 11 Pro Max',
-            'iPhone 11 Pro': 'IP 11 Pro',
-            'iPhone 11': 'IP 11',
-            'iPhone XS Max': 'IP XS Max',
-            'iPhone XS': 'IP XS',
-            'iPhone XR': 'IP XR',
-            'iPhone X': 'IP X',
-            # NEW iPhone 8 Series
-            'iPhone 8 Plus': 'IP 8 Plus',
-            'iPhone 8': 'IP 8',
-            # NEW iPhone 7 Series
-            'iPhone 7 Plus': 'IP 7 Plus',
-            'iPhone 7': 'IP 7',
-        }
-        return display_map.get(model_name, model_name.replace('iPhone', 'IP'))
+    def save_full_log(self):
+        """Save everything logged this session, including lines trimmed from the view"""
+        file_path = filedialog.asksaveasfilename(title="Save Full Log", defaultextension=".txt",
+                                                 filetypes=[("Text files", "*.txt"), ("All files", "*.*")])
+        if not file_path:
+            return
+        self.full_log.flush()
+        self.full_log.seek(0)
+        with open(file_path, 'w', encoding='utf-8') as handle:
+            shutil.copyfileobj(self.full_log, handle)
+        self.full_log.seek(0, os.SEEK_END)
         
     def start_processing(self):
         """Start the image processing in a separate thread"""
+        if self.watch_stop is not None:
+            messagebox.showinfo("Watching", "Stop watching the folder before processing a batch.")
+            return
         self.process_btn.config(state='disabled')
         self.result_text.delete(1.0, tk.END)
         self.progress_var.set(0)
+        self.apply_engine_settings()
         
         # Start processing in separate thread to keep UI responsive
         threading.Thread(target=self.process_images, daemon=True).start()
         
+    def apply_engine_settings(self):
+        """Copy the option controls onto the engine"""
+        try:
+            self.engine.workers = max(1, self.workers_var.get())
+        except tk.TclError:
+            self.engine.workers = 1
+        try:
+            self.engine.memory_budget_mb = max(0, self.memory_budget_var.get())
+        except tk.TclError:
+            self.engine.memory_budget_mb = 0
+        self.engine.encode_profile = self.encode_profile_var.get()
+        self.engine.incremental = self.incremental_var.get()
+        self.engine.layer_cache_folder = LAYER_CACHE_DEFAULT_FOLDER if self.layer_cache_var.get() else None
+        self.engine.nest_sheets = self.nest_sheets_var.get()
+        self.engine.batch_document = BATCH_OUTPUT_CHOICES[self.batch_output_var.get()]
+        self.engine.color_intent = self.color_intent_var.get()
+        
+    def toggle_watch(self):
+        """Start or stop rendering new files dropped into the selected folder"""
+        if self.watch_stop is not None:
+            # The watcher finishes the file it is on, then exits
+            self.watch_stop.set()
+            self.watch_stop = None
+            self.watch_btn.config(text="Watch Folder")
+            self.status_var.set("Stopped watching")
+            if self.selected_folder or self.selected_files:
+                self.process_btn.config(state='normal')
+            return
+        
+        if not self.selected_folder:
+            messagebox.showwarning("Watch Folder", "Please select a date folder to watch first.")
+            return
+        if str(self.process_btn['state']) == 'disabled':
+            messagebox.showinfo("Watch Folder", "Wait for the current batch to finish before watching.")
+            return
+        self.apply_engine_settings()
+        self.watch_stop = threading.Event()
+        watcher = HotFolderWatcher(self.engine, [self.selected_folder], self.custom_output_folder)
+        threading.Thread(target=watcher.run, args=(self.watch_stop,), daemon=True).start()
+        self.watch_btn.config(text="Stop Watching")
+        self.process_btn.config(state='disabled')
+        self.status_var.set(f"Watching {os.path.basename(self.selected_folder)} for new files...")
+        
     def process_images(self):
         """Main image processing logic"""
+        summary = None
         try:
             if self.selected_folder:
-                self.process_folder()
+                summary = self.process_folder()
             elif self.selected_files:
-                self.process_file_list()
+                summary = self.process_file_list()
         except Exception as e:
             self.log_message(f"Error during processing: {str(e)}")
         finally:
-            self.process_btn.config(state='normal')
-            
-    def process_folder(self):
-        """Process all images in the selected folder structure"""
-        self.log_message(f"Processing folder: {self.selected_folder}")
-        
-        # Determine output folder location
-        if self.custom_output_folder:
-            # Use custom output folder
-            folder_name = os.path.basename(self.selected_folder)
-            output_folder = os.path.join(self.custom_output_folder, f"{folder_name} (PRINT MODE)")
-            self.log_message(f"Using custom output location: {output_folder}")
-        else:
-            # Use default behavior (same directory as input)
-            folder_name = os.path.basename(self.selected_folder)
-            output_folder = os.path.join(os.path.dirname(self.selected_folder), f"{folder_name} (PRINT MODE)")
-            self.log_message(f"Using default output location: {output_folder}")
-        
-        os.makedirs(output_folder, exist_ok=True)
-        
-        # Find all image files in subfolders
-        image_files = []
-        for root, dirs, files in os.walk(self.selected_folder):
-            for file in files:
-                if file.lower().endswith(('.png', '.jpg', '.jpeg')):
-                    file_path = os.path.join(root, file)
-                    relative_path = os.path.relpath(root, self.selected_folder)
-                    image_files.append((file_path, relative_path, file))
-        
-        if not image_files:
-            self.log_message("No image files found in the selected folder.")
-            return
+            if summary and summary['deferred']:
+                # Undetected files were set aside - review them on the Tk thread
+                self.ui_queue.put(('review', summary))
+            else:
+                self.ui_queue.put(('button', 'normal'))
             
-        self.log_message(f"Found {len(image_files)} image files to process")
-        
-        # Process each file
-        processed_count = 0
-        failed_files = []
+    def update_progress(self, index, total, filename, total_final=True):
+        """Engine progress callback - update progress bar and status line"""
+        progress = (index / total) * 100
+        self.ui_queue.put(('progress', progress))
+        if total_final:
+            self.ui_queue.put(('status', f"Processing: {filename}"))
+        else:
+            # Still discovering files - the total keeps growing
+            self.ui_queue.put(('status', f"Processing: {filename} ({index + 1} of {total}+ found so far)"))
         
-        for i, (file_path, relative_folder, filename) in enumerate(image_files):
-            try:
-                # Update progress
-                progress = (i / len(image_files)) * 100
-                self.progress_var.set(progress)
-                self.status_var.set(f"Processing: {filename}")
-                self.root.update_idletasks()
-                
-                # Process the image
-                success = self.process_single_image(file_path, output_folder, relative_folder, filename)
-                if success:
-                    processed_count += 1
-                else:
-                    failed_files.append(filename)
-                    
-            except Exception as e:
-                self.log_message(f"Error processing {filename}: {str(e)}")
-                failed_files.append(filename)
+    def finish_progress(self):
+        """Mark the progress bar as complete"""
+        self.ui_queue.put(('progress', 100))
+        self.ui_queue.put(('status', "Processing complete!"))
         
-        # Final update
-        self.progress_var.set(100)
-        self.status_var.set("Processing complete!")
-        self.log_message(f"\nProcessing completed!")
-        self.log_message(f"Successfully processed: {processed_count} files")
-        if failed_files:
-            self.log_message(f"Failed to process: {len(failed_files)} files")
-            for failed_file in failed_files:
-                self.log_message(f"  - {failed_file}")
+    def process_folder(self):
+        """Process all images in the selected folder structure"""
+        summary = self.engine.process_folder(self.selected_folder, self.custom_output_folder,
+                                             progress=self.update_progress)
+        if summary is not None:
+            self.finish_progress()
+        return summary
         
     def process_file_list(self):
         """Process the selected individual files"""
-        self.log_message(f"Processing {len(self.selected_files)} individual files")
+        summary = self.engine.process_file_list(self.selected_files, self.custom_output_folder,
+                                                progress=self.update_progress)
+        if summary is not None:
+            self.finish_progress()
+        return summary
         
-        if not self.selected_files:
+    def review_deferred(self, summary):
+        """Tk thread - ask for models for all deferred files, then render just those"""
+        assignments = self.show_model_review_dialog(summary['deferred'])
+        skipped = len(summary['deferred']) - len(assignments)
+        if skipped:
+            self.log_message(f"Skipped: {skipped} files with no model assigned")
+        if not assignments:
+            self.process_btn.config(state='normal')
             return
+        threading.Thread(target=self.process_deferred, args=(assignments, summary['output_folder']),
+                         daemon=True).start()
         
-        # Determine output folder location
-        if self.custom_output_folder:
-            # Use custom output folder
-            output_folder = os.path.join(self.custom_output_folder, "PRINT_MODE_OUTPUT")
-            self.log_message(f"Using custom output location: {output_folder}")
-        else:
-            # Use default behavior (same directory as first file)
-            first_file_dir = os.path.dirname(self.selected_files[0])
-            output_folder = os.path.join(first_file_dir, "PRINT_MODE_OUTPUT")
-            self.log_message(f"Using default output location: {output_folder}")
-        
-        os.makedirs(output_folder, exist_ok=True)
-        
-        processed_count = 0
-        failed_files = []
-        
-        for i, file_path in enumerate(self.selected_files):
-            try:
-                # Update progress
-                progress = (i / len(self.selected_files)) * 100
-                self.progress_var.set(progress)
-                filename = os.path.basename(file_path)
-                self.status_var.set(f"Processing: {filename}")
-                self.root.update_idletasks()
-                
-                # Process the image
-                success = self.process_single_image(file_path, output_folder, "", filename)
-                if success:
-                    processed_count += 1
-                else:
-                    failed_files.append(filename)
-                    
-            except Exception as e:
-                filename = os.path.basename(file_path)
-                self.log_message(f"Error processing {filename}: {str(e)}")
-                failed_files.append(filename)
-        
-        # Final update
-        self.progress_var.set(100)
-        self.status_var.set("Processing complete!")
-        self.log_message(f"\nProcessing completed!")
-        self.log_message(f"Successfully processed: {processed_count} files")
-        if failed_files:
-            self.log_message(f"Failed to process: {len(failed_files)} files")
-            
-    def process_single_image(self, input_path, output_folder, relative_folder, filename):
-        """Process a single image file"""
+    def process_deferred(self, assignments, output_folder):
+        """Background thread - render the files assigned at review"""
         try:
-            # Extract order number
-            order_number = self.extract_order_number(filename)
-            if order_number is None:
-                self.log_message(f"Warning: Could not extract order number from {filename}")
-                order_number = "1"  # Default fallback as string
-            
-            # Detect phone model
-            detected_model = self.detect_phone_model(filename)
-            if detected_model is None:
-                self.log_message(f"Warning: Could not auto-detect model for {filename}")
-                # Show model selection dialog
-                detected_model = self.show_model_selection_dialog(filename)
-                if detected_model is None:
-                    self.log_message(f"Skipped: {filename} (no model selected)")
-                    return False
-                    
-            self.log_message(f"Processing: {filename} -> Order #{order_number}, {detected_model}")
-            
-            # Get model specifications
-            model_spec = self.model_specs.get(detected_model)
-            if not model_spec:
-                self.log_message(f"Error: Unknown model specification for {detected_model}")
-                return False
-                
-            # Load and process the image
-            processed_image = self.create_print_ready_image(input_path, order_number, detected_model, model_spec)
-            
-            if processed_image is None:
-                return False
-                
-            # Create output path
-            output_subfolder = os.path.join(output_folder, relative_folder) if relative_folder else output_folder
-            os.makedirs(output_subfolder, exist_ok=True)
-            
-            # Generate output filename
-            standardized_model = self.standardize_model_name(detected_model)
-            output_filename = f"{order_number}_{standardized_model}.png"
-            output_path = os.path.join(output_subfolder, output_filename)
-            
-            # Save the processed image
-            processed_image.save(output_path, "PNG")
-            self.log_message(f"Saved: {output_filename}")
-            
-            return True
-            
+            self.engine.process_deferred(assignments, output_folder, progress=self.update_progress)
+            self.finish_progress()
         except Exception as e:
-            self.log_message(f"Error processing {filename}: {str(e)}")
-            return False
+            self.log_message(f"Error during processing: {str(e)}")
+        finally:
+            self.ui_queue.put(('button', 'normal'))
             
-    def create_print_ready_image(self, input_path, order_number, model_name, model_spec):
-        """Create the final print-ready image with proper layout - graphics centered on full canvas
+    def show_model_review_dialog(self, deferred_jobs):
+        """One review screen for every file whose model could not be detected
         
-        NOTE: Adding 0.3cm to all target widths to compensate for systematic printing offset
+        Returns [(job, model_name)] for the files the operator assigned.
         """
-        try:
-            # Load the original image
-            original_image = Image.open(input_path)
-            
-            # Convert to RGBA if needed
-            if original_image.mode != 'RGBA':
-                original_image = original_image.convert('RGBA')
-            
-            # Horizontally flip the image
-            flipped_image = original_image.transpose(Image.FLIP_LEFT_RIGHT)
-            
-            # Calculate target width in pixels with 0.3cm compensation (HARDCODED FIX)
-            target_width_cm = model_spec['width_cm'] + 0.3  # Add 0.3cm to compensate for systematic offset
-            target_width_px = round(target_width_cm * self.dpi / 2.54)
-            
-            # Resize image maintaining aspect ratio
-            original_width, original_height = flipped_image.size
-            aspect_ratio = original_height / original_width
-            target_height_px = round(target_width_px * aspect_ratio)
-            
-            resized_image = flipped_image.resize((target_width_px, target_height_px), Image.Resampling.LANCZOS)
-            
-            # Create transparent canvas at film sheet size
-            canvas = Image.new('RGBA', (self.film_width_px, self.film_height_px), (0, 0, 0, 0))
-            
-            # Calculate positions for centering the image on the FULL canvas
-            image_x = (self.film_width_px - target_width_px) // 2
-            image_y = (self.film_height_px - target_height_px) // 2
-            
-            # Check if image will be clipped and warn user
-            if target_height_px > self.film_height_px:
-                self.log_message(f"Warning: {os.path.basename(input_path)} is very tall ({target_height_px}px > {self.film_height_px}px canvas) - image will be clipped to maintain {model_spec['width_cm']}cm width")
-                # Center the image even if it extends beyond canvas
-                image_y = (self.film_height_px - target_height_px) // 2
-            
-            # Paste the resized image onto the canvas (may clip if too tall)
-            canvas.paste(resized_image, (image_x, image_y), resized_image)
-            
-            # Add text overlays with shortened model name (IP instead of iPhone)
-            display_model_name = self.format_display_model_name(model_name)
-            canvas = self.add_text_overlays(canvas, order_number, display_model_name)
-            
-            # Debug logging to verify dimensions
-            original_target_cm = model_spec['width_cm']
-            actual_width_cm = target_width_px * 2.54 / self.dpi
-            self.log_message(f"Original: {original_target_cm}cm -> Compensated: {target_width_cm}cm ({target_width_px}px) -> Actual: {actual_width_cm:.3f}cm")
-            
-            return canvas
-            
-        except Exception as e:
-            self.log_message(f"Error creating print-ready image: {str(e)}")
-            return None
-            
-    def add_text_overlays(self, canvas, order_number, display_model_name):
-        """Add order number and model name text to the canvas as overlay - INK SAVING VERSION (no bold)"""
-        try:
-            # Create a drawing context
-            draw = ImageDraw.Draw(canvas)
-            
-            # Try to use system fonts with better fallback handling
-            order_font = None
-            model_font = None
-            
-            # Font file paths to try (Windows system fonts)
-            font_paths = [
-                "C:/Windows/Fonts/arialn.ttf",      # Arial Narrow (thinnest standard font)
-                "C:/Windows/Fonts/calibril.ttf",    # Calibri Light  
-                "C:/Windows/Fonts/segoeuil.ttf",    # Segoe UI Light
-                "C:/Windows/Fonts/arial.ttf",       # Fallback
-            ]
-            
-            # Try to load fonts
-            for font_path in font_paths:
-                try:
-                    order_font = ImageFont.truetype(font_path, 104)
-                    model_font = ImageFont.truetype(font_path, 64)
-                    break
-                except:
-                    continue
-            
-            # Fallback to default font if none found
-            if order_font is None:
-                try:
-                    order_font = ImageFont.load_default()
-                    model_font = ImageFont.load_default()
-                except:
-                    # Last resort fallback
-                    pass
-            
-            # Position both order number and model name on the same top line
-            margin = round(0.5 * self.dpi / 2.54)  # 5mm margin in pixels (FIXED: use round())
-            order_text = order_number  # Already a string (supports 3a, 3b, 3c format)
-            
-            # Add order number in top-left corner
-            if order_font:
-                # Draw the text once only to save ink
-                draw.text((margin, margin), order_text, fill='#808080', font=order_font)
-                
-                # Calculate order number width to position model name after it
-                order_bbox = draw.textbbox((0, 0), order_text, font=order_font)
-                order_width = order_bbox[2] - order_bbox[0]
-                
-                # Add model name on the same line, with spacing after order number
-                spacing = round(1.0 * self.dpi / 2.54)  # 1cm spacing between order and model (FIXED: use round())
-                model_text_x = margin + order_width + spacing
-                model_text_y = margin
-                
-                # Draw model name
-                draw.text((model_text_x, model_text_y), display_model_name, fill='#808080', font=model_font)
-            else:
-                # Fallback without font
-                draw.text((margin, margin), order_text, fill='black')
-                # Simple fallback positioning for model name
-                model_text_x = margin + 200  # Rough spacing
-                draw.text((model_text_x, margin), display_model_name, fill='black')
-            
-            return canvas
-            
-        except Exception as e:
-            self.log_message(f"Error adding text overlays: {str(e)}")
-            return canvas
-            
-    def show_model_selection_dialog(self, filename):
-        """Show a dialog to manually select the iPhone model - UPDATED WITH NEW MODELS"""
         dialog = tk.Toplevel(self.root)
-        dialog.title(f"Select Model for: {filename}")
-        dialog.geometry("400x500")
+        dialog.title(f"Assign Models ({len(deferred_jobs)} files)")
+        dialog.geometry("700x500")
         dialog.transient(self.root)
         dialog.grab_set()
         
         # Center the dialog
-        dialog.geometry("+%d+%d" % (self.root.winfo_rootx() + 200, self.root.winfo_rooty() + 100))
-        
-        selected_model = tk.StringVar()
+        dialog.geometry("+%d+%d" % (self.root.winfo_rootx() + 50, self.root.winfo_rooty() + 50))
         
         # Title
-        ttk.Label(dialog, text=f"Could not auto-detect model for:", 
+        ttk.Label(dialog, text="Could not auto-detect the model for these files:", 
                  font=('Arial', 10, 'bold')).pack(pady=10)
-        ttk.Label(dialog, text=filename, foreground="blue").pack(pady=(0, 20))
         
-        # Create scrollable frame for model list
-        canvas = tk.Canvas(dialog, height=300)
-        scrollbar = ttk.Scrollbar(dialog, orient="vertical", command=canvas.yview)
-        scrollable_frame = ttk.Frame(canvas)
+        # File list with the model assigned so far
+        list_frame = ttk.Frame(dialog)
+        list_frame.pack(fill="both", expand=True, padx=20)
+        tree = ttk.Treeview(list_frame, columns=('file', 'model'), show='headings', selectmode='extended')
+        tree.heading('file', text="File")
+        tree.heading('model', text="Assigned Model")
+        tree.column('file', width=420)
+        tree.column('model', width=180)
+        scrollbar = ttk.Scrollbar(list_frame, orient="vertical", command=tree.yview)
+        tree.configure(yscrollcommand=scrollbar.set)
+        tree.pack(side="left", fill="both", expand=True)
+        scrollbar.pack(side="right", fill="y")
         
-        scrollable_frame.bind(
-            "<Configure>",
-            lambda e: canvas.configure(scrollregion=canvas.bbox("all"))
-        )
+        assigned = {}
+        for index, (file_path, relative_folder, filename) in enumerate(deferred_jobs):
+            display_name = filename if relative_folder in ('', '.') else os.path.join(relative_folder, filename)
+            tree.insert('', 'end', iid=str(index), values=(display_name, ''))
         
-        canvas.create_window((0, 0), window=scrollable_frame, anchor="nw")
-        canvas.configure(yscrollcommand=scrollbar.set)
-        
-        # Group models by category
-        model_categories = {
-            "iPhone 16 Series": [
-                "iPhone 16 Pro Max", "iPhone 16 Plus", "iPhone 16 Pro", "iPhone 16"
-            ],
-            "iPhone 15 Series": [
-                "iPhone 15 Pro Max", "iPhone 15 Plus", "iPhone 15 Pro", "iPhone 15"
-            ],
-            "iPhone 14 Series": [
-                "iPhone 14 Pro Max", "iPhone 14 Plus", "iPhone 14 Pro", "iPhone 14"
-            ],
-            "iPhone 13 Series": [
-                "iPhone 13 Pro Max", "iPhone 13 Pro", "iPhone 13", "iPhone 13 mini"
-            ],
-            "iPhone 12 Series": [
-                "iPhone 12 Pro Max", "iPhone 12 Pro", "iPhone 12", "iPhone 12 mini"
-            ],
-            "iPhone 11 Series": [
-                "iPhone 11 Pro Max", "iPhone 11 Pro", "iPhone 11"
-            ],
-            "iPhone X Series": [
-                "iPhone XS Max", "iPhone XS", "iPhone XR", "iPhone X"
-            ],
-            "iPhone 8 Series": [
-                "iPhone 8 Plus", "iPhone 8"
-            ],
-            "iPhone 7 Series": [
-                "iPhone 7 Plus", "iPhone 7"
-            ]
-        }
+        # Model picker plus bulk assignment by filename pattern
+        assign_frame = ttk.Frame(dialog)
+        assign_frame.pack(fill="x", padx=20, pady=10)
         
-        # Add radio buttons for each model
-        for category, models in model_categories.items():
-            # Category header
-            ttk.Label(scrollable_frame, text=category, 
-                     font=('Arial', 9, 'bold')).pack(anchor='w', pady=(10, 5), padx=20)
-            
-            # Model radio buttons
-            for model in models:
-                width_cm = self.model_specs[model]['width_cm']
-                ttk.Radiobutton(scrollable_frame, 
-                               text=f"{model} ({width_cm}cm)", 
-                               variable=selected_model, 
-                               value=model).pack(anchor='w', padx=40)
+        ttk.Label(assign_frame, text="Model:").grid(row=0, column=0, sticky=tk.W)
+        registry = self.engine.registry
+        model_names = [model for models in registry.get_series().values() for model in models]
+        selected_model = tk.StringVar()
+        ttk.Combobox(assign_frame, textvariable=selected_model, state='readonly', width=20,
+                     values=[f"{model} ({registry[model]['width_cm']}cm)" for model in model_names]
+                     ).grid(row=0, column=1, padx=(5, 20))
+        
+        ttk.Label(assign_frame, text="Filename pattern:").grid(row=0, column=2, sticky=tk.W)
+        pattern_var = tk.StringVar(value="*")
+        ttk.Entry(assign_frame, textvariable=pattern_var, width=20).grid(row=0, column=3, padx=(5, 0))
+        
+        def get_model():
+            choice = selected_model.get()
+            if not choice:
+                messagebox.showwarning("No Selection", "Please select a model.", parent=dialog)
+                return None
+            return choice.rsplit(' (', 1)[0]
+        
+        def assign(indices, model):
+            for index in indices:
+                assigned[index] = model
+                tree.set(str(index), 'model', model)
+        
+        def on_assign_selected():
+            model = get_model()
+            if model:
+                assign([int(item) for item in tree.selection()], model)
+        
+        def on_assign_matching():
+            model = get_model()
+            if model:
+                assign(match_jobs_by_pattern(deferred_jobs, pattern_var.get()), model)
         
-        canvas.pack(side="left", fill="both", expand=True, padx=(20, 0))
-        scrollbar.pack(side="right", fill="y", padx=(0, 20))
+        def on_clear_selected():
+            for item in tree.selection():
+                assigned.pop(int(item), None)
+                tree.set(item, 'model', '')
+        
+        ttk.Button(assign_frame, text="Assign to Selected", 
+                  command=on_assign_selected).grid(row=1, column=0, columnspan=2, sticky=tk.W, pady=(10, 0))
+        ttk.Button(assign_frame, text="Assign to Matching", 
+                  command=on_assign_matching).grid(row=1, column=2, columnspan=2, sticky=tk.W, pady=(10, 0))
+        ttk.Button(assign_frame, text="Clear Selected", 
+                  command=on_clear_selected).grid(row=1, column=4, sticky=tk.W, padx=(10, 0), pady=(10, 0))
         
         # Buttons
         button_frame = ttk.Frame(dialog)
-        button_frame.pack(pady=20)
-        
-        result = {'model': None, 'cancelled': False}
+        button_frame.pack(pady=(0, 20))
         
-        def on_select():
-            if selected_model.get():
-                result['model'] = selected_model.get()
-                dialog.destroy()
-            else:
-                messagebox.showwarning("No Selection", "Please select a model.")
+        result = {'assignments': []}
         
-        def on_cancel():
-            result['cancelled'] = True
+        def on_render():
+            result['assignments'] = [(deferred_jobs[index], model) for index, model in sorted(assigned.items())]
             dialog.destroy()
         
-        ttk.Button(button_frame, text="Select", command=on_select).pack(side='left', padx=(0, 10))
-        ttk.Button(button_frame, text="Cancel", command=on_cancel).pack(side='left')
+        ttk.Button(button_frame, text="Render Assigned", command=on_render).pack(side='left', padx=(0, 10))
+        ttk.Button(button_frame, text="Skip All", command=dialog.destroy).pack(side='left')
         
         # Wait for dialog to close
         dialog.wait_window()
         
-        return result['model'] if not result['cancelled'] else None
+        return result['assignments']
+        
+    def show_model_decisions_dialog(self):
+        """Editor for the remembered model decisions - change (override) or forget them, or export them"""
+        decisions = self.engine.get_model_decisions()
+        if decisions is None:
+            return
+        
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Model Decisions")
+        dialog.geometry("700x500")
+        dialog.transient(self.root)
+        dialog.grab_set()
+        dialog.geometry("+%d+%d" % (self.root.winfo_rootx() + 50, self.root.winfo_rooty() + 50))
+        
+        ttk.Label(dialog, text="Models remembered per design (filename without order number):",
+                 font=('Arial', 10, 'bold')).pack(pady=10)
+        
+        list_frame = ttk.Frame(dialog)
+        list_frame.pack(fill="both", expand=True, padx=20)
+        tree = ttk.Treeview(list_frame, columns=('stem', 'model', 'source', 'updated'), show='headings',
+                            selectmode='extended')
+        for column, heading, width in (('stem', "Design", 280), ('model', "Model", 150),
+                                       ('source', "Decided", 80), ('updated', "Updated", 120)):
+            tree.heading(column, text=heading)
+            tree.column(column, width=width)
+        scrollbar = ttk.Scrollbar(list_frame, orient="vertical", command=tree.yview)
+        tree.configure(yscrollcommand=scrollbar.set)
+        tree.pack(side="left", fill="both", expand=True)
+        scrollbar.pack(side="right", fill="y")
+        
+        def refresh():
+            tree.delete(*tree.get_children())
+            for row in decisions.get_rows():
+                tree.insert('', 'end', iid=row['stem'], values=(row['stem'], row['model'], row['source'], row['updated']))
+        refresh()
+        
+        edit_frame = ttk.Frame(dialog)
+        edit_frame.pack(fill="x", padx=20, pady=10)
+        ttk.Label(edit_frame, text="Model:").grid(row=0, column=0, sticky=tk.W)
+        registry = self.engine.registry
+        selected_model = tk.StringVar()
+        ttk.Combobox(edit_frame, textvariable=selected_model, state='readonly', width=20,
+                     values=[model for models in registry.get_series().values() for model in models]
+                     ).grid(row=0, column=1, padx=(5, 20))
+        
+        def on_set_selected():
+            if not selected_model.get():
+                messagebox.showwarning("No Selection", "Please select a model.", parent=dialog)
+                return
+            for stem in tree.selection():
+                decisions.record(stem, selected_model.get(), 'override')
+            refresh()
+        
+        def on_forget_selected():
+            for stem in tree.selection():
+                decisions.remove(stem)
+            refresh()
+        
+        def on_export():
+            file_path = filedialog.asksaveasfilename(parent=dialog, title="Export Model Decisions",
+                                                     defaultextension=".csv",
+                                                     filetypes=[("CSV files", "*.csv"), ("JSON files", "*.json")])
+            if not file_path:
+                return
+            try:
+                decisions.export(file_path)
+            except OSError as e:
+                messagebox.showerror("Export Failed", str(e), parent=dialog)
+        
+        def on_close():
+            self.engine.save_model_decisions()
+            dialog.destroy()
+        
+        ttk.Button(edit_frame, text="Set Model for Selected",
+                  command=on_set_selected).grid(row=0, column=2, padx=(0, 10))
+        ttk.Button(edit_frame, text="Forget Selected",
+                  command=on_forget_selected).grid(row=0, column=3)
+        
+        button_frame = ttk.Frame(dialog)
+        button_frame.pack(pady=(0, 20))
+        ttk.Button(button_frame, text="Export...", command=on_export).pack(side='left', padx=(0, 10))
+        ttk.Button(button_frame, text="Close", command=on_close).pack(side='left')
+        dialog.protocol("WM_DELETE_WINDOW", on_close)
         
     def run(self):
         """Start the application"""
         self.root.mainloop()
 
-if __name__ == "__main__":
+# Real-world filename spellings seen in date folders, used by the detection benchmark
+DETECTION_SAMPLE_NAMES = [
+    "1_iPhone 16 Pro Max.png", "2_iphone16promax.jpg", "3_16pm.png", "4_ip16 pro max.jpeg",
+    "5_16 plus.png", "6-iphone 16+.jpg", "7_16p.png", "8_IP16 Pro.png", "9_16pro.jpg",
+    "10_iphone16.png", "11_16.png", "12_iPhone 15 Pro Max.png", "13-15 prm.jpg", "14_ip15plus.png",
+    "15_15 pl.png", "16_iphone15pro.jpg", "17_15.png", "18_IPHONE 15.PNG", "19_14 pro max.png",
+    "20_iph14promx.jpg", "21_14 plus.png", "22_14pro.png", "23_iphone 14.jpg", "24_13 pro max.png",
+    "25_13pro.png", "26_13 mini.jpg", "27_iphone13mini.png", "28_13mn.png", "29_iphone 13.jpeg",
+    "30_12 pro max.png", "31_12pro.jpg", "32_12 mini.png", "33_iphone12.png", "34_12.jpg",
+    "35_11 pro max.png", "36_11pro.png", "37_iphone 11.jpg", "38_11.png", "39_xs max.png",
+    "40_iphonexsmax.jpg", "41_xs.png", "42_iphone xs.png", "43_xr.jpg", "44_iphone xr.png",
+    "45_iphone x.png", "46_x.png", "47_ip x.jpg", "48_8 plus.png", "49_iphone8+.jpg", "50_8p.png",
+    "51_iphone 8.png", "52_8.jpg", "53_7 plus.png", "54_iphone7plus.jpg", "55_iphone 7.png",
+    "56_7.png", "3a_15 pro max.png", "3b_15 pro max.png", "3c-iphone 13 mini.jpg",
+    "007_apple 12 pro.png", "100_a14.png", "101_phone 16 pro.jpg", "102_iph 11 pro max.png",
+    "103_design only.png", "104_case_final_v2.jpg", "105__iPhone__15__Pro.png", "106.iphone.14.plus.png",
+]
+
+def load_detection_names(source=None):
+    """Load filenames for the detection benchmark from a text file or image folder (default: built-in samples)"""
+    if not source:
+        return list(DETECTION_SAMPLE_NAMES)
+    if os.path.isdir(source):
+        return [file for root, dirs, files in os.walk(source) for file in files
+                if file.lower().endswith(IMAGE_EXTENSIONS)]
+    with open(source, encoding='utf-8') as handle:
+        return [line.strip() for line in handle if line.strip()]
+
+def run_detection_benchmark(names, repeat=20):
+    """Compare reference_detect_phone_model against the compiled/memoized detector
+    
+    Returns filenames/sec for each implementation and any names where results differ.
+    """
+    corpus = list(names) * repeat
+    
+    start_time = time.perf_counter()
+    reference_results = [reference_detect_phone_model(name) for name in corpus]
+    reference_elapsed = time.perf_counter() - start_time
+    
+    engine = PrintFilmEngine(log=lambda message: None)
+    get_compiled_model_patterns()  # compile up front so only matching is timed
+    match_model_stem.cache_clear()
+    start_time = time.perf_counter()
+    fast_results = [engine.detect_phone_model(name) for name in corpus]
+    fast_elapsed = time.perf_counter() - start_time
+    
+    mismatches = sorted({(name, expected, actual)
+                         for name, expected, actual in zip(corpus, reference_results, fast_results)
+                         if expected != actual})
+    return {
+        'filenames': len(corpus),
+        'unique_names': len(set(names)),
+        'reference_per_sec': len(corpus) / reference_elapsed if reference_elapsed > 0 else 0.0,
+        'compiled_per_sec': len(corpus) / fast_elapsed if fast_elapsed > 0 else 0.0,
+        'cache_info': match_model_stem.cache_info(),
+        'mismatches': mismatches,
+    }
+
+def make_synthetic_artwork(path, size=(6000, 10000), mode='RGB'):
+    """Write a large, detailed image when no real artwork is given
+    
+    .jpg paths are saved as RGB JPEGs; .png paths in mode ('RGB', 'RGBA' with a
+    gradient alpha, or 'P' like flattened palette exports).
+    """
+    width, height = size
+    # Smooth gradient plus photo-like grain so resampling differences would show up
+    gradient = Image.linear_gradient('L').resize(size)
+    noise = Image.effect_noise((max(1, width // 4), max(1, height // 4)), 48).resize(size, Image.Resampling.BICUBIC)
+    image = Image.merge('RGB', (gradient, noise, gradient.transpose(Image.FLIP_TOP_BOTTOM)))
+    if path.lower().endswith(('.jpg', '.jpeg')):
+        image.save(path, 'JPEG', quality=92)
+    elif mode == 'P':
+        image.convert('P', palette=Image.Palette.ADAPTIVE).save(path, 'PNG')
+    else:
+        if mode == 'RGBA':
+            image.putalpha(gradient.transpose(Image.ROTATE_90).resize(size))
+        image.save(path, 'PNG')
+    return path
+
+def run_decode_benchmark(image_paths, target_width_px):
+    """Time exact vs fast decoding of each image and measure how far the results drift"""
+    from PIL import ImageChops, ImageStat
+    
+    engine = PrintFilmEngine(log=lambda message: None)
+    results = []
+    for path in image_paths:
+        start_time = time.perf_counter()
+        exact_layer = engine.create_artwork_layer(path, target_width_px, fast_decode=False)
+        exact_elapsed = time.perf_counter() - start_time
+        
+        start_time = time.perf_counter()
+        fast_layer = engine.create_artwork_layer(path, target_width_px, fast_decode=True)
+        fast_elapsed = time.perf_counter() - start_time
+        
+        difference = ImageStat.Stat(ImageChops.difference(exact_layer, fast_layer))
+        results.append({
+            'path': path,
+            'exact_sec': exact_elapsed,
+            'fast_sec': fast_elapsed,
+            'mean_diff': max(difference.mean),
+            'within_tolerance': max(difference.mean) <= FAST_DECODE_TOLERANCE,
+        })
+    return results
+
+def _time_artwork_layer(path, target_width_px, tiled):
+    """Build one artwork layer in a fresh process, returning (seconds, peak RSS bytes, layer)"""
+    engine = PrintFilmEngine(log=lambda message: None)
+    start_time = time.perf_counter()
+    layer = engine.create_artwork_layer(path, target_width_px, tiled=tiled)
+    return time.perf_counter() - start_time, get_peak_rss_bytes(), layer
+
+def run_tiled_benchmark(image_paths, target_width_px):
+    """Time striped vs whole-image resizing of each image and measure how far the results drift
+    
+    Each pass runs in its own process so the peak RSS it reports is that pass's alone.
+    """
+    import concurrent.futures
+    from PIL import ImageChops, ImageStat
+    
+    results = []
+    for path in image_paths:
+        passes = {}
+        for tiled in (False, True):
+            with concurrent.futures.ProcessPoolExecutor(max_workers=1) as executor:
+                passes[tiled] = executor.submit(_time_artwork_layer, path, target_width_px, tiled).result()
+        (whole_elapsed, whole_peak, whole_layer), (tiled_elapsed, tiled_peak, tiled_layer) = passes[False], passes[True]
+        
+        difference = ImageStat.Stat(ImageChops.difference(whole_layer, tiled_layer))
+        results.append({
+            'path': path,
+            'whole_sec': whole_elapsed,
+            'tiled_sec': tiled_elapsed,
+            'tiled_peak_rss': tiled_peak,
+            'whole_peak_rss': whole_peak,
+            'mean_diff': max(difference.mean),
+            'within_tolerance': max(difference.mean) <= TILED_RENDER_TOLERANCE,
+        })
+    return results
+
+# Benchmark suite - spellings used to build synthetic order filenames, the synthetic image set
+# (filename, size, mode - the format follows the extension), renders timed per image, and
+# how much worse than the baseline a metric may get before it is flagged
+BENCH_PREFIXES = ['iphone ', 'iPhone', 'IPHONE_', 'ip', 'iph ', 'apple ', 'a', 'phone ', '']
+BENCH_VARIANT_SPELLINGS = {
+    'Pro Max': ['pro max', 'promax', 'pm', 'prm', 'pro mx', 'max'],
+    'Plus': ['plus', '+', 'pl', 'p'],
+    'Pro': ['pro', 'pr'],
+    'mini': ['mini', 'mn', 'm'],
+    'Max': ['max', 'mx'],
+    '': [''],
+}
+BENCH_UNDETECTABLE_NAMES = ['design only', 'case_final_v2', 'logo print', 'samsung s24', 'gift card']
+BENCH_IMAGES = [
+    ('1_iphone 16 pro max.png', (1200, 2600), 'RGBA'),  # typical customer PNG
+    ('2_ip13mini.jpg', (2400, 5000), 'RGB'),            # phone photo
+    ('3_15 pro.jpg', (4000, 8000), 'RGB'),              # oversized JPEG (draft decoding)
+    ('4_iphone xr.png', (2000, 2000), 'P'),             # square palette export
+    ('5_iphone 11.png', (3000, 1500), 'RGB'),           # landscape
+    ('6_8 plus.png', (1500, 4200), 'RGBA'),             # taller than the film (clipped)
+]
+BENCH_RENDER_REPEAT = 3
+BENCH_REGRESSION_THRESHOLD_PCT = 10.0
+
+# Cold-start budget checked by bench startup (ms, medians): importing this module, a CLI
+# command coming up (interpreter included) and the GUI window drawn and idle
+STARTUP_BUDGET_MS = {'import_ms': 150, 'cli_ready_ms': 500, 'gui_ready_ms': 1500}
+# Modules a bare import must not pull in - they load on first use
+STARTUP_DEFERRED_MODULES = ('tkinter', 'PIL.ImageDraw', 'PIL.ImageFont', 'cProfile', 'pstats',
+                            'tracemalloc', 'concurrent.futures', 'ctypes', 'tomllib', 'hashlib', 'sqlite3')
+# Set in the environment to make the GUI print when it is ready and exit
+STARTUP_PROBE_ENV = 'IP_CASE_PROC_STARTUP_PROBE'
+
+def make_benchmark_filenames(count=2000, seed=0):
+    """Realistic order filenames spelling every model the detector knows, plus a few undetectable ones
+    
+    Every spelling appears once before random extras are added, so even small counts cover
+    the whole pattern table; the same count and seed always give the same names.
+    """
+    import random
+    
+    rng = random.Random(seed)
+    spellings = []
+    for model_name in dict.fromkeys(MODEL_PATTERNS.values()):
+        base, _, variant = model_name[len('iPhone '):].partition(' ')
+        for prefix in BENCH_PREFIXES:
+            for suffix in BENCH_VARIANT_SPELLINGS[variant]:
+                for gap in ([' ', ''] if suffix else ['']):
+                    spellings.append(f"{prefix}{base.lower()}{gap}{suffix}".strip())
+    spellings.extend(BENCH_UNDETECTABLE_NAMES)
+    
+    names = []
+    while len(names) < count:
+        spelling = spellings[len(names)] if len(names) < len(spellings) else rng.choice(spellings)
+        order = rng.choice([str(rng.randint(1, 300)), f"{rng.randint(1, 99)}{rng.choice('abc')}",
+                            f"{rng.randint(1, 99):03d}"])
+        separator = rng.choice(['_', '-', ' ', '.'])
+        spelling = spelling.replace(' ', rng.choice([' ', '_', '-', '.']))
+        spelling = rng.choice([spelling, spelling.upper(), spelling.title()])
+        names.append(f"{order}{separator}{spelling}{rng.choice(['.png', '.jpg', '.jpeg', '.PNG'])}")
+    return names
+
+def get_pattern_coverage(names):
+    """Return (covered, total, uncovered models) for the detection patterns - a pattern is
+    covered when it is the first to match at least one name"""
+    model_patterns, number_only_patterns = get_compiled_model_patterns()
+    patterns = model_patterns + number_only_patterns
+    covered = set()
+    for stem in {normalize_model_stem(name) for name in names}:
+        for index, (pattern, model) in enumerate(patterns):
+            if pattern.search(stem):
+                covered.add(index)
+                break
+    uncovered = [f"{model} ({pattern.pattern})" for index, (pattern, model) in enumerate(patterns)
+                 if index not in covered]
+    return len(covered), len(patterns), uncovered
+
+def make_benchmark_corpus(folder):
+    """Write the synthetic BENCH_IMAGES into folder (files already there are reused) and return their paths"""
+    os.makedirs(folder, exist_ok=True)
+    image_paths = []
+    for filename, size, mode in BENCH_IMAGES:
+        path = os.path.join(folder, filename)
+        if not os.path.exists(path):
+            make_synthetic_artwork(path, size, mode)
+        image_paths.append(path)
+    return image_paths
+
+def run_suite_benchmark(image_paths, names, repeat=20):
+    """Time rendering, overlays, saving and detection; returns the results dict used as a baseline
+    
+    Per-image figures are the median of BENCH_RENDER_REPEAT runs. Metrics ending in _ms
+    are better when lower, metrics ending in _per_sec better when higher.
+    """
+    import platform
+    
+    engine = PrintFilmEngine(log=lambda message: None)
+    writer = OutputWriter('balanced', threads=1, log=lambda message: None)
+    image_results = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        output_path = os.path.join(temp_dir, "benchmark.png")
+        for path in image_paths:
+            filename = os.path.basename(path)
+            order_number = engine.extract_order_number(filename) or "1"
+            model_name = engine.detect_phone_model(filename) or 'iPhone 15'
+            display_model_name = engine.format_display_model_name(model_name)
+            timings = {'create': [], 'overlays': [], 'save': []}
+            for _ in range(BENCH_RENDER_REPEAT):
+                start_time = time.perf_counter()
+                canvas = engine.create_print_ready_image(path, order_number, model_name)
+                timings['create'].append(time.perf_counter() - start_time)
+                if canvas is None:
+                    raise RuntimeError(f"Could not render {path}")
+                
+                blank = engine.get_canvas_template().copy()
+                start_time = time.perf_counter()
+                engine.add_text_overlays(blank, order_number, display_model_name)
+                timings['overlays'].append(time.perf_counter() - start_time)
+                
+                start_time = time.perf_counter()
+                writer.write(canvas, output_path)
+                timings['save'].append(time.perf_counter() - start_time)
+                del canvas, blank
+            
+            with Image.open(path) as image:
+                size, mode = list(image.size), image.mode
+            medians = {stage: sorted(values)[len(values) // 2] * 1000 for stage, values in timings.items()}
+            image_results.append({'file': filename, 'size': size, 'mode': mode, 'model': model_name,
+                                  'create_ms': medians['create'], 'overlays_ms': medians['overlays'],
+                                  'save_ms': medians['save']})
+    
+    # Detection: through the memoized detector as batches use it, and the raw pattern scan
+    corpus = list(names) * repeat
+    get_compiled_model_patterns()  # compile up front so only matching is timed
+    match_model_stem.cache_clear()
+    start_time = time.perf_counter()
+    for name in corpus:
+        engine.detect_phone_model(name)
+    detect_elapsed = time.perf_counter() - start_time
+    
+    stems = [normalize_model_stem(name) for name in names]
+    start_time = time.perf_counter()
+    for stem in stems:
+        match_model_stem.__wrapped__(stem)
+    uncached_elapsed = time.perf_counter() - start_time
+    
+    covered, total, uncovered = get_pattern_coverage(names)
+    image_count = max(len(image_results), 1)
+    render_seconds = sum(result['create_ms'] + result['save_ms'] for result in image_results) / 1000
+    return {
+        'version': 1,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'pillow': Image.__version__,
+        'platform': platform.platform(),
+        'corpus': {'images': len(image_results), 'filenames': len(names), 'detect_repeat': repeat,
+                   'patterns_covered': [covered, total], 'uncovered_patterns': uncovered},
+        'metrics': {
+            'create_print_ready_image_ms': sum(result['create_ms'] for result in image_results) / image_count,
+            'add_text_overlays_ms': sum(result['overlays_ms'] for result in image_results) / image_count,
+            'save_ms': sum(result['save_ms'] for result in image_results) / image_count,
+            'render_images_per_sec': len(image_results) / render_seconds if render_seconds > 0 else 0.0,
+            'detect_per_sec': len(corpus) / detect_elapsed if detect_elapsed > 0 else 0.0,
+            'detect_uncached_per_sec': len(stems) / uncached_elapsed if uncached_elapsed > 0 else 0.0,
+        },
+        'images': image_results,
+    }
+
+def compare_benchmark_results(results, baseline, threshold_pct=BENCH_REGRESSION_THRESHOLD_PCT):
+    """Compare metrics with a baseline: [(metric, baseline, current, % worse, regressed)]
+    
+    % worse is positive when the metric got slower; metrics missing on either side are skipped.
+    """
+    comparisons = []
+    for metric, current in results['metrics'].items():
+        previous = baseline.get('metrics', {}).get(metric)
+        if not previous:
+            continue
+        if metric.endswith('_per_sec'):
+            worse_pct = (previous - current) / previous * 100
+        else:
+            worse_pct = (current - previous) / previous * 100
+        comparisons.append((metric, previous, current, worse_pct, worse_pct > threshold_pct))
+    return comparisons
+
+def time_process(command, env=None):
+    """Run a command in a fresh process and return its wall time in ms (output discarded)"""
+    import subprocess
+    
+    start_time = time.perf_counter()
+    subprocess.run(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+    return (time.perf_counter() - start_time) * 1000
+
+def parse_import_times(importtime_output, module='ip_case_proc'):
+    """Imports made directly by module, from python -X importtime output: [(name, cumulative ms)]
+    slowest first"""
+    imports = []
+    for line in importtime_output.splitlines():
+        fields = line.partition('import time:')[2].split('|')
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            continue
+        name = fields[2].strip()
+        # Nested imports are indented two spaces per level under the module that made them
+        level = (len(fields[2]) - len(fields[2].lstrip()) - 1) // 2
+        if level == 1:
+            imports.append((name, int(fields[1]) / 1000))
+        elif level == 0:
+            if name == module:
+                break
+            imports = []
+    return sorted(imports, key=lambda item: item[1], reverse=True)
+
+def has_display():
+    """True if a GUI window can be opened here"""
+    return os.name == 'nt' or sys.platform == 'darwin' or bool(os.environ.get('DISPLAY') or
+                                                               os.environ.get('WAYLAND_DISPLAY'))
+
+def run_startup_benchmark(repeat=20):
+    """Time cold starts in fresh interpreters and return the results dict used as a baseline
+    
+    Measures the bare interpreter, importing this module, `--help` (a CLI command up and
+    done) and, where there is a display, the GUI until its window is drawn and idle.
+    Metrics are medians in ms; the slowest imports and any STARTUP_DEFERRED_MODULES the
+    bare import loaded are listed too.
+    """
+    import platform
+    import subprocess
+    
+    script = os.path.abspath(__file__)
+    folder = os.path.dirname(script)
+    import_probe = ("import sys, time; start_time = time.perf_counter(); import ip_case_proc; "
+                    "print((time.perf_counter() - start_time) * 1000); "
+                    f"print(' '.join(name for name in {STARTUP_DEFERRED_MODULES!r} if name in sys.modules))")
+    samples = {'interpreter_ms': [], 'import_ms': [], 'cli_ready_ms': []}
+    loaded = set()
+    gui = has_display()
+    if gui:
+        samples['gui_ready_ms'] = []
+        gui_env = dict(os.environ, **{STARTUP_PROBE_ENV: '1'})
+    
+    for _ in range(repeat):
+        samples['interpreter_ms'].append(time_process([sys.executable, '-c', 'pass']))
+        output = subprocess.run([sys.executable, '-c', import_probe], cwd=folder, capture_output=True,
+                                text=True, check=True).stdout.split('\n')
+        samples['import_ms'].append(float(output[0]))
+        loaded.update(output[1].split())
+        samples['cli_ready_ms'].append(time_process([sys.executable, script, '--help']))
+        if gui:
+            start_time = time.time()
+            output = subprocess.run([sys.executable, script], env=gui_env, capture_output=True,
+                                    text=True, check=True).stdout
+            ready_time = float(output.partition('gui_ready ')[2].split()[0])
+            samples['gui_ready_ms'].append((ready_time - start_time) * 1000)
+    
+    importtime = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import ip_case_proc'], cwd=folder,
+                                capture_output=True, text=True, check=True).stderr
+    return {
+        'version': 1,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'repeat': repeat,
+        'metrics': {metric: sorted(values)[len(values) // 2] for metric, values in samples.items()},
+        'budget_ms': STARTUP_BUDGET_MS,
+        'slowest_imports': parse_import_times(importtime)[:8],
+        'deferred_modules_loaded': sorted(loaded),
+    }
+
+def report_baseline_comparison(results, baseline_path, threshold_pct):
+    """Print how results compare with a saved baseline - returns True if anything regressed"""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)
+    comparisons = compare_benchmark_results(results, baseline, threshold_pct)
+    print(f"Compared with {baseline_path} (regression threshold {threshold_pct:g}%):")
+    for metric, previous, current, worse_pct, regressed in comparisons:
+        status = "REGRESSION" if regressed else "ok"
+        change = f"{abs(worse_pct):.1f}% {'slower' if worse_pct > 0 else 'faster'}"
+        print(f"  {metric:<30} {previous:>14,.2f} -> {current:>14,.2f} ({change}) {status}")
+    return any(regressed for metric, previous, current, worse_pct, regressed in comparisons)
+
+def add_output_arguments(parser):
+    """Options shared by the render, watch and queue work commands"""
+    parser.add_argument('--exact-decode', action='store_true',
+                        help="Always decode artwork at full resolution (disable draft/reduce)")
+    parser.add_argument('--assign', action='append', default=[], metavar='PATTERN=MODEL',
+                        help='Model for files it can\'t be detected for, e.g. --assign "*_custom*=iPhone 15 Pro" '
+                             "(repeatable, first match wins)")
+    parser.add_argument('--cache', nargs='?', const=LAYER_CACHE_DEFAULT_FOLDER, default=None,
+                        metavar='DIR', help="Cache resized artwork for duplicate designs "
+                                            f"(default folder: {LAYER_CACHE_DEFAULT_FOLDER})")
+    parser.add_argument('--cache-size', type=int, default=LAYER_CACHE_DEFAULT_SIZE_MB, metavar='MB',
+                        help=f"Layer cache size limit (default: {LAYER_CACHE_DEFAULT_SIZE_MB})")
+    parser.add_argument('--encode', choices=sorted(ENCODE_PROFILES), default='balanced',
+                        help="PNG encode profile: fast (bigger files), balanced (default) or smallest")
+    parser.add_argument('--icc', default=None, metavar='FILE',
+                        help="Colour manage artwork into this RGB printer profile (embedded profiles are "
+                             "honoured, untagged artwork is treated as sRGB)")
+    parser.add_argument('--intent', choices=list(COLOR_INTENTS), default='perceptual',
+                        help="Rendering intent for --icc (default: perceptual)")
+    parser.add_argument('--models', default=None, metavar='FILE',
+                        help="Model registry file (TOML or JSON) adding or overriding models "
+                             f"(default: {MODEL_REGISTRY_FOLDER}/models.toml or models.json if present)")
+    add_decisions_argument(parser)
+
+def add_decisions_argument(parser):
+    """The --decisions option - where remembered model decisions are kept"""
+    parser.add_argument('--decisions', default=MODEL_DECISIONS_PATH, metavar='FILE',
+                        help=f"Remembered model decisions per design, or 'off' (default: {MODEL_DECISIONS_PATH})")
+
+def apply_output_arguments(engine, args):
+    """Copy the shared render/watch/queue work options onto an engine - returns the --assign rules,
+    or None (after printing why) if one is invalid"""
+    engine.fast_decode = not args.exact_decode
+    engine.encode_profile = args.encode
+    engine.layer_cache_folder = args.cache
+    engine.layer_cache_size_mb = args.cache_size
+    engine.model_decisions_path = None if args.decisions == 'off' else args.decisions
+    engine.color_intent = args.intent
+    if not engine.set_output_profile(args.icc) or not engine.load_model_registry(args.models):
+        return None
+    return parse_assign_rules(engine, args.assign)
+
+def parse_assign_rules(engine, rules):
+    """Parse --assign PATTERN=MODEL rules for files whose model can't be detected -
+    returns [(pattern, model)], or None (after printing why) if one is invalid"""
+    assign_rules = []
+    for rule in rules:
+        pattern, separator, model_name = rule.partition('=')
+        if not separator or model_name.strip() not in engine.registry:
+            print(f"Error: --assign expects PATTERN=MODEL with a known model, got: {rule}", file=sys.stderr)
+            return None
+        assign_rules.append((pattern, model_name.strip()))
+    return assign_rules
+
+def build_arg_parser():
+    """Build the command-line parser - no arguments starts the GUI"""
+    parser = argparse.ArgumentParser(description="iPhone Case Print Film Processor")
+    subparsers = parser.add_subparsers(dest='command')
+    
+    render_parser = subparsers.add_parser('render', help="Render images headlessly (no display needed)")
+    render_parser.add_argument('inputs', nargs='+',
+                               help="A date folder, or one or more image files")
+    render_parser.add_argument('--out', dest='output_folder', default=None,
+                               help="Output location (default: next to the input, like the GUI)")
+    add_output_arguments(render_parser)
+    render_parser.add_argument('--incremental', action='store_true',
+                               help="Skip inputs whose output is already up to date (manifest in the output folder)")
+    render_parser.add_argument('--nest', action='store_true',
+                               help="Pack several small designs onto one film sheet where their sizes allow")
+    render_parser.add_argument('--gutter', type=float, default=NEST_DEFAULT_GUTTER_MM, metavar='MM',
+                               help=f"Gap between nested designs (default: {NEST_DEFAULT_GUTTER_MM:g})")
+    render_parser.add_argument('--profile-format', choices=['jsonl', 'csv', 'off'], default='jsonl',
+                               help=f"Per-file stage timings saved as {STAGE_PROFILE_FILENAME}.<format> in the "
+                                    "output folder (default: jsonl)")
+    render_parser.add_argument('--deep-profile', choices=['cprofile', 'tracemalloc'], default=None,
+                               help="Also profile the batch with cProfile (saved as .prof) or tracemalloc; "
+                                    "renders run in one process")
+    render_parser.add_argument('--memory-budget', type=int, default=0, metavar='MB',
+                               help="Estimated render memory allowed in flight across workers (0 = no limit)")
+    render_parser.add_argument('--workers', type=int, default=1,
+                               help="Parallel render processes (0 = one per CPU core, default: 1)")
+    render_parser.add_argument('--document', choices=BATCH_DOCUMENT_FORMATS, default=None,
+                               help=f"Write the batch as one multi-page TIFF or PDF ({BATCH_DOCUMENT_NAME}.tif/.pdf "
+                                    "in the output folder, pages in order-number order) instead of PNGs")
+    render_parser.add_argument('--tiff-compression', choices=list(TIFF_COMPRESSIONS), default='lzw',
+                               help="Compression for --document tiff (default: lzw)")
+    render_parser.add_argument('--prefetch', choices=['auto', 'on', 'off'], default='auto',
+                               help="Read upcoming inputs into memory while rendering (default: auto = only "
+                                    "from network shares; single-process renders)")
+    render_parser.add_argument('--prefetch-depth', type=int, default=PREFETCH_DEFAULT_DEPTH, metavar='N',
+                               help=f"Files to read ahead (default: {PREFETCH_DEFAULT_DEPTH})")
+    render_parser.add_argument('--prefetch-memory', type=int, default=PREFETCH_DEFAULT_MEMORY_MB, metavar='MB',
+                               help=f"Memory the files read ahead may hold (default: {PREFETCH_DEFAULT_MEMORY_MB})")
+    
+    plan_parser = subparsers.add_parser('plan', help="Dry run - check filenames, sizes and output names "
+                                                     "without rendering")
+    plan_parser.add_argument('inputs', nargs='+', help="A date folder, or one or more image files")
+    plan_parser.add_argument('--out', dest='output_folder', default=None,
+                             help="Output location the render would use (default: next to the input)")
+    plan_parser.add_argument('--plan', dest='plan_path', default=None, metavar='FILE',
+                             help=f"Plan file, CSV or .json (default: {PLAN_FILENAME} in the output folder)")
+    plan_parser.add_argument('--assign', action='append', default=[], metavar='PATTERN=MODEL',
+                             help="Model for files it can't be detected for, as for render (repeatable)")
+    plan_parser.add_argument('--models', default=None, metavar='FILE',
+                             help="Model registry file (TOML or JSON), as for render")
+    add_decisions_argument(plan_parser)
+    
+    decisions_parser = subparsers.add_parser('decisions', help="List, export, edit or import the remembered "
+                                                               "model decisions")
+    decisions_commands = decisions_parser.add_subparsers(dest='decisions_command', required=True)
+    decisions_export_parser = decisions_commands.add_parser('export', help="Write the decisions as CSV "
+                                                                          "(or JSON for a .json file)")
+    decisions_export_parser.add_argument('file', nargs='?', default=None, help="Output file (default: CSV to stdout)")
+    decisions_import_parser = decisions_commands.add_parser('import', help="Apply an edited export - changed "
+                                                                          "rows become overrides, rows with no model are forgotten")
+    decisions_import_parser.add_argument('file', help="CSV or JSON file in the export format")
+    decisions_set_parser = decisions_commands.add_parser('set', help="Always use MODEL for a design")
+    decisions_set_parser.add_argument('name', help="A filename (e.g. 12_custom sky.png) or a stem from the export")
+    decisions_set_parser.add_argument('model', help="Model name, e.g. \"iPhone 15 Pro\"")
+    decisions_forget_parser = decisions_commands.add_parser('forget', help="Detect designs again")
+    decisions_forget_parser.add_argument('names', nargs='+', help="Filenames or stems")
+    for command_parser in decisions_commands.choices.values():
+        command_parser.add_argument('--models', default=None, metavar='FILE', help="Model registry file, as for render")
+        add_decisions_argument(command_parser)
+    
+    watch_parser = subparsers.add_parser('watch', help="Watch inbox folders and render new images as they arrive")
+    watch_parser.add_argument('folders', nargs='+', help="Folders to watch (each handled like a date folder)")
+    watch_parser.add_argument('--out', dest='output_folder', default=None,
+                              help="Output location (default: next to each watched folder, like the GUI)")
+    add_output_arguments(watch_parser)
+    watch_parser.add_argument('--catch-up', action='store_true',
+                              help="First render existing images whose output is missing or out of date")
+    watch_parser.add_argument('--poll', action='store_true', help="Poll folders instead of using inotify")
+    watch_parser.add_argument('--interval', type=float, default=WATCH_POLL_INTERVAL_SEC, metavar='SEC',
+                              help=f"Polling interval (default: {WATCH_POLL_INTERVAL_SEC:g})")
+    watch_parser.add_argument('--settle', type=float, default=WATCH_SETTLE_SEC, metavar='SEC',
+                              help=f"How long a new file must stay unchanged before it is rendered "
+                                   f"(default: {WATCH_SETTLE_SEC:g})")
+    
+    queue_parser = subparsers.add_parser('queue', help="Share rendering between worker processes and hosts "
+                                                       "through a SQLite job queue")
+    queue_commands = queue_parser.add_subparsers(dest='queue_command', required=True)
+    queue_add_parser = queue_commands.add_parser('add', help="Queue the images in date folders")
+    queue_add_parser.add_argument('folders', nargs='+', help="Date folders to queue")
+    queue_add_parser.add_argument('--out', dest='output_folder', default=None,
+                                  help="Output location (default: next to each folder, like the GUI)")
+    queue_work_parser = queue_commands.add_parser('work', help="Claim and render queued jobs until stopped")
+    add_output_arguments(queue_work_parser)
+    queue_work_parser.add_argument('--lease', type=float, default=JOB_LEASE_SEC, metavar='SEC',
+                                   help=f"How long a claimed job is reserved; renewed while it renders and "
+                                        f"reclaimed by another worker if it runs out (default: {JOB_LEASE_SEC})")
+    queue_work_parser.add_argument('--max-attempts', type=int, default=JOB_MAX_ATTEMPTS, metavar='N',
+                                   help=f"Claims per job before it is failed (default: {JOB_MAX_ATTEMPTS})")
+    queue_work_parser.add_argument('--exit-when-empty', action='store_true',
+                                   help="Stop once no jobs are waiting instead of waiting for more")
+    queue_status_parser = queue_commands.add_parser('status', help="Show backlog, workers and throughput")
+    queue_status_parser.add_argument('--window', type=float, default=JOB_STATUS_WINDOW_SEC / 60, metavar='MIN',
+                                     help=f"Throughput over the last MIN minutes (default: {JOB_STATUS_WINDOW_SEC // 60})")
+    queue_commands.add_parser('retry', help="Queue failed jobs again")
+    for command_parser in queue_commands.choices.values():
+        command_parser.add_argument('--db', default=JOB_QUEUE_DEFAULT_DB,
+                                    help=f"Queue database file, shared by every worker (default: {JOB_QUEUE_DEFAULT_DB})")
+    
+    bench_parser = subparsers.add_parser('bench', help="Run performance benchmarks")
+    bench_parser.add_argument('target', choices=['detect', 'decode', 'tiled', 'suite', 'startup'],
+                              help="What to benchmark")
+    bench_parser.add_argument('--names', default=None,
+                              help="Text file (one filename per line) or image folder to use as the corpus")
+    bench_parser.add_argument('--repeat', type=int, default=20, help="Passes over the corpus, or cold starts for startup (default: 20)")
+    bench_parser.add_argument('--images', default=None,
+                              help="Image folder for decode/tiled benchmarks (default: a synthetic 6000x10000 image)")
+    bench_parser.add_argument('--corpus', default=None, metavar='DIR',
+                              help="suite: folder for the synthetic images (generated once, then reused)")
+    bench_parser.add_argument('--output', default=None, metavar='FILE', help="suite/startup: save results as JSON")
+    bench_parser.add_argument('--baseline', default=None, metavar='FILE',
+                              help="suite/startup: compare with saved results and fail on regressions")
+    bench_parser.add_argument('--threshold', type=float, default=BENCH_REGRESSION_THRESHOLD_PCT, metavar='PCT',
+                              help=f"suite/startup: %% slower than the baseline that counts as a regression "
+                                   f"(default: {BENCH_REGRESSION_THRESHOLD_PCT:g})")
+    return parser
+
+def run_render(args):
+    """Run a headless batch and return the process exit code"""
+    engine = PrintFilmEngine()
+    assign_rules = apply_output_arguments(engine, args)
+    if assign_rules is None:
+        return 2
+    engine.workers = args.workers
+    engine.memory_budget_mb = args.memory_budget
+    engine.prefetch = args.prefetch
+    engine.prefetch_depth = args.prefetch_depth
+    engine.prefetch_memory_mb = args.prefetch_memory
+    engine.incremental = args.incremental
+    engine.nest_sheets = args.nest
+    engine.nest_gutter_mm = args.gutter
+    engine.batch_document = args.document
+    engine.tiff_compression = args.tiff_compression
+    engine.profile_format = None if args.profile_format == 'off' else args.profile_format
+    engine.deep_profile = args.deep_profile
+    engine.defer_undetected = True
+    
+    if len(args.inputs) == 1 and os.path.isdir(args.inputs[0]):
+        summary = engine.process_folder(args.inputs[0], args.output_folder)
+    else:
+        missing = [path for path in args.inputs if not os.path.isfile(path)]
+        if missing:
+            for path in missing:
+                print(f"Error: not an image file: {path}", file=sys.stderr)
+            return 2
+        summary = engine.process_file_list(list(args.inputs), args.output_folder)
+    
+    if summary is None:
+        return 0
+    failed = bool(summary['failed'])
+    
+    if summary['deferred']:
+        # First matching rule wins
+        assigned = {}
+        for pattern, model_name in assign_rules:
+            for index in match_jobs_by_pattern(summary['deferred'], pattern):
+                assigned.setdefault(index, model_name)
+        
+        unassigned = [job for index, job in enumerate(summary['deferred']) if index not in assigned]
+        if unassigned:
+            print(f"No model for {len(unassigned)} files (use --assign PATTERN=MODEL):")
+            for file_path, relative_folder, filename in unassigned:
+                print(f"  - {file_path}")
+            failed = True
+        if assigned:
+            assignments = [(summary['deferred'][index], model_name) for index, model_name in sorted(assigned.items())]
+            deferred_summary = engine.process_deferred(assignments, summary['output_folder'])
+            failed = failed or bool(deferred_summary['failed'])
+    
+    return 1 if failed else 0
+
+def run_plan(args):
+    """Write a dry-run plan and return the process exit code (1 if any file has errors)"""
+    engine = PrintFilmEngine()
+    engine.model_decisions_path = None if args.decisions == 'off' else args.decisions
+    if not engine.load_model_registry(args.models):
+        return 2
+    assign_rules = parse_assign_rules(engine, args.assign)
+    if assign_rules is None:
+        return 2
+    
+    start_time = time.perf_counter()
+    if len(args.inputs) == 1 and os.path.isdir(args.inputs[0]):
+        output_folder = engine.get_folder_output_path(args.inputs[0], args.output_folder)
+        image_files = iter_image_files(args.inputs[0])
+    else:
+        missing = [path for path in args.inputs if not os.path.isfile(path)]
+        if missing:
+            for path in missing:
+                print(f"Error: not an image file: {path}", file=sys.stderr)
+            return 2
+        output_folder = engine.get_file_list_output_path(args.inputs, args.output_folder)
+        image_files = [(file_path, "", os.path.basename(file_path)) for file_path in args.inputs]
+    
+    rows = engine.plan_batch(image_files, make_rule_model_selector(assign_rules))
+    if not rows:
+        print("No image files found")
+        return 0
+    if not engine.save_plan(rows, args.plan_path or os.path.join(output_folder, PLAN_FILENAME)):
+        return 2
+    engine.log_plan_summary(rows, time.perf_counter() - start_time)
+    return 1 if any(row['status'] == 'error' for row in rows) else 0
+
+def run_decisions(args):
+    """Run a model decisions command and return the process exit code"""
+    # Messages go to stderr so an export to stdout stays clean CSV
+    engine = PrintFilmEngine(log=lambda message: print(message, file=sys.stderr))
+    if args.decisions == 'off' or not engine.load_model_registry(args.models):
+        return 2
+    engine.model_decisions_path = args.decisions
+    decisions = engine.get_model_decisions()
+    
+    if args.decisions_command == 'export':
+        if args.file is None:
+            writer = csv.DictWriter(sys.stdout, fieldnames=('stem', 'model', 'source', 'updated'))
+            writer.writeheader()
+            writer.writerows(decisions.get_rows())
+            return 0
+        decisions.export(args.file)
+        print(f"Exported {len(decisions.entries)} decisions to {args.file}")
+        return 0
+    
+    if args.decisions_command == 'import':
+        try:
+            changed, removed = decisions.import_rows(args.file, engine.registry)
+        except (OSError, ValueError) as e:
+            print(f"Error: could not import {args.file}: {str(e)}", file=sys.stderr)
+            return 2
+        print(f"Imported: {changed} decisions changed, {removed} forgotten")
+    elif args.decisions_command == 'set':
+        if args.model not in engine.registry:
+            print(f"Error: unknown model: {args.model}", file=sys.stderr)
+            return 2
+        stem = get_decision_stem(args.name)
+        if not stem:
+            print(f"Error: {args.name} has no design name to remember", file=sys.stderr)
+            return 2
+        decisions.record(stem, args.model, 'override')
+        print(f"{stem} -> {args.model}")
+    else:
+        for name in args.names:
+            decisions.remove(get_decision_stem(name))
+    engine.save_model_decisions()
+    return 0
+
+def make_rule_model_selector(assign_rules):
+    """select_model for unattended runs - there's no one to ask, so the first matching
+    --assign rule's model, if any"""
+    def select_model(filename):
+        for pattern, model_name in assign_rules:
+            if match_filename_pattern(filename, pattern):
+                return model_name
+        return None
+    return select_model
+
+def run_watch(args):
+    """Run the hot-folder watcher until interrupted and return the process exit code"""
+    engine = PrintFilmEngine()
+    assign_rules = apply_output_arguments(engine, args)
+    if assign_rules is None:
+        return 2
+    missing = [folder for folder in args.folders if not os.path.isdir(folder)]
+    if missing:
+        for folder in missing:
+            print(f"Error: not a folder: {folder}", file=sys.stderr)
+        return 2
+    
+    select_model = make_rule_model_selector(assign_rules)
+    if args.catch_up:
+        engine.incremental = True
+        for folder in args.folders:
+            engine.process_folder(folder, args.output_folder, select_model=select_model)
+        engine.incremental = False
+    
+    watcher = HotFolderWatcher(engine, args.folders, args.output_folder, select_model,
+                               settle_sec=args.settle, poll_interval=args.interval, use_inotify=not args.poll)
+    # Stop cleanly (after the current file) when a service manager sends SIGTERM
+    stop_event = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop_event.set())
+    try:
+        watcher.run(stop_event)
+    except KeyboardInterrupt:
+        pass
+    engine.log_message(f"Stopped watching ({watcher.rendered} files rendered)")
+    return 0
+
+def run_queue(args):
+    """Run a job queue command and return the process exit code"""
+    import sqlite3
+    try:
+        if args.queue_command == 'add':
+            return run_queue_add(args)
+        if args.queue_command == 'work':
+            return run_queue_work(args)
+        if args.queue_command == 'status':
+            return run_queue_status(args)
+        queue = JobQueue(args.db)
+        print(f"Queued again: {queue.retry_failed()} failed jobs")
+        queue.close()
+        return 0
+    except (sqlite3.Error, ValueError) as e:
+        print(f"Error: job queue {args.db}: {str(e)}", file=sys.stderr)
+        return 2
+
+def run_queue_add(args):
+    """Queue every image in the given date folders"""
+    missing = [folder for folder in args.folders if not os.path.isdir(folder)]
+    if missing:
+        for folder in missing:
+            print(f"Error: not a folder: {folder}", file=sys.stderr)
+        return 2
+    engine = PrintFilmEngine()
+    queue = JobQueue(args.db)
+    try:
+        for folder in args.folders:
+            output_folder = os.path.abspath(engine.get_folder_output_path(folder, args.output_folder))
+            jobs = list(iter_image_files(folder))
+            added = queue.add(jobs, output_folder)
+            print(f"Queued {added} of {len(jobs)} images from {folder} -> {output_folder}"
+                  + (f" ({len(jobs) - added} already queued)" if added < len(jobs) else ""))
+    finally:
+        queue.close()
+    return 0
+
+def run_queue_work(args):
+    """Render queued jobs until interrupted (or the queue is empty)"""
+    engine = PrintFilmEngine()
+    assign_rules = apply_output_arguments(engine, args)
+    if assign_rules is None:
+        return 2
+    worker = QueueWorker(engine, args.db, make_rule_model_selector(assign_rules),
+                         lease_sec=args.lease, max_attempts=args.max_attempts)
+    # Stop cleanly (after the current job) when a service manager sends SIGTERM
+    stop_event = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop_event.set())
+    try:
+        worker.run(stop_event, exit_when_empty=args.exit_when_empty)
+    except KeyboardInterrupt:
+        # The job being rendered is reclaimed once its lease runs out
+        pass
+    engine.log_message(f"Worker stopped ({worker.rendered} rendered, {worker.failed} failed)")
+    return 1 if worker.failed else 0
+
+def run_queue_status(args):
+    """Print the queue's backlog, workers and throughput"""
+    if not os.path.isfile(args.db):
+        print(f"Error: no job queue at {args.db}", file=sys.stderr)
+        return 2
+    queue = JobQueue(args.db)
+    try:
+        status = queue.get_status(args.window * 60)
+    finally:
+        queue.close()
+    counts = status['counts']
+    backlog = counts['pending'] + counts['leased']
+    print(f"Queue: {os.path.abspath(args.db)}")
+    print(f"  pending {counts['pending']:>8}")
+    print(f"  leased  {counts['leased']:>8}  ({len(status['active_workers'])} workers active"
+          + (f", {status['expired_leases']} expired leases to reclaim)" if status['expired_leases'] else ")"))
+    print(f"  done    {counts['done']:>8}")
+    print(f"  failed  {counts['failed']:>8}")
+    
+    rate = status['rate_per_min']
+    print(f"Throughput: {rate:.1f} images/min over the last {status['window_sec'] / 60:g} min")
+    for worker, (count, avg_sec) in status['recent_done'].items():
+        active = " (active)" if worker in status['active_workers'] else ""
+        print(f"  {worker}: {count} images, {avg_sec:.1f}s each{active}")
+    if backlog:
+        eta = f", about {backlog / rate:.1f} min at that rate" if rate > 0 else ""
+        print(f"Backlog: {backlog} images{eta}")
+    if status['failures']:
+        print("Failed (queue retry to run them again):")
+        for input_path, error in status['failures']:
+            print(f"  - {input_path}: {error}")
+    return 0
+
+def run_bench(args):
+    """Run a benchmark and return the process exit code"""
+    if args.target == 'decode':
+        return run_decode_bench(args)
+    if args.target == 'tiled':
+        return run_tiled_bench(args)
+    if args.target == 'suite':
+        return run_suite_bench(args)
+    if args.target == 'startup':
+        return run_startup_bench(args)
+    
+    names = load_detection_names(args.names)
+    result = run_detection_benchmark(names, args.repeat)
+    print(f"Detection benchmark: {result['filenames']} filenames ({result['unique_names']} unique)")
+    print(f"  reference: {result['reference_per_sec']:,.0f} filenames/sec")
+    print(f"  compiled:  {result['compiled_per_sec']:,.0f} filenames/sec "
+          f"({result['compiled_per_sec'] / max(result['reference_per_sec'], 1e-9):.1f}x)")
+    print(f"  cache: {result['cache_info'].hits} hits, {result['cache_info'].misses} misses")
+    if result['mismatches']:
+        print(f"  MISMATCHES: {len(result['mismatches'])}")
+        for name, expected, actual in result['mismatches']:
+            print(f"    {name}: expected {expected}, got {actual}")
+        return 1
+    print("  results identical")
+    return 0
+
+def run_decode_bench(args):
+    """Benchmark fast vs exact artwork decoding and enforce the quality guard"""
+    target_width_px = round((9.8 + 0.3) * 300 / 2.54)  # regular models, the most common width
+    with tempfile.TemporaryDirectory() as temp_dir:
+        if args.images:
+            image_paths = [file_path for file_path, relative_folder, filename
+                           in PrintFilmEngine(log=lambda message: None).find_image_files(args.images)]
+        else:
+            image_paths = [make_synthetic_artwork(os.path.join(temp_dir, "synthetic.jpg"))]
+        results = run_decode_benchmark(image_paths, target_width_px)
+    
+    print(f"Decode benchmark: {len(results)} images -> {target_width_px}px wide")
+    for result in results:
+        speedup = result['exact_sec'] / result['fast_sec'] if result['fast_sec'] > 0 else 0.0
+        status = "ok" if result['within_tolerance'] else "OVER TOLERANCE"
+        print(f"  {os.path.basename(result['path'])}: exact {result['exact_sec']:.3f}s, "
+              f"fast {result['fast_sec']:.3f}s ({speedup:.1f}x), mean diff {result['mean_diff']:.3f} {status}")
+    return 0 if all(result['within_tolerance'] for result in results) else 1
+
+def run_tiled_bench(args):
+    """Benchmark the striped render path against whole-image resizing and enforce its tolerance"""
+    target_width_px = round((9.8 + 0.3) * 300 / 2.54)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        if args.images:
+            image_paths = [file_path for file_path, relative_folder, filename
+                           in PrintFilmEngine(log=lambda message: None).find_image_files(args.images)]
+        else:
+            # Palette PNGs are the layered exports that used to need a full-size RGBA copy.
+            # Generated in a child so this process stays small for the forked passes
+            import concurrent.futures
+            image_paths = [os.path.join(temp_dir, "synthetic_palette.png")]
+            with concurrent.futures.ProcessPoolExecutor(max_workers=1) as executor:
+                executor.submit(make_synthetic_artwork, image_paths[0], mode='P').result()
+        results = run_tiled_benchmark(image_paths, target_width_px)
+    
+    print(f"Tiled benchmark: {len(results)} images -> {target_width_px}px wide")
+    for result in results:
+        status = "ok" if result['within_tolerance'] else "OVER TOLERANCE"
+        peaks = ""
+        if result['tiled_peak_rss'] is not None:
+            peaks = (f", peak RSS striped {result['tiled_peak_rss'] / (1024 * 1024):.0f} MB"
+                     f" / whole {result['whole_peak_rss'] / (1024 * 1024):.0f} MB")
+        print(f"  {os.path.basename(result['path'])}: whole {result['whole_sec']:.3f}s, "
+              f"striped {result['tiled_sec']:.3f}s{peaks}, mean diff {result['mean_diff']:.4f} {status}")
+    return 0 if all(result['within_tolerance'] for result in results) else 1
+
+def run_suite_bench(args):
+    """Run the benchmark suite, optionally saving results and checking them against a baseline"""
+    names = load_detection_names(args.names) if args.names else make_benchmark_filenames()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        if args.images:
+            image_paths = [file_path for file_path, relative_folder, filename
+                           in PrintFilmEngine(log=lambda message: None).find_image_files(args.images)]
+        else:
+            image_paths = make_benchmark_corpus(args.corpus or temp_dir)
+        results = run_suite_benchmark(image_paths, names, args.repeat)
+    
+    corpus = results['corpus']
+    print(f"Benchmark suite: {corpus['images']} images x {BENCH_RENDER_REPEAT} renders, "
+          f"{corpus['filenames']} filenames x {corpus['detect_repeat']}")
+    for result in results['images']:
+        print(f"  {result['file']} ({result['size'][0]}x{result['size'][1]} {result['mode']}): "
+              f"create {result['create_ms']:.1f} ms, overlays {result['overlays_ms']:.2f} ms, "
+              f"save {result['save_ms']:.1f} ms")
+    for metric, value in results['metrics'].items():
+        print(f"  {metric:<30} {value:>14,.2f}")
+    covered, total = corpus['patterns_covered']
+    print(f"  detection patterns covered: {covered}/{total}")
+    for pattern in corpus['uncovered_patterns']:
+        print(f"    never first to match: {pattern}")
+    
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=1)
+        print(f"Results saved: {args.output}")
+    
+    if not args.baseline:
+        return 0
+    return 1 if report_baseline_comparison(results, args.baseline, args.threshold) else 0
+
+def run_startup_bench(args):
+    """Run the startup benchmark and check it against the budget (and optionally a baseline)"""
+    results = run_startup_benchmark(args.repeat)
+    print(f"Startup benchmark: median of {results['repeat']} cold starts (Python {results['python']})")
+    over_budget = False
+    for metric, value in results['metrics'].items():
+        budget = STARTUP_BUDGET_MS.get(metric)
+        status = ""
+        if budget is not None:
+            over_budget = over_budget or value > budget
+            status = f"budget {budget} ms {'OVER' if value > budget else 'ok'}"
+        print(f"  {metric:<16} {value:>8.1f} ms  {status}")
+    if 'gui_ready_ms' not in results['metrics']:
+        print("  gui_ready_ms     skipped (no display)")
+    print("  slowest imports:")
+    for name, milliseconds in results['slowest_imports']:
+        print(f"    {name:<28} {milliseconds:>7.1f} ms")
+    if results['deferred_modules_loaded']:
+        over_budget = True
+        print(f"  LOADED AT IMPORT (should load on first use): {', '.join(results['deferred_modules_loaded'])}")
+    
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=1)
+        print(f"Results saved: {args.output}")
+    
+    regressed = report_baseline_comparison(results, args.baseline, args.threshold) if args.baseline else False
+    return 1 if over_budget or regressed else 0
+
+def main(argv=None):
+    """Entry point - dispatch to the CLI or start the GUI"""
+    args = build_arg_parser().parse_args(argv)
+    if args.command == 'render':
+        return run_render(args)
+    if args.command == 'plan':
+        return run_plan(args)
+    if args.command == 'decisions':
+        return run_decisions(args)
+    if args.command == 'watch':
+        return run_watch(args)
+    if args.command == 'queue':
+        return run_queue(args)
+    if args.command == 'bench':
+        return run_bench(args)
+    
     app = iPhoneCaseProcessor()
-    app.run()
\ No newline at end of file
+    app.run()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file